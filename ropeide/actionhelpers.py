@@ -1,3 +1,5 @@
+from __future__ import with_statement
+
 import threading
 
 import Tkinter
@@ -8,6 +10,13 @@ import ropeide.uihelpers
 import rope.base.taskhandle
 
 
+# rope's pycore is not thread-safe.  The main thread holds this lock
+# while performing actions and running `StoppableTaskRunner`\s, whose
+# tasks use rope on its behalf, and other threads that use rope, like
+# the code assist worker, hold it, too.
+pycore_lock = threading.RLock()
+
+
 class StoppableTaskRunner(object):
 
     def __init__(self, task, title='Task', interrupts=True):
@@ -68,8 +77,9 @@ class StoppableTaskRunner(object):
         toplevel.grab_set()
         stop_button.focus_set()
         thread = threading.Thread(target=calculate)
-        thread.start()
-        toplevel.mainloop()
+        with pycore_lock:
+            thread.start()
+            toplevel.mainloop()
         toplevel.destroy()
         if calculate.exception is not None:
             description = type(calculate.exception).__name__ + ': ' + \
@@ -1,13 +1,18 @@
+from __future__ import with_statement
+
 import os
 import imp
 
 import tkFileDialog
 from Tkinter import *
 
+import ropeide.actionhelpers
 import ropeide.editor
 import ropeide.editorpile
+import ropeide.fileindex
 import ropeide.keybinder
 import ropeide.statusbar
+import ropeide.trigrams
 from rope.base.exceptions import RopeError
 from rope.base.project import Project, get_no_project
 from ropeide import editingcontexts, registers
@@ -22,11 +27,15 @@ class Core(object):
     def __init__(self):
         self.rebound_keys = {}
         self.actions = []
+        self.available_actions = {}
+        self.recent_actions = []
         self.prefs = rope.base.prefs.Prefs()
         self.last_action = None
         self.registers = registers.Registers()
         self.menu_cascades = []
         self.project = get_no_project()
+        self.file_index = None
+        self.trigram_index = None
         self.extension_modules = []
         editingcontexts.init_contexts(self)
 
@@ -285,6 +294,10 @@ class Core(object):
             self.close_project()
         ropefolder = self.prefs.get('project_rope_folder', '.ropeproject')
         self.project = Project(project_root, ropefolder=ropefolder)
+        self.file_index = ropeide.fileindex.FileIndex(self.project)
+        self.root.after_idle(self.file_index.update)
+        if self.prefs.get('trigram_index', False):
+            self.create_trigram_index()
 
     def _close_project_dialog(self, exit_=False):
         modified_editors = [editor for editor in self.editor_manager.editors
@@ -328,6 +341,12 @@ class Core(object):
             self.close_active_editor()
         if isinstance(self.project, Project):
             self.project.close()
+        if self.file_index is not None:
+            self.file_index.close()
+            self.file_index = None
+        if self.trigram_index is not None:
+            self.trigram_index.close()
+            self.trigram_index = None
         self.registers.project_closed()
         self.project = get_no_project()
 
@@ -346,6 +365,17 @@ class Core(object):
     def get_open_project(self):
         return self.project
 
+    def get_file_index(self):
+        return self.file_index
+
+    def get_trigram_index(self):
+        return self.trigram_index
+
+    def create_trigram_index(self):
+        self.trigram_index = ropeide.trigrams.TrigramIndex(self.project,
+                                                           self.file_index)
+        return self.trigram_index
+
     def switch_active_editor(self):
         self.editor_manager.switch_active_editor()
 
@@ -358,9 +388,11 @@ class Core(object):
     def register_action(self, action):
         """Register a `rope.ropeide.extension.Action`"""
         self.actions.append(action)
+        self.available_actions.clear()
 
     def rebind_action(self, name, key):
         self.rebound_keys[name] = key
+        self.available_actions.clear()
 
     def _add_menu_command(self, menu, callback, active_contexts):
         active_contexts = self._get_matching_contexts(active_contexts)
@@ -370,9 +402,11 @@ class Core(object):
     def _make_callback(self, action):
         def callback(prefix=None):
             try:
-                action.do(ActionContext(self, prefix))
+                with ropeide.actionhelpers.pycore_lock:
+                    action.do(ActionContext(self, prefix))
                 if action.get_name() != 'repeat_last_action':
                     self.last_action = action
+                    self._add_recent_action(action)
             except RopeError, e:
                 self._report_error(e, type(e).__name__)
         return callback
@@ -380,6 +414,20 @@ class Core(object):
     def perform_action(self, action):
         self._make_callback(action)()
 
+    max_recent_actions = 100
+
+    def _add_recent_action(self, action):
+        self.recent_actions.append(action.get_name())
+        del self.recent_actions[:-self.max_recent_actions]
+
+    def get_recent_actions(self):
+        """Return the names of recently performed actions, oldest first
+
+        An action appears once for each time it was performed.
+
+        """
+        return self.recent_actions
+
     def repeat_last_action(self):
         if self.last_action is not None:
             self.perform_action(self.last_action)
@@ -411,16 +459,26 @@ class Core(object):
             self.root['menu'] = editingcontexts.none.menu
 
     def get_available_actions(self):
-        """Return applicable actions in current context"""
+        """Return applicable actions in current context
+
+        The actions of each editing context are computed once and the
+        same list is returned until an action is registered or
+        rebound.
+
+        """
         context = 'none'
         active_editor = self.editor_manager.active_editor
         if active_editor:
             context = active_editor.get_editor().get_editing_context().name
-        for action in self.actions:
-            action_contexts = self._get_matching_context_names(
-                action.get_active_contexts())
-            if context in action_contexts:
-                yield action
+        if context not in self.available_actions:
+            actions = []
+            for action in self.actions:
+                action_contexts = self._get_matching_context_names(
+                    action.get_active_contexts())
+                if context in action_contexts:
+                    actions.append(action)
+            self.available_actions[context] = actions
+        return self.available_actions[context]
 
     _core = None
 
@@ -35,6 +35,10 @@ def starting_rope(core):
     # Hiding status bar
     #core.set('show_status_bar', False)
 
+    # Highlighting python files using `tokenize` patterns; it takes
+    # linear time for any input and highlights numbers and decorators
+    #core.set('python_highlighting', 'tokenize')
+
 
     # If you don't like emacs keybindings, change this to False
     i_like_emacs = True
@@ -59,6 +63,11 @@ def starting_rope(core):
     # created.  Specifying `None` means do not make and use a rope folder.
     #core.set('project_rope_folder', '.ropeproject')
 
+    # Keep an index of the trigrams of project files in the rope folder
+    # so that grep project reads only the files that might match.  It
+    # is built when first used or by ``index_project_text`` action.
+    #core.set('trigram_index', True)
+
     # You can register your own actions
     _register_my_actions(core)
 
@@ -131,7 +140,9 @@ def _change_to_nonemacs_keybinding(core):
     core.rebind_action('validate_project', 'F5')
     core.rebind_action('edit_project_config', None)
     core.rebind_action('sync_project', None)
+    core.rebind_action('index_project_text', None)
     core.rebind_action('find_file', 'C-R')
+    core.rebind_action('grep_project', 'C-H')
     core.rebind_action('change_buffer', 'C-E')
     core.rebind_action('save_buffer', 'C-s')
     core.rebind_action('save_all_buffers', 'C-S')
@@ -157,11 +168,16 @@ def _change_to_nonemacs_keybinding(core):
     core.rebind_action('repeat_last_action', None)
     core.rebind_action('search_forward', 'C-f')
     core.rebind_action('search_backward', 'C-F')
+    core.rebind_action('regex_search_forward', None)
+    core.rebind_action('regex_search_backward', None)
+    core.rebind_action('word_search_forward', None)
+    core.rebind_action('highlight_search_matches', None)
     core.rebind_action('edit_dot_ropeide', None)
     core.rebind_action('execute_command', None)
 
     # source actions
     core.rebind_action('correct_line_indentation', 'C-i')
+    core.rebind_action('reindent_region', None)
     core.rebind_action('show_codetags', None)
     core.rebind_action('show_errors', None)
     core.rebind_action('show_warnings', None)
@@ -216,6 +232,7 @@ def _change_to_nonemacs_keybinding(core):
     core.rebind_action('rename_current_module', None)
     core.rebind_action('move_current_module', None)
     core.rebind_action('restructure', None)
+    core.rebind_action('replace_in_project', None)
     # import actions
     core.rebind_action('organize_imports', 'C-O')
     core.rebind_action('expand_star_imports', None)
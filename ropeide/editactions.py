@@ -1,9 +1,12 @@
+from __future__ import with_statement
+
 import os.path
 
 import Tkinter
 
 import rope.base.project
 import ropeide.core
+import ropeide.fuzzy
 from ropeide import uihelpers, fill
 from ropeide.extension import SimpleAction
 from ropeide.menubar import MenuAddress
@@ -55,8 +58,9 @@ class FillParagraph(object):
         if text[start:end] != filled:
             start_index = context.editor.get_index(start)
             end_index = context.editor.get_index(end)
-            context.editor.delete(start_index, end_index)
-            context.editor.insert(start_index, filled)
+            with context.editor.batch():
+                context.editor.delete(start_index, end_index)
+                context.editor.insert(start_index, filled)
             context.editor.set_insert(context.editor.get_index(offset))
 
 
@@ -76,6 +80,23 @@ def backward_search(context):
     if context.get_active_editor():
         context.get_active_editor().get_editor().start_searching(False)
 
+def forward_regex_search(context):
+    if context.get_active_editor():
+        context.get_active_editor().get_editor().start_searching(True, 'regex')
+
+def backward_regex_search(context):
+    if context.get_active_editor():
+        context.get_active_editor().get_editor().start_searching(False, 'regex')
+
+def forward_word_search(context):
+    if context.get_active_editor():
+        context.get_active_editor().get_editor().start_searching(True, 'word')
+
+def highlight_search_matches(context):
+    if context.get_active_editor():
+        searcher = context.get_active_editor().get_editor().get_searcher()
+        searcher.set_highlight_all(not searcher.highlight_all)
+
 def goto_line(context):
     if not context.get_active_editor():
         return
@@ -117,18 +138,49 @@ def repeat_last_action(context):
 
 
 class FindCommandHandle(uihelpers.FindItemHandle):
+    """Find the available actions with fuzzy matching
+
+    The matcher of the actions of each editing context is kept until
+    actions are registered or rebound.  Recently and frequently
+    performed actions are ranked higher; see `_get_bonuses()`.
+    Keywords with wildcards are matched like before.
+
+    """
+
+    matchers = {}
 
     def __init__(self, core):
         self.core = core
-        self.matcher = uihelpers.HelperMatcher(
-            list(self.core.get_available_actions()),
-            uihelpers.DoesMatch(self._to_search_text))
+        self.actions = self.core.get_available_actions()
+        self.bonuses = _get_bonuses(self.core.get_recent_actions())
+        self.wildcards = None
 
     def _to_search_text(self, action):
         return action.get_name()
 
     def find_matches(self, starting):
-        return self.matcher.find_matches(starting)
+        if '*' in starting or '?' in starting:
+            if self.wildcards is None:
+                self.wildcards = uihelpers.HelperMatcher(
+                    self.actions, uihelpers.DoesMatch(self._to_search_text))
+            return self.wildcards.find_matches(starting)
+        return self._get_matcher().find_matches(starting)
+
+    def _get_matcher(self):
+        # `Core.get_available_actions()` returns the same list for
+        # each context until actions change
+        actions, matcher = self.matchers.get(id(self.actions), (None, None))
+        if actions is not self.actions:
+            if len(self.matchers) > 16:
+                self.matchers.clear()
+            matcher = ropeide.fuzzy.FuzzyMatcher(self.actions,
+                                                 self._to_search_text)
+            self.matchers[id(self.actions)] = (self.actions, matcher)
+        matcher.get_bonus = self._get_bonus
+        return matcher
+
+    def _get_bonus(self, action):
+        return self.bonuses.get(action.get_name(), 0)
 
     def selected(self, action):
         self.core.perform_action(action)
@@ -140,6 +192,21 @@ class FindCommandHandle(uihelpers.FindItemHandle):
         return self.to_string(action)
 
 
+def _get_bonuses(recent_actions):
+    """Return a dict of action names to their score bonuses
+
+    Each use adds a bonus that decays with the number of actions
+    performed after it.
+
+    """
+    result = {}
+    bonus = 64.0
+    for name in reversed(recent_actions):
+        result[name] = result.get(name, 0) + int(bonus)
+        bonus *= 0.9
+    return result
+
+
 def execute_command(context):
     uihelpers.find_item_dialog(
         FindCommandHandle(context.core), 'Execute Command',
@@ -201,11 +268,17 @@ class PrevNextElement(object):
         editor = context.editor
         text = editor.get_text()
         if self.elements is None or text != self.elements.source:
-            self.elements = self.element_type(text)
+            self.elements = self._create_elements(context, text)
         offset = editor.get_current_offset()
         diff = self._new_offset(self.elements, offset) - offset
         editor.set_insert(editor.get_relative(editor.get_insert(), diff))
 
+    def _create_elements(self, context, text):
+        if self.element_type is ropeide.movements.Scopes:
+            outline = context.get_active_editor().get_outline()
+            return self.element_type(text, outline)
+        return self.element_type(text)
+
     def _new_offset(self, elements, offset):
         if self.next:
             return elements.next(offset)
@@ -306,6 +379,14 @@ actions.append(SimpleAction('search_forward', forward_search, 'C-s',
                             MenuAddress(['Edit', 'Forward Search'], 'f', 3), ['all']))
 actions.append(SimpleAction('search_backward', backward_search, 'C-r',
                             MenuAddress(['Edit', 'Backward Search'], 'b', 3), ['all']))
+actions.append(SimpleAction('regex_search_forward', forward_regex_search, 'C-M-s',
+                            MenuAddress(['Edit', 'Forward Regex Search'], None, 3), ['all']))
+actions.append(SimpleAction('regex_search_backward', backward_regex_search, 'C-M-r',
+                            MenuAddress(['Edit', 'Backward Regex Search'], None, 3), ['all']))
+actions.append(SimpleAction('word_search_forward', forward_word_search, 'M-s w',
+                            MenuAddress(['Edit', 'Forward Word Search'], None, 3), ['all']))
+actions.append(SimpleAction('highlight_search_matches', highlight_search_matches, 'M-s h',
+                            MenuAddress(['Edit', 'Highlight Search Matches'], None, 3), ['all']))
 
 actions.append(SimpleAction('execute_command', execute_command, 'M-x',
                             MenuAddress(['Edit', 'Execute Command'], 'x', 4), ['all', 'none']))
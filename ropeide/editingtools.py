@@ -31,6 +31,8 @@ class PythonEditingTools(EditingTools):
         return ropeide.indenter.PythonCodeIndenter(editor, indents=indents)
 
     def create_highlighting(self):
+        if self.prefs.get('python_highlighting', 'regex') == 'tokenize':
+            return ropeide.highlighter.TokenizeHighlighting()
         return ropeide.highlighter.PythonHighlighting()
 
 
@@ -1,4 +1,8 @@
+from __future__ import with_statement
+
+import itertools
 import os
+import time
 
 import ScrolledText
 import Tkinter
@@ -6,12 +10,23 @@ import tkFont
 from Tkinter import END, TclError, SEL_FIRST, SEL, SEL_LAST, INSERT
 
 import ropeide.editingtools
+import ropeide.highlighter
+import ropeide.lineindex
 import ropeide.searcher
 import ropeide.tkhelpers
 
 
 class GraphicalEditor(object):
 
+    # regions longer than this many lines are highlighted lazily
+    lazy_highlighting_lines = 400
+    # lines highlighted before and after the visible ones first
+    highlighting_margin = 50
+    highlighting_chunk_lines = 200
+    highlighting_time_slice = 0.05
+    # compute highlights in `HighlightingWorker` thread
+    highlight_in_background = True
+
     def __init__(self, parent, editorcontext, font=None):
         if font is None:
             if os.name == 'posix':
@@ -21,6 +36,16 @@ class GraphicalEditor(object):
         self.text = ScrolledText.ScrolledText(
             parent, bg='white', font=font, undo=True,
             maxundo=100, highlightcolor='#99A')
+        self.line_index = ropeide.lineindex.LineIndex()
+        self.pending_highlighting = None
+        self.highlighting_request = None
+        self.highlighting_results = []
+        self.version = 0
+        self.edit_stamp = _edit_stamps.next()
+        self.edited_line = None
+        self.text_snapshot = None
+        self.all_matches = None
+        self.pending_matches_tagging = None
         self.change_inspector = _TextChangeInspector(self, self._text_changed)
         self.searcher = ropeide.searcher.Searcher(self)
         self._set_editingcontexts(editorcontext)
@@ -31,6 +56,11 @@ class GraphicalEditor(object):
         self.modified_flag = False
         self.kill_ring = KillRingManager()
         self.text.bind('<<Modified>>', self._editor_modified)
+        self.text.bind('<<HighlightsReady>>', self._receive_highlights)
+        self.text.bind('<Destroy>', self._cancel_highlights, '+')
+        self.text['yscrollcommand'] = self._view_changed
+        self.text.tag_config(_SEARCH_MATCH, background='#FFFF80')
+        self.text.tag_lower(_SEARCH_MATCH)
         self.text.edit_modified(False)
 
 
@@ -38,33 +68,50 @@ class GraphicalEditor(object):
         start, end = self._get_region_index()
         start_line = self._get_line_from_index(start)
         end_line = self._get_line_from_index(end)
-        for curr_line in xrange (start_line, end_line):
-            self.indenter.indent(curr_line)
+        with self.batch():
+            for curr_line in xrange (start_line, end_line):
+                self.indenter.indent(curr_line)
 
     def deindent_block(self):
         start, end = self._get_region_index()
         start_line = self._get_line_from_index(start)
         end_line = self._get_line_from_index(end)
-        for curr_line in xrange (start_line, end_line):
-            self.indenter.deindent(curr_line)
+        with self.batch():
+            for curr_line in xrange (start_line, end_line):
+                self.indenter.deindent(curr_line)
+
+    def batch(self):
+        """Return a context for performing many changes at once
+
+        Highlighting and change observers are updated only once,
+        after the context ends.
+
+        """
+        return self.change_inspector.batch()
 
 
     def _text_changed(self):
         if not self.change_inspector.is_changed():
             return
-        start, end = self.change_inspector.get_changed_region()
+        start, end = self.change_inspector.changed_region
         self.change_inspector.clear_changed()
         self._colorize(start, end)
         if self.modified_flag:
             for observer in self.change_observers:
-                observer(end)
-
-    def _colorize(self, start, end):
+                observer(self._get_index(end))
+
+    def _colorize(self, start_offset, end_offset):
+        if self.line_states is not None:
+            start_offset, end_offset = self.line_states.update(
+                self.get_text(), start_offset, end_offset)
+            self._highlight_region(self._get_index(start_offset),
+                                   self._get_index(end_offset))
+            return
         start_offset, end_offset = \
             self.highlighting.get_suspected_region_after_change(
-            self.get_text(), self.get_offset(start), self.get_offset(end))
-        start = self.text.index('1.0 +%dc' % start_offset)
-        end = self.text.index(start + ' +%dc' % (end_offset - start_offset))
+            self.get_text(), start_offset, end_offset)
+        start = self._get_index(start_offset)
+        end = self._get_index(end_offset)
         start_tags = self.text.tag_names(start)
         if start_tags:
             tag = start_tags[0]
@@ -79,19 +126,119 @@ class GraphicalEditor(object):
             range_ = self.text.tag_prevrange(tag, end + '+1c')
             if range_ and self.text.compare(range_[1], '>', end):
                 end = range_[1]
-        self._highlight_range(start, end)
+        self._highlight_region(start, end)
+
+    def _highlight_region(self, start, end):
+        """Highlight long regions lazily starting from the visible lines"""
+        if self.highlight_in_background:
+            self.text.tag_add(_PENDING_HIGHLIGHT, start, end)
+            self._request_highlights()
+            return
+        if self._get_line_from_index(end) - self._get_line_from_index(start) < \
+           self.lazy_highlighting_lines:
+            self._highlight_range(start, end)
+            return
+        self.text.tag_add(_PENDING_HIGHLIGHT, start, end)
+        if self.pending_highlighting is not None:
+            self.text.after_cancel(self.pending_highlighting)
+        self._highlight_pending()
+
+    def _highlight_pending(self):
+        self.pending_highlighting = None
+        start_time = time.time()
+        try:
+            while time.time() - start_time < self.highlighting_time_slice:
+                start = self._get_pending_highlight_start()
+                if start is None:
+                    return
+                end = '%s +%d lines lineend' % (start,
+                                               self.highlighting_chunk_lines)
+                self._highlight_safe_range(start, end)
+            self.pending_highlighting = \
+                self.text.after_idle(self._highlight_pending)
+        except TclError:
+            pass
+
+    def _get_pending_highlight_start(self):
+        view_start = self.text.index('@0,0 linestart -%d lines' %
+                                     self.highlighting_margin)
+        range_ = self.text.tag_prevrange(_PENDING_HIGHLIGHT, view_start + ' +1c')
+        if range_ and self.text.compare(range_[1], '>', view_start):
+            return view_start
+        for index in (view_start, '1.0'):
+            range_ = self.text.tag_nextrange(_PENDING_HIGHLIGHT, index)
+            if range_:
+                return range_[0]
+
+    def _highlight_safe_range(self, start_index, end_index):
+        start, end = self._get_safe_range(start_index, end_index)
+        self._highlight_range(self._get_index(start), self._get_index(end))
+
+    def _get_safe_range(self, start_index, end_index):
+        start = self.get_offset(start_index)
+        end = self.get_offset(end_index)
+        if self.line_states is not None:
+            return self.line_states.get_region(self.get_text(), start, end)
+        return self.highlighting.get_suspected_region_after_change(
+            self.get_text(), start, end)
 
     def _highlight_range(self, start_index, end_index):
-        for style in self.highlighting.get_styles().keys():
-            self.text.tag_remove(style, start_index, end_index)
+        self.text.tag_remove(_PENDING_HIGHLIGHT, start_index, end_index)
         start_offset = self.get_offset(start_index)
         end_offset = self.get_offset(end_index)
-        indexer = _OffsetToIndexCacher(self.text)
-        for start, end, kind in self.highlighting.highlights(self.get_text(),
-                                                             start_offset,
-                                                             end_offset):
-            self.text.tag_add(kind, indexer.get_index(start),
-                              indexer.get_index(end))
+        highlights = self.highlighting.highlights(self.get_text(),
+                                                  start_offset, end_offset)
+        _TagWriter(self, self.highlighting.get_styles()).write(
+            start_offset, end_offset, highlights)
+
+    def _request_highlights(self):
+        """Ask the worker thread to highlight the next pending chunk
+
+        Only one request is outstanding at a time; a request made for
+        an older version of the text is replaced.
+
+        """
+        if self.highlighting_request is not None and \
+           self.highlighting_request[0] == self.version:
+            return
+        if self.change_inspector.is_changed():
+            # `_text_changed()` requests highlights after updating
+            # line states
+            return
+        start = self._get_pending_highlight_start()
+        if start is None:
+            self.highlighting_request = None
+            return
+        end = '%s +%d lines lineend' % (start, self.highlighting_chunk_lines)
+        start, end = self._get_safe_range(start, end)
+        request = (self.version, start, end)
+        self.highlighting_request = request
+        def done(highlights):
+            self.highlighting_results.append((request, highlights))
+            try:
+                self.text.event_generate('<<HighlightsReady>>', when='tail')
+            except (TclError, RuntimeError):
+                pass
+        ropeide.highlighter.get_highlighting_worker().request(
+            self, self.highlighting, self.get_text(), start, end, done)
+
+    def _receive_highlights(self, event=None):
+        while self.highlighting_results:
+            request, highlights = self.highlighting_results.pop(0)
+            if request != self.highlighting_request or \
+               request[0] != self.version:
+                continue
+            self.highlighting_request = None
+            version, start, end = request
+            self.text.tag_remove(_PENDING_HIGHLIGHT, self._get_index(start),
+                                 self._get_index(end))
+            _TagWriter(self, self.highlighting.get_styles()).write(
+                start, end, highlights)
+        self._request_highlights()
+
+    def _cancel_highlights(self, event=None):
+        ropeide.highlighter.get_highlighting_worker().cancel(self)
+        self.highlighting_request = None
 
     def select_range(self, start_index, end_index):
         self.text.tag_remove(SEL, '1.0', END)
@@ -220,8 +367,72 @@ class GraphicalEditor(object):
         self.text.mark_set(INSERT, new_insert)
         self.text.see(INSERT)
 
+    def reindent_region(self):
+        start, end = self._get_region_index()
+        self._reindent_lines(self._get_line_from_index(start),
+                             self._get_line_from_index(end))
+
+    def reindent_buffer(self):
+        self._reindent_lines(1, self.line_editor().length())
+
+    def _reindent_lines(self, start_line, end_line):
+        """Reindent lines in one undo step"""
+        self.text.edit_separator()
+        self.text['autoseparators'] = False
+        try:
+            self.indenter.reindent_region(start_line, end_line)
+        finally:
+            self.text['autoseparators'] = True
+            self.text.edit_separator()
+
     def get_text(self):
-        return self.text.get('1.0', 'end-1c')
+        if self.text_snapshot is None:
+            self.text_snapshot = self.text.get('1.0', 'end-1c')
+        return self.text_snapshot
+
+    def get_version(self):
+        """Return a number that changes whenever the text changes
+
+        It can be used for caching things computed from the text.
+
+        """
+        return self.version
+
+    def get_edit_stamp(self):
+        """Return a number that changes when other lines are edited
+
+        Unlike `get_version()`, this does not change while only the
+        line containing the cursor is edited, as when typing.  It
+        changes when lines are inserted or removed and when a line
+        other than the cursor line was edited since the stamp was
+        taken.  Stamps are unique among editors.
+
+        """
+        if self.edited_line not in (None, self.get_current_line_number()):
+            self._renew_edit_stamp()
+        return self.edit_stamp
+
+    def _renew_edit_stamp(self):
+        self.edit_stamp = _edit_stamps.next()
+        self.edited_line = None
+
+    def _text_modified(self):
+        self.version += 1
+        self.text_snapshot = None
+
+    def _lines_changed(self, lineno, last_lineno=None):
+        """Called when lines from `lineno` to `last_lineno` change
+
+        If `last_lineno` is `None`, all lines after `lineno` might
+        have changed.
+
+        """
+        self.indenter.lines_changed(lineno)
+        if last_lineno != lineno or \
+           self.edited_line not in (None, lineno):
+            self._renew_edit_stamp()
+        if last_lineno == lineno:
+            self.edited_line = lineno
 
     def set_text(self, text, reset_editor=True):
         initial_position = self.text.index(INSERT)
@@ -269,7 +480,10 @@ class GraphicalEditor(object):
         return GraphicalTextIndex(self, self._go(textIndex._getIndex(), offset))
 
     def get_index(self, offset):
-        return GraphicalTextIndex(self, self._go('1.0', offset))
+        return GraphicalTextIndex(self, self._get_index(offset))
+
+    def _get_index(self, offset):
+        return '%d.%d' % self.line_index.get_position(offset)
 
     def _go(self, fromIndex, count):
         if count >= 0:
@@ -552,7 +766,11 @@ class GraphicalEditor(object):
                 configKWs['foreground'] = style.color
             configKWs['font'] = font
             self.text.tag_config(name, **configKWs)
-        self._highlight_range('0.0', 'end')
+        self.line_states = self.highlighting.create_line_states()
+        if self.line_states is not None:
+            self.line_states.reset(self.get_text())
+        self.highlighting_request = None
+        self._highlight_region('1.0', 'end')
 
     def get_searcher(self):
         return self.searcher
@@ -569,13 +787,55 @@ class GraphicalEditor(object):
         self.text.see(INSERT)
 
 
-    def start_searching(self, forward):
+    def highlight_all_matches(self, matches):
+        """Highlight `matches` while searching
+
+        `matches` is a `ropeide.searcher.Matches` or `None` for
+        removing the highlights.  Only the visible matches are tagged
+        and the tags are updated when the view changes.
+
+        """
+        self.all_matches = matches
+        self._tag_visible_matches()
+
+    def _tag_visible_matches(self):
+        self.pending_matches_tagging = None
+        self.text.tag_remove(_SEARCH_MATCH, '1.0', END)
+        matches = self.all_matches
+        if matches is None:
+            return
+        start = self.get_offset('@0,0 linestart')
+        end = self.get_offset('@0,%d lineend' % self.text.winfo_height())
+        index = matches.find(start)
+        indices = []
+        while index is not None and index < len(matches):
+            match_start, match_end = matches.get_match(index)
+            if match_start > end:
+                break
+            indices.append(self._get_index(match_start))
+            indices.append(self._get_index(match_end))
+            index += 1
+        if indices:
+            self.text.tk.call((self.text._w, 'tag', 'add', _SEARCH_MATCH) +
+                              tuple(indices))
+
+    def _view_changed(self, first, last):
+        self.text.vbar.set(first, last)
+        if self.all_matches is not None and \
+           self.pending_matches_tagging is None:
+            self.pending_matches_tagging = \
+                self.text.after_idle(self._tag_visible_matches)
+
+    def start_searching(self, forward, mode='literal'):
         if self.searcher.is_searching():
+            if mode != self.searcher.mode:
+                self.searcher.set_mode(mode)
+                return
             self.searcher.configure_search(forward)
             self.searcher.next_match()
         else:
             self.set_mark()
-            self.searcher.start_searching()
+            self.searcher.start_searching(mode)
             self.searcher.configure_search(forward)
 
     def _search_handler(self, event):
@@ -663,8 +923,17 @@ class GraphicalEditor(object):
                 start = mid + 1
         return start
 
+    def _get_offset4(self, index):
+        # using line index
+        line, column = _parse_index(index)
+        if line is None:
+            line, column = _parse_index(self.text.index(index))
+        return self.line_index.get_offset(line, column)
+
     def get_offset(self, get_offset):
-        return self._get_offset3(get_offset)
+        if isinstance(get_offset, GraphicalTextIndex):
+            get_offset = get_offset._getIndex()
+        return self._get_offset4(get_offset)
 
     def set_status_bar_manager(self, manager):
         self.status_bar_manager = manager
@@ -708,6 +977,15 @@ class GraphicalTextIndex(object):
 
 
 class _TextChangeInspector(object):
+    """Track the region that has changed since `clear_changed()`
+
+    The region is kept as a pair of offsets that is updated for each
+    insert and delete without asking `Tkinter`, except for converting
+    indices other than ``line.column`` ones.  At most one call to
+    `change_observer` is scheduled for each idle period and none is
+    scheduled before the outermost `batch()` ends.
+
+    """
 
     def __init__(self, editor, change_observer=None):
         self.editor = editor
@@ -718,43 +996,52 @@ class _TextChangeInspector(object):
         self.old_edit = self.redirector.register('edit', self._edit)
         self.change_observer = change_observer
         self.changed_region = None
+        self.flush_scheduled = False
+        self.batch_depth = 0
 
     def _insert(self, *args):
-        start = self.text.index(args[0])
+        offset = self._get_offset(args[0])
         result = self.old_insert(*args)
-        end = self.text.index(start + ' +%dc' % len(args[1]))
-        if not start or not end:
-            return
-        if self.changed_region is not None:
-            if self.text.compare(start, '<', self.changed_region[1]):
-                end = self.text.index(self.changed_region[1] + ' +%dc' % len(args[1]))
-            if self.text.compare(self.changed_region[0], '<', start):
-                start = self.changed_region[0]
-        self.changed_region = (start, end)
-        self._notify_observer()
+        self.editor._text_modified()
+        if offset is None:
+            return result
+        line_index = self.editor.line_index
+        inserted = ''.join(args[1::2])
+        line, column = line_index.get_position(offset)
+        line_index.insert(line, column, inserted)
+        self.editor._lines_changed(line, line + inserted.count('\n'))
+        self._add_change(offset, offset, len(inserted))
         return result
 
-    def _notify_observer(self):
-        if self.is_changed() and self.change_observer:
-            self.text.after_idle(self.change_observer)
-
     def _delete(self, *args):
-        start = self.text.index(args[0])
+        if len(args) > 2:
+            # deleting more than one range
+            length = self.editor.line_index.get_length()
+            result = self.old_delete(*args)
+            self.editor._text_modified()
+            self.editor.line_index.reset(self.editor.get_text())
+            self.editor._lines_changed(1)
+            self._add_change(0, length, self.editor.line_index.get_length())
+            return result
+        start = self._get_offset(args[0])
+        end = None
+        if len(args) > 1 and args[1] is not None:
+            end = self._get_offset(args[1])
+        elif start is not None:
+            end = start + 1
         result = self.old_delete(*args)
-        end = start
-        if not start:
-            return
-        if self.changed_region is not None:
-            if self.text.compare(end, '<', self.changed_region[1]):
-                delete_len = 1
-                if len(args) > 1 and args[1] is not None:
-                    delete_len = self.editor.get_offset(str(self.text.index(args[1]))) - \
-                                 self.editor.get_offset(start)
-                end = self.text.index(self.changed_region[1] + ' -%dc' % delete_len)
-            if self.text.compare(self.changed_region[0], '<', start):
-                start = self.changed_region[0]
-        self.changed_region = (start, end)
-        self._notify_observer()
+        self.editor._text_modified()
+        if start is None or end is None:
+            return result
+        line_index = self.editor.line_index
+        end = min(end, line_index.get_length())
+        if end <= start:
+            return result
+        start_line, start_column = line_index.get_position(start)
+        end_line, end_column = line_index.get_position(end)
+        line_index.delete(start_line, start_column, end_line, end_column)
+        self.editor._lines_changed(start_line, end_line)
+        self._add_change(start, end, 0)
         return result
 
     def _edit(self, *args):
@@ -762,20 +1049,66 @@ class _TextChangeInspector(object):
             return self.old_edit(*args)
         start = self.text.index(INSERT)
         result = self.old_edit(*args)
+        self.editor._text_modified()
+        self.editor.line_index.reset(self.editor.get_text())
+        self.editor._lines_changed(1)
         end = self.text.index(INSERT)
-        if self.text.compare(end, '<', start):
+        start = self._get_offset(start)
+        end = self._get_offset(end)
+        if end < start:
             start, end = end, start
         if self.changed_region is not None:
-            if self.text.compare(self.changed_region[0], '<', start):
-                start = self.changed_region[0]
-            if self.text.compare(self.changed_region[1], '>', end):
-                end = self.changed_region[1]
+            length = self.editor.line_index.get_length()
+            start = min(start, self.changed_region[0], length)
+            end = min(max(end, self.changed_region[1]), length)
         self.changed_region = (start, end)
         self._notify_observer()
         return result
 
+    def _get_offset(self, index):
+        line, column = _parse_index(index)
+        if line is None:
+            line, column = _parse_index(self.text.index(index))
+            if line is None:
+                return None
+        return self.editor.line_index.get_offset(line, column)
+
+    def _add_change(self, start, end, length):
+        """Record replacing `start` to `end` with `length` characters"""
+        new_end = start + length
+        if self.changed_region is not None:
+            diff = length - (end - start)
+            old_start, old_end = self.changed_region
+            if old_start > end:
+                old_start += diff
+            if old_end >= end:
+                old_end += diff
+            elif old_end > start:
+                old_end = new_end
+            start = min(start, old_start)
+            new_end = max(new_end, old_end)
+        self.changed_region = (start, new_end)
+        self._notify_observer()
+
+    def _notify_observer(self):
+        if self.change_observer is not None and self.batch_depth == 0 and \
+           not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.text.after_idle(self._flush)
+
+    def _flush(self):
+        self.flush_scheduled = False
+        if self.is_changed():
+            self.change_observer()
+
+    def batch(self):
+        """Return a context that delays notifying changes until it ends"""
+        return _ChangeBatch(self)
+
     def get_changed_region(self):
-        return self.changed_region
+        if self.changed_region is not None:
+            start, end = self.changed_region
+            return (self.editor._get_index(start), self.editor._get_index(end))
 
     def is_changed(self):
         return self.changed_region is not None
@@ -784,6 +1117,39 @@ class _TextChangeInspector(object):
         self.changed_region = None
 
 
+class _ChangeBatch(object):
+
+    def __init__(self, change_inspector):
+        self.change_inspector = change_inspector
+
+    def __enter__(self):
+        self.change_inspector.batch_depth += 1
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.change_inspector.batch_depth -= 1
+        if self.change_inspector.is_changed():
+            self.change_inspector._notify_observer()
+
+
+_PENDING_HIGHLIGHT = 'pending_highlight'
+_SEARCH_MATCH = 'search_match'
+_edit_stamps = itertools.count()
+
+
+def _parse_index(index):
+    """Return the (line, column) pair of a `line.column` index
+
+    `(None, None)` is returned for other kinds of indices.
+
+    """
+    try:
+        line, column = str(index).split('.')
+        return int(line), int(column)
+    except ValueError:
+        return None, None
+
+
 class EditorFactory(object):
 
     def create(self):
@@ -827,6 +1193,67 @@ class GraphicalLineEditor(object):
         self.editor.text.insert('%d.0' % line_number, text)
 
 
+class _TagWriter(object):
+    """Apply tags using one `Tkinter` call for each style
+
+    The tags already present in a region are read using a single
+    ``dump`` command and only the ranges that have changed are removed
+    or added.
+
+    """
+
+    def __init__(self, editor, styles):
+        self.editor = editor
+        self.text = editor.text
+        self.styles = styles
+
+    def write(self, start, end, ranges):
+        """Make `ranges` the only tagged ranges from `start` to `end`
+
+        `ranges` contains (start, end, style) tuples and all offsets
+        are in characters.
+
+        """
+        old_ranges = self._get_ranges(start, end)
+        new_ranges = set(ranges)
+        self._apply('remove', old_ranges - new_ranges)
+        self._apply('add', new_ranges - old_ranges)
+
+    def _get_ranges(self, start, end):
+        start_index = self.editor._get_index(start)
+        end_index = self.editor._get_index(end)
+        opened = {}
+        for tag in self.text.tag_names(start_index):
+            if str(tag) in self.styles:
+                opened[str(tag)] = start
+        items = self.text.tk.splitlist(self.text.tk.call(
+            self.text._w, 'dump', '-tag', start_index, end_index))
+        result = set()
+        for i in range(0, len(items), 3):
+            tag = str(items[i + 1])
+            if tag not in self.styles:
+                continue
+            offset = self.editor.get_offset(str(items[i + 2]))
+            if str(items[i]) == 'tagon':
+                opened.setdefault(tag, offset)
+            elif tag in opened:
+                result.add((opened.pop(tag), offset, tag))
+            else:
+                result.add((start, offset, tag))
+        for tag, offset in opened.items():
+            result.add((offset, end, tag))
+        return result
+
+    def _apply(self, command, ranges):
+        indices = {}
+        for start, end, style in ranges:
+            indices.setdefault(style, []).extend(
+                [self.editor._get_index(start), self.editor._get_index(end)])
+        for style, style_indices in indices.items():
+            self.text.tk.call((self.text._w, 'tag', command, style) +
+                              tuple(style_indices))
+
+
 class _OffsetToIndexCacher(object):
     """A faster way to convert offset to `Tkinter` index
 
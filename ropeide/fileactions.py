@@ -1,14 +1,20 @@
 import os.path
+import re
 
 import Tkinter
 import tkFileDialog
+import tkMessageBox
 
+import rope.base.exceptions
 import rope.base.project
 from rope.contrib import generate
 import ropeide.actionhelpers
 import ropeide.core
+import ropeide.fuzzy
+import ropeide.grep
 from ropeide import uihelpers, tkhelpers
-from ropeide.actionhelpers import ConfirmEditorsAreSaved, simple_stoppable
+from ropeide.actionhelpers import (ConfirmEditorsAreSaved, simple_stoppable,
+                                   StoppableTaskRunner)
 from ropeide.extension import SimpleAction
 from ropeide.menubar import MenuAddress
 from ropeide.uihelpers import (TreeViewHandle, TreeView, find_item_dialog,
@@ -171,12 +177,9 @@ class _DoesFileMatch(object):
     def __init__(self):
         self.does_match = DoesMatch()
 
-    def __call__(self, pattern, file):
+    def __call__(self, pattern, path):
         slash_count = pattern.count('/')
-        if slash_count:
-            search_text = '/'.join(file.path.split('/')[-(slash_count + 1):])
-        else:
-            search_text = file.name
+        search_text = '/'.join(path.split('/')[-(slash_count + 1):])
         return self.does_match(pattern, search_text)
 
 
@@ -194,48 +197,65 @@ class _FileMatcher(object):
         return self.matcher.find_matches(starting)
 
 
-class FindFileHandle(uihelpers.FindItemHandle):
+class _FuzzyFileMatcher(object):
+    """Match file names fuzzily
 
-    def __init__(self, context):
-        self.core = context.core
-        self.project = context.project
-        self.matcher = None
+    Paths are matched for keywords with slashes and keywords with
+    wildcards are handled by `_FileMatcher`.
+
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.names = ropeide.fuzzy.FuzzyMatcher(files, _get_name)
+        self.paths = None
+        self.wildcards = None
 
     def find_matches(self, starting):
-        """Returns the Files in the project whose names starts with starting"""
-        if self.matcher is None:
-            files = list(self.project.get_files())
-            files.sort(cmp=self._compare_files)
-            self.matcher = _FileMatcher(files)
-        return self.matcher.find_matches(starting)
+        if '*' in starting or '?' in starting:
+            if self.wildcards is None:
+                self.wildcards = _FileMatcher(self.files)
+            return self.wildcards.find_matches(starting)
+        if '/' in starting:
+            if self.paths is None:
+                self.paths = ropeide.fuzzy.FuzzyMatcher(self.files)
+            return self.paths.find_matches(starting)
+        return self.names.find_matches(starting)
 
-    def _to_search_text(self, entry):
-        if entry.name == '__init__.py':
-            return [entry.parent.name, '__init__.py']
-        return entry.name
 
-    def selected(self, resource):
-        self.core.open_file(resource.path)
+def _get_name(path):
+    return path.rsplit('/', 1)[-1]
 
-    def to_string(self, resource):
-        return resource.path
 
-    def to_name(self, resource):
-        return resource.name
+class FindFileHandle(uihelpers.FindItemHandle):
+    """Find the files in the project file index
 
-    def _is_init_dot_py(self, file):
-        return file.name == '__init__.py'
+    The matcher is kept for later dialogs until the files of the
+    project change.
 
-    def _compare_files(self, file1, file2):
-        if self._is_init_dot_py(file1) or self._is_init_dot_py(file2):
-            if self._is_init_dot_py(file1) and not self._is_init_dot_py(file2):
-                return 1
-            if not self._is_init_dot_py(file1) and self._is_init_dot_py(file2):
-                return -1
-            return cmp(file1.path, file2.path)
-        if file1.name != file2.name:
-            return cmp(file1.name, file2.name)
-        return cmp(file1.path, file2.path)
+    """
+
+    matcher = None
+
+    def __init__(self, context):
+        self.core = context.core
+
+    def find_matches(self, starting):
+        """Return the best matching files in the project"""
+        files = self.core.get_file_index().get_files()
+        if FindFileHandle.matcher is None or \
+           FindFileHandle.matcher.files is not files:
+            FindFileHandle.matcher = _FuzzyFileMatcher(files)
+        return FindFileHandle.matcher.find_matches(starting)
+
+    def selected(self, path):
+        self.core.open_file(path)
+
+    def to_string(self, path):
+        return path
+
+    def to_name(self, path):
+        return _get_name(path)
 
 
 def find_file(context):
@@ -245,6 +265,94 @@ def find_file(context):
                      matches='Matching Files')
 
 
+class _GrepListHandle(uihelpers.EnhancedListHandle):
+
+    def __init__(self, toplevel, core):
+        self.toplevel = toplevel
+        self.editor_manager = core.get_editor_manager()
+
+    def entry_to_string(self, entry):
+        return '%s:%d: %s' % (entry.resource.path, entry.lineno,
+                              entry.line.strip())
+
+    def canceled(self):
+        self.toplevel.destroy()
+
+    def selected(self, selected):
+        editor = self.editor_manager.get_resource_editor(
+            selected.resource).get_editor()
+        editor.goto_line(selected.lineno)
+
+
+def _show_grep_results(context, keyword, regex):
+    try:
+        ropeide.grep.get_pattern(keyword, regex)
+    except re.error, e:
+        context.core._report_error('Invalid regular expression: %s' % e,
+                                   'Grep Project')
+        return
+    toplevel = Tkinter.Toplevel()
+    toplevel.title('Grep Project')
+    enhanced_list = uihelpers.EnhancedList(
+        toplevel, _GrepListHandle(toplevel, context.core),
+        title='Matches Of <%s>' % keyword, width=80)
+    # matches are found in another thread and added in the main loop
+    found = []
+    def add_found():
+        while found:
+            for match in found.pop(0):
+                enhanced_list.add_entry(match)
+    def poll():
+        add_found()
+        if toplevel.winfo_exists():
+            toplevel.after(100, poll)
+    def calculate(handle):
+        grep = ropeide.grep.ProjectGrep(
+            context.project, keyword, regex,
+            index=context.core.get_trigram_index())
+        return grep.run(found.append, handle)
+    poll()
+    try:
+        StoppableTaskRunner(calculate, title='Grepping Project')()
+    except rope.base.exceptions.InterruptedTaskError:
+        pass
+    add_found()
+    def close(event):
+        toplevel.destroy()
+    toplevel.bind('<Escape>', close)
+    toplevel.bind('<Control-g>', close)
+    enhanced_list.list.focus_set()
+
+
+def grep_project(context):
+    if not ropeide.actionhelpers.check_project(context.core):
+        return
+    toplevel = Tkinter.Toplevel()
+    toplevel.title('Grep Project')
+    frame = Tkinter.Frame(toplevel)
+    label = Tkinter.Label(frame, text='Search For')
+    entry = Tkinter.Entry(frame, width=40)
+    regex = Tkinter.IntVar()
+    regex_button = Tkinter.Checkbutton(frame, text='Regular Expression',
+                                       variable=regex)
+    def ok(event=None):
+        keyword = entry.get()
+        is_regex = regex.get()
+        toplevel.destroy()
+        if keyword:
+            _show_grep_results(context, keyword, is_regex)
+    def cancel(event=None):
+        toplevel.destroy()
+    entry.bind('<Return>', ok)
+    entry.bind('<Escape>', cancel)
+    entry.bind('<Control-g>', cancel)
+    label.grid(row=0, column=0, sticky=Tkinter.W)
+    entry.grid(row=0, column=1)
+    regex_button.grid(row=1, column=1, sticky=Tkinter.W)
+    frame.grid()
+    entry.focus_set()
+
+
 class _ResourceViewHandle(TreeViewHandle):
 
     def __init__(self, core, toplevel):
@@ -439,6 +547,24 @@ def undo_project(context):
             'Undoing <%s>\n\n' % str(history.undo_list[-1]) +
             'Undo project might change many files. Proceed?', undo)
 
+def index_project_text(context):
+    if not ropeide.actionhelpers.check_project(context.core):
+        return
+    index = context.core.get_trigram_index()
+    if index is None:
+        index = context.core.create_trigram_index()
+    def calculate(handle):
+        index.build(handle)
+    try:
+        StoppableTaskRunner(calculate, title='Indexing Project Text')()
+    except rope.base.exceptions.InterruptedTaskError:
+        return
+    tkMessageBox.showinfo(
+        'Project Text Index',
+        'Indexed %d files in %.1f seconds; the index takes about %d KB.' %
+        (index.get_file_count(), index.build_time, index.get_size() / 1024))
+
+
 def redo_project(context):
     if context.project:
         history = context.project.history
@@ -466,6 +592,11 @@ actions.append(SimpleAction('close_project', close_project, 'C-x p k',
 
 actions.append(SimpleAction('find_file', find_file, 'C-x C-f',
                             MenuAddress(['File', 'Find File...'], 'f', 1)))
+actions.append(SimpleAction('grep_project', grep_project, 'C-x p g',
+                            MenuAddress(['File', 'Grep Project...'], 'g', 1)))
+actions.append(
+    SimpleAction('index_project_text', index_project_text, 'C-x p i',
+                 MenuAddress(['File', 'Index Project Text'], None, 1)))
 core.add_menu_cascade(MenuAddress(['File', 'New'], 'n', 1), ['all', 'none'])
 actions.append(SimpleAction('create_file', create_file, 'C-x n f',
                             MenuAddress(['File', 'New', 'New File...'], 'f')))
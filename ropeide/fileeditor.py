@@ -1,4 +1,5 @@
 import rope.base.exceptions
+import ropeide.outline
 import ropeide.uihelpers
 from rope.base.resourceobserver import ResourceObserver, FilteredResourceObserver
 from ropeide import editingcontexts
@@ -25,6 +26,7 @@ class FileEditor(object):
         self._register_observers()
         self.saving = False
         self.readonly = readonly
+        self.outline = None
         #if readonly:
         #    self.editor.getWidget()['state'] = Tkinter.DISABLED
 
@@ -88,5 +90,11 @@ class FileEditor(object):
     def get_file(self):
         return self.file
 
+    def get_outline(self):
+        """Return the `ropeide.outline.OutlineModel` of the editor"""
+        if self.outline is None:
+            self.outline = ropeide.outline.OutlineModel(self.editor)
+        return self.outline
+
     def close(self):
         self._remove_observers()
@@ -0,0 +1,152 @@
+"""An index of project files that is saved in the project"""
+from rope.base.resourceobserver import (ResourceObserver,
+                                        FilteredResourceObserver)
+
+
+class FileIndex(object):
+    """Keep the paths of the files of a project
+
+    Like rope's own file list, the folders of the project are
+    registered in a `FilteredResourceObserver` and the files of a
+    folder are updated when it changes.  The index is saved in the
+    project's rope folder when the project is closed, together with
+    the modification times of the folders and the sorted paths, so
+    when the project is opened again only the folders that are changed
+    since then are listed; see `update()`.
+
+    """
+
+    def __init__(self, project):
+        self.project = project
+        self.folders = {}
+        self.paths = None
+        self.observer = FilteredResourceObserver(ResourceObserver(
+            self._changed, self._moved, self._created, self._removed))
+        self.loaded = self._read()
+        self.updated = False
+        project.add_observer(self.observer)
+        project.data_files.add_write_hook(self.write)
+
+    def get_files(self):
+        """Return the sorted paths of project files
+
+        ``__init__.py`` files come last and the others are sorted by
+        name.  The returned list is not changed later; a new list is
+        returned when the files change.
+
+        """
+        self.update()
+        if self.paths is None:
+            paths = []
+            for folder, names in self.folders.iteritems():
+                prefix = ''
+                if folder:
+                    prefix = folder + '/'
+                paths.extend([prefix + name for name in names])
+            paths.sort(key=_get_sort_key)
+            self.paths = paths
+        return self.paths
+
+    def update(self):
+        """Make sure the index matches the files on disk
+
+        Only the first call does something.  If the index was read from
+        the rope folder, the saved folders are validated; otherwise
+        all folders of the project are listed.
+
+        """
+        if self.updated:
+            return
+        self.updated = True
+        if self.loaded:
+            self.observer.validate(self.project.root)
+        else:
+            self._add_folder(self.project.root)
+
+    def write(self):
+        paths = None
+        if self.paths is not None:
+            paths = '\n'.join(self.paths)
+        data = {}
+        for folder, indicator in self.observer.resources.iteritems():
+            if indicator is not None and folder.path in self.folders:
+                data[folder.path] = (indicator,
+                                     '/'.join(self.folders[folder.path]))
+        self.project.data_files.write_data(
+            'fileindex', {'version': 1, 'folders': data, 'paths': paths})
+
+    def close(self):
+        self.project.remove_observer(self.observer)
+
+    def _read(self):
+        data = self.project.data_files.read_data('fileindex')
+        if not isinstance(data, dict) or data.get('version') != 1:
+            return False
+        # file names are joined with slashes since it is faster
+        for path, (indicator, names) in data['folders'].iteritems():
+            self.folders[path] = set(_split(names, '/'))
+            self.observer.resources[self.project.get_folder(path)] = indicator
+        if data['paths'] is not None:
+            self.paths = _split(data['paths'], '\n')
+        return True
+
+    def _add_folder(self, folder):
+        """List the files of `folder` and its new subfolders"""
+        subfolders = self._update_folder(folder)
+        while subfolders:
+            folder = subfolders.pop()
+            if folder.path not in self.folders:
+                subfolders.extend(self._update_folder(folder))
+
+    def _update_folder(self, folder):
+        names = set()
+        subfolders = []
+        for child in folder.get_children():
+            if child.is_folder():
+                subfolders.append(child)
+            else:
+                names.add(child.name)
+        self.folders[folder.path] = names
+        self.observer.add_resource(folder)
+        self.paths = None
+        return subfolders
+
+    def _remove_folder(self, folder):
+        prefix = folder.path + '/'
+        for resource in list(self.observer.resources):
+            if resource.path.startswith(prefix):
+                self.observer.remove_resource(resource)
+        for path in list(self.folders):
+            if path == folder.path or path.startswith(prefix):
+                del self.folders[path]
+        self.paths = None
+
+    def _changed(self, resource):
+        if resource.is_folder() and resource.exists():
+            self._add_folder(resource)
+
+    def _moved(self, resource, new_resource):
+        self._removed(resource)
+        self._created(new_resource)
+
+    def _created(self, resource):
+        if resource.is_folder() and resource.exists():
+            self._add_folder(resource)
+
+    def _removed(self, resource):
+        # `FilteredResourceObserver` reports the folders inside
+        # `resource`, too, after marking each of them as removed
+        self.observer.remove_resource(resource)
+        if resource.path in self.folders:
+            self._remove_folder(resource)
+
+
+def _get_sort_key(path):
+    name = path.rsplit('/', 1)[-1]
+    return (name == '__init__.py', name, path)
+
+
+def _split(text, separator):
+    if not text:
+        return []
+    return text.split(separator)
@@ -0,0 +1,147 @@
+"""Fuzzy matching and ranking of names"""
+import heapq
+import re
+
+
+class FuzzyMatcher(object):
+    """Find the entries whose texts contain a keyword as a subsequence
+
+    Matching entries are ranked using `get_score()` and at most
+    `limit` of them are returned, best first.  Keywords that contain
+    upper case letters are matched case sensitively.  If `get_bonus`
+    is given, it is called with an entry and the result is added to
+    its score.
+
+    The lower case texts of the entries are joined into one string
+    and searched with a regular expression.  The matched lines are
+    kept for narrowing the matches when the keyword is extended.
+    Every matching entry is scored and the best ones are selected
+    with a heap.
+
+    """
+
+    def __init__(self, entries, to_search_text=str, limit=50,
+                 get_bonus=None):
+        self.entries = list(entries)
+        self.texts = [to_search_text(entry) for entry in self.entries]
+        self.limit = limit
+        self.get_bonus = get_bonus
+        self.joined = None
+        self.last_keyword = None
+        self.last_matched = None
+
+    def find_matches(self, keyword):
+        if not keyword:
+            return []
+        case = not keyword.islower()
+        lowered = keyword.lower()
+        scored = []
+        for index in self._get_indices(self._get_matched(lowered)):
+            score = get_score(keyword, self.texts[index], case)
+            if score is not None:
+                if self.get_bonus is not None:
+                    score += self.get_bonus(self.entries[index])
+                scored.append((score, -index))
+        return [self.entries[-index]
+                for score, index in heapq.nlargest(self.limit, scored)]
+
+    def invalidate(self):
+        self.last_keyword = None
+        self.last_matched = None
+
+    def _get_matched(self, keyword):
+        """Return the joined lines of the texts that match `keyword`"""
+        if keyword == self.last_keyword:
+            return self.last_matched
+        if self.last_keyword is not None and \
+           keyword.startswith(self.last_keyword):
+            lines = self.last_matched
+        else:
+            lines = self._get_joined()
+        found = _get_subsequence_pattern(keyword).findall(lines)
+        matched = '\n'
+        if found:
+            matched = '\n%s\n' % '\n'.join(found)
+        self.last_keyword = keyword
+        self.last_matched = matched
+        return matched
+
+    def _get_joined(self):
+        """Return a line for each entry containing its text and index"""
+        if self.joined is None:
+            lines = ['%s\0%d' % (text.replace('\n', ' ').lower(), index)
+                     for index, text in enumerate(self.texts)]
+            self.joined = '\n%s\n' % '\n'.join(lines)
+        return self.joined
+
+    def _get_indices(self, lines):
+        """Return the indices of the entries in joined `lines`"""
+        return [int(line[line.rindex('\0') + 1:])
+                for line in lines.split('\n') if line]
+
+
+def _get_subsequence_pattern(keyword):
+    pattern = []
+    for char in keyword:
+        char = re.escape(char)
+        pattern.append('[^%s\n\0]*%s' % (char, char))
+    return re.compile('\n(%s[^\n]*)' % ''.join(pattern))
+
+
+_separators = '/_-. '
+
+
+def get_score(keyword, text, case=True):
+    """Return the score of matching `keyword` with `text` or `None`
+
+    The characters of `keyword` should appear in `text` in the same
+    order.  Characters matched consecutively or at the start of words,
+    either after separators or at camel case humps, score more and
+    shorter texts score more, too.
+
+    """
+    search_text = text
+    if not case:
+        search_text = text.lower()
+    score = 0
+    start = 0
+    last = -2
+    for index, char in enumerate(keyword):
+        found = search_text.find(char, start)
+        if found == -1:
+            return None
+        if found != last + 1 and not _is_word_start(text, found):
+            word_start = _find_word_start(text, search_text, char, found + 1)
+            if word_start != -1 and _is_subsequence(
+                keyword[index + 1:], search_text, word_start + 1):
+                found = word_start
+        score += 1
+        if found == last + 1:
+            score += 4
+        else:
+            score -= min(found - start, 3)
+        if _is_word_start(text, found):
+            score += 5
+        last = found
+        start = found + 1
+    return score * 16 - len(text)
+
+
+def _is_word_start(text, offset):
+    return offset == 0 or text[offset - 1] in _separators or \
+           (text[offset].isupper() and text[offset - 1].islower())
+
+
+def _find_word_start(text, search_text, char, start):
+    found = search_text.find(char, start)
+    while found != -1 and not _is_word_start(text, found):
+        found = search_text.find(char, found + 1)
+    return found
+
+
+def _is_subsequence(keyword, text, start):
+    for char in keyword:
+        start = text.find(char, start) + 1
+        if start == 0:
+            return False
+    return True
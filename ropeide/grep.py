@@ -0,0 +1,259 @@
+"""Searching the text of project files"""
+import mmap
+import os
+import Queue
+import re
+import threading
+
+import rope.base.change
+import rope.base.exceptions
+import rope.base.fscommands
+import rope.base.taskhandle
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+
+class GrepMatch(object):
+
+    def __init__(self, resource, offset, lineno, line):
+        self.resource = resource
+        self.offset = offset
+        self.lineno = lineno
+        self.line = line
+
+
+def get_pattern(keyword, regex=False, case=None):
+    """Return the compiled pattern for searching `keyword`
+
+    If `case` is `None` the search is case sensitive only if
+    `keyword` contains upper case letters.
+
+    """
+    return re.compile(*_get_pattern_args(keyword, regex, case))
+
+
+def _get_pattern_args(keyword, regex, case):
+    if case is None:
+        case = not keyword.islower()
+    if not regex:
+        keyword = re.escape(keyword)
+    flags = re.MULTILINE
+    if not case:
+        flags |= re.IGNORECASE
+    return keyword, flags
+
+
+def grep_file(path, pattern, mmap_size=1024 * 1024):
+    """Return (offset, lineno, line) tuples for matches in a file
+
+    Files larger than `mmap_size` bytes are memory-mapped instead of
+    being read at once.  Binary files are ignored.
+
+    """
+    input = open(path, 'rb')
+    try:
+        size = os.fstat(input.fileno()).st_size
+        if size == 0:
+            return []
+        if size > mmap_size:
+            data = mmap.mmap(input.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = input.read()
+        try:
+            if '\0' in data[:1024]:
+                return []
+            return _find_matches(data, pattern)
+        finally:
+            if size > mmap_size:
+                data.close()
+    finally:
+        input.close()
+
+
+def _find_matches(data, pattern):
+    result = []
+    lineno = 1
+    last = 0
+    for match in pattern.finditer(data):
+        start = match.start()
+        if start < last:
+            continue
+        lineno += data[last:start].count('\n')
+        line_start = data.rfind('\n', 0, start) + 1
+        line_end = data.find('\n', start)
+        if line_end == -1:
+            line_end = len(data)
+        result.append((start, lineno, data[line_start:line_end]))
+        # reporting each line once
+        last = line_end
+    return result
+
+
+class ProjectGrep(object):
+    """Search the files of a project in a pool of threads
+
+    Files are searched in `workers` threads while matches are
+    collected in the calling thread so that they can be shown as soon
+    as they are found.  If `index`, a `ropeide.trigrams.TrigramIndex`,
+    is given only the files it returns are searched.
+
+    """
+
+    def __init__(self, project, keyword, regex=False, case=None, workers=4,
+                 index=None):
+        self.project = project
+        self.keyword = keyword
+        self.regex = regex
+        self.pattern = get_pattern(keyword, regex, case)
+        self.workers = workers
+        self.index = index
+
+    def run(self, found, task_handle=rope.base.taskhandle.NullTaskHandle()):
+        """Search the files calling `found` for each file with matches
+
+        `found` is called with a list of `GrepMatch`\s in the calling
+        thread.  The number of matches is returned.
+
+        """
+        files = _get_files(self.project, self.index, self.keyword,
+                           self.regex, task_handle)
+        job_set = task_handle.create_jobset('Grepping Files', len(files))
+        paths = Queue.Queue()
+        for resource in files:
+            paths.put(resource)
+        results = Queue.Queue()
+        stopped = []
+        for i in range(min(self.workers, len(files))):
+            thread = threading.Thread(target=self._search,
+                                      args=(paths, results, stopped))
+            thread.setDaemon(True)
+            thread.start()
+        count = 0
+        try:
+            for i in range(len(files)):
+                resource, matches = self._get_result(results, job_set)
+                job_set.started_job(resource.path)
+                if matches:
+                    found([GrepMatch(resource, offset, lineno, line)
+                           for offset, lineno, line in matches])
+                    count += len(matches)
+                job_set.finished_job()
+        finally:
+            stopped.append(True)
+        return count
+
+    def _get_result(self, results, job_set):
+        while True:
+            try:
+                return results.get(timeout=0.1)
+            except Queue.Empty:
+                job_set.check_status()
+
+    def _search(self, paths, results, stopped):
+        while not stopped:
+            try:
+                resource = paths.get_nowait()
+            except Queue.Empty:
+                return
+            matches = []
+            try:
+                try:
+                    matches = grep_file(resource.real_path, self.pattern)
+                except Exception:
+                    # a result is posted for each file even if the
+                    # pattern fails; otherwise `run()` would wait forever
+                    pass
+            finally:
+                results.put((resource, matches))
+
+
+class ProjectReplace(object):
+    """Replace the matches of a keyword in the files of a project
+
+    Files are searched and replaced in a pool of `processes` processes
+    if `multiprocessing` module is available; by default there is one
+    process for each CPU.  The result is a `ChangeSet` of
+    `ChangeContents` changes, whose diffs are computed only when
+    asked for.  Like `ProjectGrep`, files can be narrowed using
+    `index`.
+
+    """
+
+    def __init__(self, project, keyword, replacement, regex=False,
+                 case=None, processes=None, index=None):
+        self.project = project
+        self.keyword = keyword
+        self.regex = regex
+        self.index = index
+        self.replacement = replacement
+        self.pattern, self.flags = _get_pattern_args(keyword, regex, case)
+        if not regex:
+            self.replacement = replacement.replace('\\', '\\\\')
+        try:
+            re.compile(self.pattern, self.flags).sub(self.replacement, '')
+        except (re.error, IndexError), e:
+            raise rope.base.exceptions.RefactoringError(
+                'Bad pattern or replacement: %s' % e)
+        self.processes = processes
+
+    def get_changes(self, task_handle=rope.base.taskhandle.NullTaskHandle()):
+        files = _get_files(self.project, self.index, self.keyword,
+                           self.regex, task_handle)
+        job_set = task_handle.create_jobset('Replacing In Files', len(files))
+        resources = {}
+        jobs = []
+        for resource in files:
+            resources[resource.real_path] = resource
+            jobs.append((resource.real_path, self.pattern,
+                         self.flags, self.replacement))
+        changes = rope.base.change.ChangeSet(
+            'Replacing <%s> with <%s>' % (self.keyword, self.replacement))
+        pool = None
+        if multiprocessing is not None and self.processes != 1 and \
+           len(jobs) > 1:
+            pool = multiprocessing.Pool(self.processes)
+            results = pool.imap_unordered(_replace_in_file, jobs, 16)
+        else:
+            results = (_replace_in_file(job) for job in jobs)
+        try:
+            for path, new_contents in results:
+                job_set.started_job(resources[path].path)
+                if new_contents is not None:
+                    changes.add_change(rope.base.change.ChangeContents(
+                        resources[path], new_contents))
+                job_set.finished_job()
+        finally:
+            if pool is not None:
+                pool.terminate()
+        changes.changes.sort(key=lambda change: change.resource.path)
+        return changes
+
+
+def _get_files(project, index, keyword, regex, task_handle):
+    if index is None:
+        return project.get_files()
+    return [project.get_file(path) for path in
+            index.get_candidates(keyword, regex, task_handle)]
+
+
+def _replace_in_file(job):
+    """Return the path and the new contents of the file or `None`
+
+    This function is called in worker processes and should not use
+    project objects.
+
+    """
+    path, pattern, flags, replacement = job
+    try:
+        data = open(path, 'rb').read()
+        if '\0' in data[:1024]:
+            return path, None
+        text = rope.base.fscommands.file_data_to_unicode(data)
+    except (EnvironmentError, UnicodeDecodeError):
+        return path, None
+    new_text, count = re.compile(pattern, flags).subn(replacement, text)
+    if count == 0:
+        return path, None
+    return path, new_text
@@ -1,5 +1,8 @@
 import keyword
 import re
+import threading
+import tokenize
+import traceback
 
 import rope.base.codeanalyze
 
@@ -23,6 +26,16 @@ class Highlighting(object):
                     # print a, b, key
                     yield (start + a, start + b, key)
 
+    def create_line_states(self):
+        """Return a `LineStates` or `None`
+
+        Highlightings that can tell the lexer state at the end of each
+        line return a `LineStates` that finds the regions to be
+        updated after changes.  Otherwise
+        `get_suspected_region_after_change()` is used.
+
+        """
+
     def get_suspected_region_after_change(self, text, change_start, change_end):
         """Return the range that needs to be updated after a change"""
         start = min(change_start, len(text) - 1)
@@ -34,6 +47,15 @@ class Highlighting(object):
     def _make_pattern(self):
         """Return highlighting patterns"""
 
+    def _get_pattern_key(self):
+        """Return the key for sharing compiled patterns
+
+        Highlightings whose patterns depend on some configuration
+        should include it in the key.
+
+        """
+        return self.__class__
+
     def _get_line_start(self, text, index):
         current = index - 1
         while current > 0:
@@ -52,10 +74,99 @@ class Highlighting(object):
 
     def _get_pattern(self):
         if not self.pattern:
-            self.pattern = self._make_pattern()
+            key = self._get_pattern_key()
+            if key not in _patterns:
+                _patterns[key] = self._make_pattern()
+            self.pattern = _patterns[key]
         return self.pattern
 
 
+# compiled patterns shared by all highlightings of the same kind
+_patterns = {}
+
+
+class LineStates(object):
+    """Cache the lexer state at the end of each line
+
+    `get_state` is called with a line and the state at its start and
+    should return the state at its end; `None` means normal code.
+    After a change only the lines from the changed one to the first
+    line whose end state has not changed are scanned again.
+
+    """
+
+    def __init__(self, get_state):
+        self.get_state = get_state
+        self.states = []
+
+    def reset(self, text):
+        self.states = []
+        state = None
+        for line in text.split('\n'):
+            state = self.get_state(line, state)
+            self.states.append(state)
+
+    def update(self, text, change_start, change_end):
+        """Update line states and return the range to highlight again
+
+        `change_start` and `change_end` are offsets in the new `text`
+        and should contain all of the changes.
+
+        """
+        if not self.states:
+            self.reset(text)
+            return (0, len(text))
+        old_states = self.states
+        line_count = text.count('\n') + 1
+        delta = line_count - len(old_states)
+        first = text.count('\n', 0, change_start)
+        last = first + text.count('\n', change_start, change_end)
+        states = old_states[:first]
+        state = None
+        if first > 0:
+            state = states[first - 1]
+        start = text.rfind('\n', 0, change_start) + 1
+        offset = start
+        lineno = first
+        while lineno < line_count:
+            line_end = text.find('\n', offset)
+            if line_end == -1:
+                line_end = len(text)
+            state = self.get_state(text[offset:line_end], state)
+            states.append(state)
+            offset = line_end + 1
+            lineno += 1
+            old_lineno = lineno - 1 - delta
+            if lineno > last and 0 <= old_lineno < len(old_states) and \
+               old_states[old_lineno] == state:
+                break
+        states.extend(old_states[lineno - delta:])
+        self.states = states
+        return self._extend_region(text, first, lineno - 1, start, offset - 1)
+
+    def get_region(self, text, start, end):
+        """Extend a region to start and end at lines outside strings"""
+        first = text.count('\n', 0, start)
+        last = first + text.count('\n', start, end)
+        start = text.rfind('\n', 0, start) + 1
+        end = text.find('\n', end)
+        if end == -1:
+            end = len(text)
+        return self._extend_region(text, first, last, start, end)
+
+    def _extend_region(self, text, first, last, start, end):
+        states = self.states
+        while first > 0 and states[first - 1] is not None:
+            first -= 1
+            start = text.rfind('\n', 0, start - 1) + 1
+        while last < len(states) - 1 and states[last] is not None:
+            last += 1
+            end = text.find('\n', end + 1)
+            if end == -1:
+                end = len(text)
+        return (start, end)
+
+
 class HighlightingStyle(object):
 
     def __init__(self, color=None, bold=None, italic=None,
@@ -96,6 +207,30 @@ class PythonHighlighting(Highlighting):
                 'builtin': HighlightingStyle(color='#908080'),
                 'definition': HighlightingStyle(color='purple', bold=True)}
 
+    def create_line_states(self):
+        return LineStates(self._get_line_end_state)
+
+    def _get_line_end_state(self, line, state):
+        index = 0
+        while True:
+            if state is not None:
+                for match in _get_string_end_pattern(state).finditer(line, index):
+                    if match.group() == state:
+                        index = match.end()
+                        break
+                else:
+                    # short strings continue only after a backslash
+                    if len(state) == 3 or \
+                       (len(line) - len(line.rstrip('\\'))) % 2 == 1:
+                        return state
+                    return None
+                state = None
+            match = _string_start_pattern.search(line, index)
+            if match is None or match.group() == '#':
+                return None
+            state = match.group()
+            index = match.end()
+
     def get_suspected_region_after_change(self, text, change_start, change_end):
         start, end = super(PythonHighlighting, self).\
                      get_suspected_region_after_change(text, change_start, change_end)
@@ -129,6 +264,145 @@ class PythonHighlighting(Highlighting):
         return len(text)
 
 
+_string_start_pattern = re.compile('#|"""|\'\'\'|"|\'')
+_string_end_patterns = {}
+
+def _get_string_end_pattern(quote):
+    if quote not in _string_end_patterns:
+        _string_end_patterns[quote] = re.compile(r'\\.|' + quote)
+    return _string_end_patterns[quote]
+
+
+class TokenizeHighlighting(PythonHighlighting):
+    """Highlight python code using the patterns of `tokenize` module
+
+    Tokens are matched one after another and strings are completed
+    using `tokenize.endprogs`; unlike the single pattern used in
+    `PythonHighlighting` the time spent is linear even for
+    unterminated strings.  Numbers and decorators are highlighted,
+    too.
+
+    """
+
+    def get_styles(self):
+        styles = super(TokenizeHighlighting, self).get_styles()
+        styles['number'] = HighlightingStyle(color='#800000')
+        styles['decorator'] = HighlightingStyle(color='#805000')
+        return styles
+
+    def highlights(self, text, start, end):
+        if end is None:
+            end = len(text)
+        keywords, builtins = _get_python_names()
+        line_start = start == 0 or text[start - 1] == '\n'
+        definition = False
+        previous = None
+        pos = start
+        while pos < end:
+            match = tokenize.pseudoprog.match(text, pos, end)
+            if match is None:
+                pos = _whitespace_pattern.match(text, pos, end).end()
+                if pos < end and text[pos] in '\'"':
+                    # an unterminated string; matching it again at
+                    # every following quote would take quadratic time
+                    line_end = text.find('\n', pos, end)
+                    if line_end == -1:
+                        line_end = end
+                    yield (pos, line_end, 'string')
+                    pos = line_end
+                else:
+                    pos += 1
+                continue
+            token_start, token_end = match.span(1)
+            if token_start == token_end:
+                break
+            token = text[token_start:token_end]
+            initial = token[0]
+            kind = None
+            if token in tokenize.triple_quoted or \
+               token[:3] in tokenize.single_quoted or \
+               token[:2] in tokenize.single_quoted or \
+               initial in tokenize.single_quoted:
+                token_end = self._get_string_end(text, token, token_end, end)
+                kind = 'string'
+            elif initial.isalpha() or initial == '_':
+                if token_end < end and text[token_end] in '\'"' and \
+                   token.lower() in _string_prefixes:
+                    # prefixes unknown to `tokenize` like ``f`` or ``rb``
+                    quote = tokenize.pseudoprog.match(text, token_end, end)
+                    if quote is not None:
+                        token_end = self._get_string_end(
+                            text, quote.group(1), quote.end(1), end)
+                    else:
+                        token_end = text.find('\n', token_end, end)
+                        if token_end == -1:
+                            token_end = end
+                    kind = 'string'
+                elif token in keywords:
+                    kind = 'keyword'
+                    if line_start and token in ('def', 'class'):
+                        kind = 'defkeyword'
+                elif definition:
+                    kind = 'definition'
+                elif token in builtins and previous != '.':
+                    kind = 'builtin'
+            elif initial == '#':
+                kind = 'comment'
+            elif initial.isdigit() or (initial == '.' and token != '.'):
+                kind = 'number'
+            elif token == '@' and line_start:
+                token_end = _decorator_pattern.match(text, token_end, end).end()
+                kind = 'decorator'
+            if kind is not None:
+                yield (token_start, token_end, kind)
+            definition = kind == 'defkeyword'
+            line_start = token in ('\n', '\r\n')
+            previous = token
+            pos = token_end
+
+    def _get_string_end(self, text, token, token_end, end):
+        if token in tokenize.triple_quoted:
+            endprog = tokenize.endprogs[token]
+            match = endprog.match(text, token_end, end)
+            if match is None:
+                return end
+            return match.end()
+        if token[-1] != '\n':
+            return token_end
+        # a string continued using backslashes
+        quote = token.lstrip('uUbBrR')[0]
+        endprog = tokenize.endprogs[quote]
+        pos = token_end
+        while pos < end:
+            line_end = text.find('\n', pos, end)
+            if line_end == -1:
+                line_end = end
+            match = endprog.match(text, pos, line_end)
+            if match is not None:
+                return match.end()
+            line = text[pos:line_end]
+            if (len(line) - len(line.rstrip('\\'))) % 2 == 0:
+                return line_end
+            pos = line_end + 1
+        return end
+
+
+_string_prefixes = set(['f', 'b', 'r', 'u', 'fr', 'rf', 'br', 'rb', 'ur'])
+_whitespace_pattern = re.compile(r'[ \t\f]*')
+_decorator_pattern = re.compile(r'[ \t]*[a-zA-Z_]\w*(?:[ \t]*\.[ \t]*[a-zA-Z_]\w*)*|')
+_python_names = []
+
+def _get_python_names():
+    """Return the sets of python keywords and builtins"""
+    if not _python_names:
+        import __builtin__
+        builtins = [str(name) for name in dir(__builtin__)
+                    if not name.startswith('_')]
+        _python_names.append(set(keyword.kwlist))
+        _python_names.append(set(builtins) - set(keyword.kwlist))
+    return _python_names
+
+
 class NoHighlighting(Highlighting):
 
     def get_styles(self):
@@ -225,3 +499,76 @@ class ReSTHighlighting(Highlighting):
             if line.startswith('%s ' % mark):
                 return True
         return False
+
+
+class HighlightingWorker(object):
+    """Compute highlights in a separate thread
+
+    Each client has at most one waiting request and a new request
+    replaces the older one.  The text should not be changed after
+    being passed to `request()`; `str` snapshots returned from
+    editors' `get_text()` are fine.  `done` callbacks are called in
+    the worker thread.
+
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.requests = {}
+        self.clients = []
+        self.thread = None
+
+    def request(self, client, highlighting, text, start, end, done):
+        """Highlight `text` from `start` to `end` and call `done`
+
+        `done` is called with the list of highlights.
+
+        """
+        self.condition.acquire()
+        try:
+            if client not in self.requests:
+                self.clients.append(client)
+            self.requests[client] = (highlighting, text, start, end, done)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run)
+                self.thread.setDaemon(True)
+                self.thread.start()
+            self.condition.notify()
+        finally:
+            self.condition.release()
+
+    def cancel(self, client):
+        """Forget the waiting request of `client`"""
+        self.condition.acquire()
+        try:
+            if client in self.requests:
+                del self.requests[client]
+                self.clients.remove(client)
+        finally:
+            self.condition.release()
+
+    def _run(self):
+        while True:
+            highlighting, text, start, end, done = self._next_request()
+            try:
+                done(list(highlighting.highlights(text, start, end)))
+            except Exception:
+                traceback.print_exc()
+
+    def _next_request(self):
+        self.condition.acquire()
+        try:
+            while not self.clients:
+                self.condition.wait()
+            return self.requests.pop(self.clients.pop(0))
+        finally:
+            self.condition.release()
+
+
+_workers = []
+
+def get_highlighting_worker():
+    """Return the `HighlightingWorker` shared by all editors"""
+    if not _workers:
+        _workers.append(HighlightingWorker())
+    return _workers[0]
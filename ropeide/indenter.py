@@ -1,3 +1,5 @@
+from __future__ import with_statement
+
 import re
 
 from rope.base import codeanalyze
@@ -14,6 +16,12 @@ class TextIndenter(object):
     def correct_indentation(self, lineno):
         """Correct the indentation of a line"""
 
+    def reindent_region(self, start_line, end_line):
+        """Correct the indentation of lines `start_line` to `end_line`"""
+        with self.editor.batch():
+            for lineno in range(start_line, end_line + 1):
+                self.correct_indentation(lineno)
+
     def deindent(self, lineno):
         """Deindent the a line"""
         current_indents = self._count_line_indents(lineno)
@@ -43,6 +51,13 @@ class TextIndenter(object):
         """Inserts a tab in the given index"""
         self.editor.insert(index, ' ' * self.indents)
 
+    def lines_changed(self, lineno):
+        """Tell the indenter that lines from `lineno` have changed
+
+        Editors call this after each change, so that information
+        cached for the lines before `lineno` can be reused.
+        """
+
     def _set_line_indents(self, lineno, indents):
         old_indents = self._count_line_indents(lineno)
         indent_diffs = indents - old_indents
@@ -77,6 +92,20 @@ class PythonCodeIndenter(TextIndenter):
 
     def __init__(self, editor, indents=4):
         super(PythonCodeIndenter, self).__init__(editor, indents)
+        self.scanner_states = _ScannerStates()
+        self.version = None
+
+    def lines_changed(self, lineno):
+        self.scanner_states.invalidate(lineno)
+        self.version = self.editor.get_version()
+
+    def _get_scanner_states(self):
+        version = self.editor.get_version()
+        if version != self.version:
+            # the editor has not told us which lines have changed
+            self.scanner_states.invalidate(0)
+            self.version = version
+        return self.scanner_states
 
     def _last_non_blank(self, lineno):
         current_line = lineno - 1
@@ -88,9 +117,9 @@ class PythonCodeIndenter(TextIndenter):
     def _get_correct_indentation(self, lineno):
         if lineno == 1:
             return 0
-        new_indent = self._get_base_indentation(lineno)
-
         prev_lineno = self._last_non_blank(lineno)
+        new_indent = self._get_base_indentation(lineno, prev_lineno)
+
         prev_line = self.line_editor.get_line(prev_lineno)
         if prev_lineno == lineno or prev_line.strip() == '':
             new_indent = 0
@@ -98,13 +127,12 @@ class PythonCodeIndenter(TextIndenter):
         new_indent += self._indents_caused_by_current_stmt(current_line)
         return new_indent
 
-    def _get_base_indentation(self, lineno):
+    def _get_base_indentation(self, lineno, prev_lineno):
         range_finder = _StatementRangeFinder(
-            self.line_editor, self._last_non_blank(lineno))
+            self.line_editor, prev_lineno, self._get_scanner_states())
         start = range_finder.get_statement_start()
         if not range_finder.is_line_continued():
-            changes = self._indents_caused_by_prev_stmt(
-                (start, self._last_non_blank(lineno)))
+            changes = self._indents_caused_by_prev_stmt((start, prev_lineno))
             return self._count_line_indents(start) + changes
         if range_finder.last_open_parens():
             open_parens = range_finder.last_open_parens()
@@ -130,7 +158,7 @@ class PythonCodeIndenter(TextIndenter):
                 else:
                     return len(start_line) + 1
         else:
-            return self._count_line_indents(self._last_non_blank(lineno))
+            return self._count_line_indents(prev_lineno)
 
     def _indents_caused_by_prev_stmt(self, stmt_range):
         first_line = self.line_editor.get_line(stmt_range[0])
@@ -176,13 +204,45 @@ class PythonCodeIndenter(TextIndenter):
         """Correct the indentation of the line containing the given index"""
         self._set_line_indents(lineno, self._get_correct_indentation(lineno))
 
+    def reindent_region(self, start_line, end_line):
+        """Correct the indentation of lines `start_line` to `end_line`
+
+        The lines are indented in a copy of the text in one forward
+        pass, reusing the scanner state of the previous lines, and
+        then the changes are applied to the editor in one batch.
+        Blank lines and lines inside strings are not changed.
+
+        """
+        lines = _LinesBuffer(self.editor.get_text())
+        indenter = PythonCodeIndenter(lines, self.indents)
+        states = indenter.scanner_states = _ForwardScannerStates()
+        for lineno in range(start_line, min(end_line, lines.length()) + 1):
+            if lines.get_line(lineno).strip() == '':
+                continue
+            if lineno > 1 and _StatementRangeFinder(
+                lines, lineno - 1, states).in_string != '':
+                continue
+            indenter.correct_indentation(lineno)
+            states.invalidate(lineno)
+        with self.editor.batch():
+            for lineno, count in sorted(lines.changes.items()):
+                if count != 0:
+                    self.line_editor.indent_line(lineno, count)
+
 
 class _StatementRangeFinder(object):
-    """A method object for finding the range of a statement"""
+    """A method object for finding the range of a statement
 
-    def __init__(self, lines, lineno):
+    If `states` is given, the scanning resumes from the nearest line
+    whose state is known and the states of the scanned lines are
+    added to it.
+
+    """
+
+    def __init__(self, lines, lineno, states=None):
         self.lines = lines
         self.lineno = lineno
+        self.states = states
         self.in_string = ''
         self.open_count = 0
         self.explicit_continuation = False
@@ -219,11 +279,27 @@ class _StatementRangeFinder(object):
 
     def _analyze(self):
         last_statement = 1
-        block_start = codeanalyze.get_block_start(self.lines, self.lineno)
-        for current_line_number in range(block_start, self.lineno + 1):
+        if self.states is not None:
+            block_start = self.states.get_block_start(self.lines, self.lineno)
+        else:
+            block_start = codeanalyze.get_block_start(self.lines, self.lineno)
+        start = block_start
+        if self.states is not None:
+            start, state = self.states.get_state(block_start, self.lineno)
+            if state is not None:
+                (self.in_string, self.open_count, open_parens,
+                 self.explicit_continuation, last_statement) = state
+                self.open_parens = list(open_parens)
+        for current_line_number in range(start, self.lineno + 1):
             if not self.explicit_continuation and \
                self.open_count == 0 and self.in_string == '':
                 last_statement = current_line_number
+            if self.states is not None:
+                self.states.set_state(
+                    block_start, current_line_number,
+                    (self.in_string, self.open_count,
+                     tuple(self.open_parens), self.explicit_continuation,
+                     last_statement))
             self._analyze_line(current_line_number)
         self.statement_start = last_statement
 
@@ -240,3 +316,129 @@ class _StatementRangeFinder(object):
 
     def get_line_indents(self, line_number):
         return count_line_indents(self.lines.get_line(line_number))
+
+
+class _ScannerStates(object):
+    """The states of `_StatementRangeFinder` at the start of lines
+
+    States are kept for consecutive lines starting from the block
+    start they were computed from; the state of a line depends only
+    on the lines between the block start and that line.
+
+    """
+
+    def __init__(self):
+        self.block_start = None
+        self.states = []
+
+    def get_state(self, block_start, lineno):
+        """Return the nearest line before `lineno` with a known state
+
+        A (lineno, state) tuple is returned; state is `None` if
+        no state is known and scanning should start from `block_start`.
+
+        """
+        if block_start != self.block_start:
+            self.block_start = block_start
+            self.states = []
+        index = min(lineno - block_start, len(self.states) - 1)
+        if index < 0:
+            return block_start, None
+        return block_start + index, self.states[index]
+
+    def get_block_start(self, lines, lineno):
+        return codeanalyze.get_block_start(lines, lineno)
+
+    def set_state(self, block_start, lineno, state):
+        if block_start == self.block_start and \
+           lineno - block_start == len(self.states):
+            self.states.append(state)
+
+    def invalidate(self, lineno):
+        """Forget the states that depend on `lineno` and after it"""
+        if self.block_start is not None:
+            del self.states[max(0, lineno - self.block_start + 1):]
+
+
+class _ForwardScannerStates(_ScannerStates):
+    """`_ScannerStates` for lines that are visited from top to bottom
+
+    Block starts are remembered, too, so that only the lines after
+    the last visited line are searched for block starts.  The lines
+    before the last visited line should not change.
+
+    """
+
+    def __init__(self):
+        super(_ForwardScannerStates, self).__init__()
+        self.checked_line = None
+        self.found_start = None
+
+    def get_block_start(self, lines, lineno):
+        if self.checked_line is None or lineno < self.found_start:
+            result = codeanalyze.get_block_start(lines, lineno)
+        else:
+            result = self.found_start
+            for i in range(lineno, self.checked_line, -1):
+                if _is_block_start(lines, i):
+                    result = i
+                    break
+        self.checked_line = lineno
+        self.found_start = result
+        return result
+
+
+def _is_block_start(lines, lineno, maximum_indents=80):
+    """Would `codeanalyze.get_block_start` stop at `lineno`?"""
+    line = lines.get_line(lineno)
+    match = codeanalyze.get_block_start_patterns().search(line)
+    if match is None or codeanalyze.count_line_indents(line) > maximum_indents:
+        return False
+    striped = line.lstrip()
+    # Maybe we're in a list comprehension or generator expression
+    if lineno > 1 and striped.startswith('if') or striped.startswith('for'):
+        bracs = 0
+        for j in range(lineno, min(lineno + 5, lines.length() + 1)):
+            for c in lines.get_line(j):
+                if c == '#':
+                    break
+                if c in '[(':
+                    bracs += 1
+                if c in ')]':
+                    bracs -= 1
+                    if bracs < 0:
+                        return False
+    return True
+
+
+class _LinesBuffer(object):
+    """An editor and line editor for a copy of the lines of a text
+
+    The number of spaces added to each line is recorded in `changes`.
+
+    """
+
+    def __init__(self, text):
+        self.lines = text.split('\n')
+        self.changes = {}
+
+    def line_editor(self):
+        return self
+
+    def get_version(self):
+        return 0
+
+    def get_line(self, lineno):
+        return self.lines[lineno - 1]
+
+    def length(self):
+        return len(self.lines)
+
+    def indent_line(self, lineno, count):
+        line = self.lines[lineno - 1]
+        if count > 0:
+            line = ' ' * count + line
+        if count < 0:
+            line = line[-count:]
+        self.lines[lineno - 1] = line
+        self.changes[lineno] = self.changes.get(lineno, 0) + count
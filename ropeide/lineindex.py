@@ -0,0 +1,180 @@
+class LineIndex(object):
+    """Convert offsets to line/column pairs and back
+
+    The length of each line (including its line break) is kept in
+    chunks of at most `2 * chunk_size` lines.  Fenwick trees over the
+    number of lines and characters of the chunks make both conversions
+    take O(log n) time plus a short scan inside a chunk.  Lines are
+    one-based and columns are zero-based like `Tkinter` indices.
+
+    """
+
+    chunk_size = 64
+
+    def __init__(self, text=''):
+        self.reset(text)
+
+    def reset(self, text):
+        lengths = [len(line) + 1 for line in text.split('\n')]
+        lengths[-1] -= 1
+        self.chunks = [lengths[i:i + self.chunk_size]
+                       for i in range(0, len(lengths), self.chunk_size)]
+        self._build_trees()
+
+    def get_line_count(self):
+        return self.lines.total
+
+    def get_length(self):
+        return self.chars.total
+
+    def get_offset(self, line, column=0):
+        """Return the offset of `line`.`column`"""
+        if line > self.lines.total:
+            return self.chars.total
+        if line < 1:
+            return 0
+        chunk_index, line_index = self.lines.find(line - 1)
+        chunk = self.chunks[chunk_index]
+        offset = self.chars.prefix(chunk_index) + sum(chunk[:line_index])
+        return offset + max(0, min(column, self._line_length(chunk, line_index)))
+
+    def get_position(self, offset):
+        """Return the (line, column) pair of `offset`"""
+        if offset >= self.chars.total:
+            chunk_index = len(self.chunks) - 1
+            offset = self.chars.total - self.chars.prefix(chunk_index)
+        else:
+            chunk_index, offset = self.chars.find(max(0, offset))
+        chunk = self.chunks[chunk_index]
+        line = self.lines.prefix(chunk_index) + 1
+        for length in chunk[:-1]:
+            if offset < length:
+                break
+            offset -= length
+            line += 1
+        return (line, offset)
+
+    def insert(self, line, column, text):
+        """Update line lengths after inserting `text` at `line`.`column`"""
+        line, column = self._normalize(line, column)
+        parts = text.split('\n')
+        if len(parts) == 1:
+            self._change_length(line, len(text))
+            return
+        length = self._get_line_length(line, True)
+        lengths = [column + len(parts[0]) + 1]
+        lengths.extend([len(part) + 1 for part in parts[1:-1]])
+        lengths.append(len(parts[-1]) + length - column)
+        self._replace_lines(line, line, lengths)
+
+    def delete(self, start_line, start_column, end_line, end_column):
+        """Update line lengths after removing the given range"""
+        start_line, start_column = self._normalize(start_line, start_column)
+        end_line, end_column = self._normalize(end_line, end_column)
+        if start_line == end_line:
+            self._change_length(start_line, start_column - end_column)
+            return
+        length = start_column - end_column + \
+                 self._get_line_length(end_line, True)
+        self._replace_lines(start_line, end_line, [length])
+
+    def _normalize(self, line, column):
+        if line > self.lines.total:
+            line = self.lines.total
+            column = self._get_line_length(line)
+        return line, max(0, min(column, self._get_line_length(line)))
+
+    def _get_line_length(self, line, with_break=False):
+        chunk_index, line_index = self.lines.find(line - 1)
+        chunk = self.chunks[chunk_index]
+        if with_break:
+            return chunk[line_index]
+        return self._line_length(chunk, line_index)
+
+    def _line_length(self, chunk, line_index):
+        length = chunk[line_index]
+        if line_index < len(chunk) - 1 or chunk is not self.chunks[-1]:
+            length -= 1
+        return length
+
+    def _change_length(self, line, diff):
+        chunk_index, line_index = self.lines.find(line - 1)
+        self.chunks[chunk_index][line_index] += diff
+        self.chars.add(chunk_index, diff)
+
+    def _replace_lines(self, first, last, lengths):
+        first_chunk, first_index = self.lines.find(first - 1)
+        last_chunk, last_index = self.lines.find(last - 1)
+        if first_chunk == last_chunk:
+            chunk = self.chunks[first_chunk]
+            old_chars = sum(chunk[first_index:last_index + 1])
+            chunk[first_index:last_index + 1] = lengths
+            if 0 < len(chunk) <= 2 * self.chunk_size:
+                self.lines.add(first_chunk, len(lengths) - (last - first + 1))
+                self.chars.add(first_chunk, sum(lengths) - old_chars)
+                return
+        else:
+            merged = self.chunks[first_chunk][:first_index] + lengths + \
+                     self.chunks[last_chunk][last_index + 1:]
+            self.chunks[first_chunk:last_chunk + 1] = [merged]
+        self._split_chunk(first_chunk)
+
+    def _split_chunk(self, chunk_index):
+        chunk = self.chunks[chunk_index]
+        size = self.chunk_size
+        self.chunks[chunk_index:chunk_index + 1] = \
+            [chunk[i:i + size] for i in range(0, len(chunk), size)]
+        if not self.chunks:
+            self.chunks = [[0]]
+        self._build_trees()
+
+    def _build_trees(self):
+        self.lines = _FenwickTree([len(chunk) for chunk in self.chunks])
+        self.chars = _FenwickTree([sum(chunk) for chunk in self.chunks])
+
+
+class _FenwickTree(object):
+
+    def __init__(self, values):
+        self.total = sum(values)
+        self.tree = [0] + values
+        size = len(self.tree)
+        for index in range(1, size):
+            parent = index + (index & -index)
+            if parent < size:
+                self.tree[parent] += self.tree[index]
+        self.mask = 1
+        while self.mask * 2 < size:
+            self.mask *= 2
+
+    def add(self, index, diff):
+        self.total += diff
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += diff
+            index += index & -index
+
+    def prefix(self, index):
+        """Return the sum of the values before `index`"""
+        result = 0
+        while index > 0:
+            result += self.tree[index]
+            index -= index & -index
+        return result
+
+    def find(self, value):
+        """Return (index, rest) for the element containing `value`
+
+        `rest` is `value` minus the sum of the elements before
+        `index`.  `value` should be less than the total.
+
+        """
+        index = 0
+        mask = self.mask
+        while mask:
+            next = index + mask
+            if next < len(self.tree) and self.tree[next] <= value:
+                index = next
+                value -= self.tree[next]
+            mask //= 2
+        return index, value
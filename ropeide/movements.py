@@ -1,3 +1,4 @@
+import bisect
 import re
 
 from rope.base import codeanalyze
@@ -44,19 +45,28 @@ class Statements(object):
 
 
 class Scopes(object):
+    """Move between the lines defining scopes
 
-    def __init__(self, source):
+    If an `ropeide.outline.OutlineModel` of `source` is given and it
+    can be parsed, its scopes are used; otherwise the lines starting
+    with ``def`` or ``class`` are.
+
+    """
+
+    def __init__(self, source, outline=None):
         self.source = source
+        self.outline = outline
         self.pattern = re.compile(r'^[ \t]*(def|class)\s', re.M)
-        self.matches = None
+        self.starts = None
 
     def next(self, offset):
-        match = self.pattern.search(self.source, offset)
-        if match is not None:
-            if self.source[offset:match.start()].strip(' \t\r\n') == '':
-                match = self.pattern.search(self.source, match.end())
-        if match is not None:
-            offset = match.start()
+        starts = self._get_starts()
+        index = bisect.bisect_left(starts, offset)
+        if index < len(starts) and \
+           self.source[offset:starts[index]].strip(' \t\r\n') == '':
+            index += 1
+        if index < len(starts):
+            offset = starts[index]
         else:
             offset = len(self.source)
         return self._prev_char(offset - 1)
@@ -67,23 +77,28 @@ class Scopes(object):
         return offset + 1
 
     def prev(self, offset):
-        if self.matches is None:
-            self.matches = list(self.pattern.finditer(self.source))
-        prev_match = None
-        for match in self.matches:
-            if match.start() <= offset:
-                prev_match = match
-            else:
-                break
-        if prev_match is not None:
-            start = prev_match.start()
-            if self.source[start] == '\n':
-                start += 1
+        starts = self._get_starts()
+        index = bisect.bisect_right(starts, offset) - 1
+        if index >= 0:
+            start = starts[index]
             if self.source[start:offset].strip() == '':
-                return self.prev(prev_match.start() - 1)
+                return self.prev(start - 1)
             return _next_char(self.source, start)
         return 0
 
+    def _get_starts(self):
+        if self.starts is None:
+            if self.outline is not None and \
+               self.outline.get_source() == self.source:
+                try:
+                    self.starts = self.outline.get_scope_offsets()
+                except SyntaxError:
+                    pass
+            if self.starts is None:
+                self.starts = [match.start() for match
+                               in self.pattern.finditer(self.source)]
+        return self.starts
+
 
 def _next_char(source, offset):
     while offset < len(source) and \
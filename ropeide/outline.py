@@ -1,22 +1,51 @@
-from rope.base import ast
+import re
+
+from rope.base import ast, codeanalyze
 
 
 class PythonASTOutlineNode(object):
 
-    def __init__(self, ast_node):
+    def __init__(self, ast_node, line_offset=0, chunk=None):
         self.name = ast_node.name
         self.node = ast_node
+        self.line_offset = line_offset
+        self.chunk = chunk
         self.children = None
 
     def get_name(self):
         return self.name
 
     def get_line_number(self):
-        return self.node.lineno
+        return self.node.lineno + self.line_offset
+
+    def get_end_line(self):
+        """Return the last line of this node
+
+        Like rope's scopes, the body ends before the first logical line
+        that is indented less than the body.
+
+        """
+        lines = self.chunk.get_lines()
+        logical_lines = self.chunk.get_logical_lines()
+        start = self.node.lineno
+        end = self.node.body[-1].lineno
+        if logical_lines.logical_line_in(start)[1] >= end:
+            body_indents = _get_indents(lines, start) + 4
+        else:
+            body_indents = _get_indents(lines, self.node.body[0].lineno)
+        for lineno in logical_lines.generate_starts(
+            min(end + 1, lines.length()), lines.length() + 1):
+            line = lines.get_line(lineno).strip()
+            if line and not line.startswith('#'):
+                if _get_indents(lines, lineno) < body_indents:
+                    break
+                end = lineno
+        return logical_lines.logical_line_in(end)[1] + self.line_offset
 
     def get_children(self):
         if self.children is None:
-            self.children = _get_ast_children(self.node)
+            self.children = _get_ast_children(self.node, self.line_offset,
+                                              self.chunk)
         return self.children
 
     def get_kind(self):
@@ -30,24 +59,34 @@ class PythonASTOutlineNode(object):
         if isinstance(self.node, ast.ClassDef):
             return 'class'
 
+    def get_doc(self):
+        if self.node.body:
+            expr = self.node.body[0]
+            if isinstance(expr, ast.Expr) and isinstance(expr.value, ast.Str):
+                return expr.value.s
+
     def __cmp__(self, obj):
         return cmp(self.get_line_number(), obj.get_line_number())
 
 
 class _ASTDefinedVisitor(object):
 
-    def __init__(self):
+    def __init__(self, line_offset, chunk):
+        self.line_offset = line_offset
+        self.chunk = chunk
         self.result = []
 
     def _FunctionDef(self, node):
-        self.result.append(PythonASTOutlineNode(node))
+        self.result.append(PythonASTOutlineNode(node, self.line_offset,
+                                                self.chunk))
 
     def _ClassDef(self, node):
-        self.result.append(PythonASTOutlineNode(node))
+        self.result.append(PythonASTOutlineNode(node, self.line_offset,
+                                                self.chunk))
 
 
-def _get_ast_children(node):
-    visitor = _ASTDefinedVisitor()
+def _get_ast_children(node, line_offset=0, chunk=None):
+    visitor = _ASTDefinedVisitor(line_offset, chunk)
     for child in ast.get_child_nodes(node):
         ast.walk(child, visitor)
     return visitor.result
@@ -59,7 +98,211 @@ class PythonOutline(object):
         self.project = project
 
     def get_root_nodes(self, source_code):
-        if isinstance(source_code, unicode):
-            source_code = source_code.encode('utf-8')
-        ast_node = ast.parse(source_code)
-        return _get_ast_children(ast_node)
+        return _Chunk(source_code).get_nodes()
+
+
+class OutlineModel(object):
+    """The outline of the source of an editor
+
+    The outline is kept until the version of the editor changes.  The
+    top-level statements are parsed separately and their syntax trees
+    are kept by their text, so after an edit only the statements that
+    were changed are parsed again.  If `editor` is `None`, the outline
+    of `source` is used.
+
+    """
+
+    def __init__(self, editor=None, source=''):
+        self.editor = editor
+        self.version = None
+        self.source = source
+        self.chunks = {}
+        self.chunk_starts = None
+        self.nodes = None
+        self.scope_offsets = None
+
+    def get_source(self):
+        self._update()
+        return self.source
+
+    def get_root_nodes(self):
+        """Return the outline nodes of the top-level scopes
+
+        Raises `SyntaxError` if the source cannot be parsed.
+
+        """
+        self._update()
+        if self.nodes is None:
+            self.nodes = self._parse()
+        return self.nodes
+
+    def get_scope_offsets(self):
+        """Return the sorted offsets of the lines defining scopes
+
+        For decorated scopes, the ``def`` or ``class`` lines are used.
+
+        """
+        self.get_root_nodes()
+        if self.scope_offsets is None:
+            lines = codeanalyze.SourceLinesAdapter(self.source)
+            result = []
+            for start, chunk in self.chunk_starts:
+                for lineno in chunk.get_scope_lines():
+                    result.append(lines.get_line_start(start + lineno))
+            self.scope_offsets = result
+        return self.scope_offsets
+
+    def _update(self):
+        if self.editor is None or self.editor.get_version() == self.version:
+            return
+        self.version = self.editor.get_version()
+        self.source = self.editor.get_text()
+        self.nodes = None
+        self.scope_offsets = None
+
+    def _parse(self):
+        lines = self.source.split('\n')
+        starts = _get_statement_starts(lines)
+        chunks = {}
+        chunk_starts = []
+        result = []
+        index = 0
+        try:
+            while index < len(starts):
+                # incomplete statements are joined with the next ones
+                count = 1
+                while True:
+                    end = len(lines)
+                    if index + count < len(starts):
+                        end = starts[index + count]
+                    text = '\n'.join(lines[starts[index]:end])
+                    chunk = self.chunks.get(text)
+                    if chunk is None:
+                        chunk = _Chunk(text)
+                    chunks[text] = chunk
+                    if not chunk.is_incomplete() or end == len(lines):
+                        break
+                    count *= 2
+                result.extend(chunk.get_nodes(starts[index]))
+                chunk_starts.append((starts[index], chunk))
+                index += count
+        except SyntaxError:
+            self.chunks.update(chunks)
+            raise
+        self.chunks = chunks
+        self.chunk_starts = chunk_starts
+        return result
+
+
+class _Chunk(object):
+    """Some top-level statements of a module"""
+
+    def __init__(self, source):
+        self.source = source
+        self.module = None
+        self.error = None
+        self.lines = None
+        self.logical_lines = None
+        self.scope_lines = None
+        if isinstance(source, unicode):
+            source = source.encode('utf-8')
+        try:
+            self.module = ast.parse(source)
+        except SyntaxError, e:
+            self.error = e
+
+    def is_incomplete(self):
+        """Whether the last statement continues after this chunk
+
+        That is when the parser fails at the end of the last line
+        containing code.
+
+        """
+        if self.error is None:
+            return False
+        if 'EOF' in str(self.error.msg):
+            return True
+        if self.error.text is None or self.error.offset is None:
+            return False
+        return self.error.lineno >= self._get_last_code_line() and \
+               self.error.offset > len(self.error.text.rstrip())
+
+    def _get_last_code_line(self):
+        lines = self.source.split('\n')
+        for index in range(len(lines) - 1, -1, -1):
+            line = lines[index].strip()
+            if line and not line.startswith('#'):
+                return index + 1
+        return 1
+
+    def get_nodes(self, line_offset=0):
+        if self.error is not None:
+            error = SyntaxError(self.error.msg)
+            error.lineno = (self.error.lineno or 1) + line_offset
+            error.offset = self.error.offset
+            error.text = self.error.text
+            raise error
+        return _get_ast_children(self.module, line_offset, self)
+
+    def get_scope_lines(self):
+        """Return the sorted numbers of the lines defining scopes"""
+        if self.scope_lines is None:
+            lines = self.get_lines()
+            result = []
+            nodes = list(self.get_nodes())
+            while nodes:
+                node = nodes.pop()
+                nodes.extend(node.get_children())
+                lineno = node.get_line_number()
+                while lineno < lines.length() and \
+                      not _scope_pattern.match(lines.get_line(lineno)):
+                    lineno += 1
+                result.append(lineno)
+            result.sort()
+            self.scope_lines = result
+        return self.scope_lines
+
+    def get_lines(self):
+        if self.lines is None:
+            self.lines = codeanalyze.SourceLinesAdapter(self.source)
+        return self.lines
+
+    def get_logical_lines(self):
+        if self.logical_lines is None:
+            self.logical_lines = codeanalyze.CachingLogicalLineFinder(
+                self.get_lines())
+        return self.logical_lines
+
+
+def _get_statement_starts(lines):
+    """Return the indices of the lines starting top-level statements
+
+    The first line is always included.  Decorators are kept with the
+    statements after them and lines after backslash continuations
+    with the lines before them.
+
+    """
+    result = [0]
+    decorated = lines and lines[0].startswith('@')
+    for index in range(1, len(lines)):
+        line = lines[index]
+        if not line or line[0] in ' \t#' or _continuation_pattern.match(line):
+            continue
+        if _ends_with_backslash(lines[index - 1]):
+            continue
+        if not decorated:
+            result.append(index)
+        decorated = line.startswith('@')
+    return result
+
+
+def _ends_with_backslash(line):
+    return (len(line) - len(line.rstrip('\\'))) % 2 == 1
+
+
+_scope_pattern = re.compile(r'[ \t]*(def|class)\s')
+_continuation_pattern = re.compile(r'(else|elif|except|finally)\b')
+
+
+def _get_indents(lines, lineno):
+    return codeanalyze.count_line_indents(lines.get_line(lineno))
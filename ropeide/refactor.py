@@ -13,6 +13,7 @@ import rope.refactor.move
 import rope.refactor.rename
 import rope.refactor.restructure
 import ropeide.core
+import ropeide.grep
 from rope.base import exceptions, evaluate
 from rope.refactor import ImportOrganizer
 from ropeide.actionhelpers import (ConfirmEditorsAreSaved,
@@ -983,6 +984,60 @@ def restructure(context):
         RestructureDialog(context).show()
 
 
+class ReplaceInProjectDialog(RefactoringDialog):
+
+    def __init__(self, context):
+        super(ReplaceInProjectDialog, self).__init__(
+            context, 'Replace In Project')
+
+    def _calculate_changes(self, handle=None):
+        self._save_data()
+        replace = ropeide.grep.ProjectReplace(
+            self.project, self.pattern.get(), self.replacement.get(),
+            regex=self.regex.get(), index=self.core.get_trigram_index())
+        return replace.get_changes(task_handle=handle)
+
+    def _get_dialog_frame(self):
+        frame = Tkinter.Frame(self.toplevel)
+        pattern_label = Tkinter.Label(frame, text='Pattern')
+        replacement_label = Tkinter.Label(frame, text='Replacement')
+        self.pattern = Tkinter.Entry(frame, width=50)
+        self.replacement = Tkinter.Entry(frame, width=50)
+        self.regex = Tkinter.BooleanVar()
+        regex_button = Tkinter.Checkbutton(
+            frame, text='Regular expression', variable=self.regex)
+        tkhelpers.ToolTip(self.replacement,
+                          'Groups can be referenced like ``\\1`` in\n'
+                          'regular expression mode.')
+        pattern_label.grid(row=0, column=0, sticky=Tkinter.W)
+        self.pattern.grid(row=0, column=1, sticky=Tkinter.W)
+        replacement_label.grid(row=1, column=0, sticky=Tkinter.W)
+        self.replacement.grid(row=1, column=1, sticky=Tkinter.W)
+        regex_button.grid(row=2, column=1, sticky=Tkinter.W)
+        self._load_data()
+        self.pattern.focus_set()
+        return frame
+
+    history = None
+
+    def _save_data(self):
+        ReplaceInProjectDialog.history = (self.pattern.get(),
+                                          self.replacement.get(),
+                                          self.regex.get())
+
+    def _load_data(self):
+        if ReplaceInProjectDialog.history is not None:
+            pattern, replacement, regex = ReplaceInProjectDialog.history
+            self.pattern.insert(0, pattern)
+            self.replacement.insert(0, replacement)
+            self.regex.set(regex)
+
+
+def replace_in_project(context):
+    if check_project(context.core):
+        ReplaceInProjectDialog(context).show()
+
+
 actions = []
 core = ropeide.core.get_core()
 core.add_menu_cascade(MenuAddress(['Refactor'], 'r'), ['python'])
@@ -1013,6 +1068,10 @@ actions.append(SimpleAction('restructure',
                             ConfirmEditorsAreSaved(restructure), 'C-c r x',
                             MenuAddress(['Refactor', 'Restructure'], None),
                             ['all', 'none']))
+actions.append(SimpleAction('replace_in_project',
+                            ConfirmEditorsAreSaved(replace_in_project), 'C-c r g',
+                            MenuAddress(['Refactor', 'Replace In Project'], None),
+                            ['all', 'none']))
 
 actions.append(SimpleAction('introduce_factory',
                             ConfirmEditorsAreSaved(introduce_factory), 'C-c r f',
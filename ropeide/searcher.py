@@ -1,3 +1,6 @@
+import bisect
+import re
+
 from ropeide import statusbar
 
 
@@ -17,8 +20,7 @@ class SearchingState(object):
 class ForwardSearching(SearchingState):
 
     def append_keyword(self, searcher, postfix):
-        start = searcher.editor.get_relative(searcher.editor.get_insert(),
-                                             -len(searcher.keyword))
+        start = searcher.current_match.start
         searcher.keyword += postfix
         searcher._match(start)
 
@@ -86,6 +88,114 @@ class Match(object):
         self.side = side
 
 
+class Matches(object):
+    """The sorted offsets of all matches of a keyword in a text
+
+    `mode` can be 'literal', 'regex' or 'word'.  Literal matches can
+    overlap.  Empty matches are ignored.
+
+    If `previous` holds the literal matches of a prefix of a literal
+    `keyword` in the same text, only its matches are checked instead
+    of scanning the whole text again.
+
+    """
+
+    def __init__(self, text, keyword, mode='literal', case=True,
+                 previous=None):
+        self.text = text
+        self.keyword = keyword
+        self.mode = mode
+        self.case = case
+        self.lowered_text = None
+        self.starts = []
+        self.ends = []
+        if mode == 'literal':
+            if previous is not None and self._can_narrow(previous):
+                self._narrow_literal(previous)
+            else:
+                self._find_literal()
+        else:
+            self._find_pattern(text, keyword, mode, case)
+
+    def _can_narrow(self, previous):
+        if previous.mode != 'literal' or previous.text is not self.text:
+            return False
+        if previous.case:
+            return self.case and self.keyword.startswith(previous.keyword)
+        return self.keyword.lower().startswith(previous.keyword.lower())
+
+    def _get_search_text(self, previous=None):
+        if self.case:
+            return self.text
+        if previous is not None and previous.lowered_text is not None:
+            self.lowered_text = previous.lowered_text
+        if self.lowered_text is None:
+            self.lowered_text = self.text.lower()
+        return self.lowered_text
+
+    def _find_literal(self):
+        text = self._get_search_text()
+        keyword = self.keyword
+        if not self.case:
+            keyword = keyword.lower()
+        length = len(keyword)
+        start = text.find(keyword)
+        while start != -1:
+            self.starts.append(start)
+            self.ends.append(start + length)
+            start = text.find(keyword, start + 1)
+
+    def _narrow_literal(self, previous):
+        text = self._get_search_text(previous)
+        keyword = self.keyword
+        if not self.case:
+            keyword = keyword.lower()
+        length = len(keyword)
+        known = 0
+        if previous.case == self.case:
+            known = len(previous.keyword)
+        postfix = keyword[known:]
+        self.starts = [start for start in previous.starts
+                       if text[start + known:start + length] == postfix]
+        self.ends = [start + length for start in self.starts]
+
+    def _find_pattern(self, text, keyword, mode, case):
+        if mode == 'word':
+            keyword = r'(?<!\w)%s(?!\w)' % re.escape(keyword)
+        flags = re.MULTILINE
+        if not case:
+            flags |= re.IGNORECASE
+        try:
+            pattern = re.compile(keyword, flags)
+        except re.error:
+            return
+        for match in pattern.finditer(text):
+            if match.start() != match.end():
+                self.starts.append(match.start())
+                self.ends.append(match.end())
+
+    def find(self, offset, forward=True):
+        """Return the index of the next or previous match of `offset`
+
+        Forward searches return the first match starting at or after
+        `offset` and backward ones the last match ending at or before
+        it.  `None` is returned if there is no such match.
+
+        """
+        if forward:
+            index = bisect.bisect_left(self.starts, offset)
+        else:
+            index = bisect.bisect_right(self.ends, offset) - 1
+        if 0 <= index < len(self.starts):
+            return index
+
+    def get_match(self, index):
+        return (self.starts[index], self.ends[index])
+
+    def __len__(self):
+        return len(self.starts)
+
+
 class Searcher(object):
     """A class for searching TextEditors"""
 
@@ -96,9 +206,17 @@ class Searcher(object):
         self.current_match = None
         self.history = ''
         self.failing = False
-
-    def start_searching(self):
+        self.mode = 'literal'
+        self.match_index = None
+        self.highlight_all = False
+        self._matches = {}
+        self._matches_version = None
+        self._last_matches = None
+
+    def start_searching(self, mode='literal'):
         self.keyword = ''
+        self.mode = mode
+        self.match_index = None
         self.starting_index = self.editor.get_insert()
         self.searching_state = ForwardSearching()
         self.current_match = Match(self.starting_index, self.starting_index)
@@ -109,7 +227,7 @@ class Searcher(object):
                 self.status_text = manager.create_status('search')
             except statusbar.StatusBarException:
                 self.status_text = manager.get_status('search')
-            self.status_text.set_width(35)
+            self.status_text.set_width(45)
         self.update_status_text()
 
     def _finish_searching(self):
@@ -117,6 +235,7 @@ class Searcher(object):
             self.status_text.remove()
         self.searching_state = NotSearching()
         self.editor.highlight_match(self.current_match)
+        self.editor.highlight_all_matches(None)
         self.failing = False
 
     def end_searching(self, save=True):
@@ -137,8 +256,16 @@ class Searcher(object):
             failing = ''
             if self.failing:
                 failing = 'Failing '
-            self.status_text.set_text('%s%sSearch: <%s>' %
-                                      (failing, direction, self.keyword))
+            mode = ''
+            if self.mode != 'literal':
+                mode = self.mode.capitalize() + ' '
+            count = ''
+            if self.keyword and self.match_index is not None:
+                count = ' %d of %d' % (self.match_index + 1,
+                                       len(self._get_matches()))
+            self.status_text.set_text('%s%s%sSearch: <%s>%s' %
+                                      (failing, direction, mode,
+                                       self.keyword, count))
 
     def append_keyword(self, postfix):
         self.searching_state.append_keyword(self, postfix)
@@ -167,24 +294,72 @@ class Searcher(object):
         self.searching_state.next_match(self)
         self.update_status_text()
 
+    def set_mode(self, mode):
+        """Change searching mode to 'literal', 'regex' or 'word'"""
+        self.mode = mode
+        if self.is_searching():
+            self._match(self.current_match.start)
+        self.update_status_text()
+
+    def set_highlight_all(self, highlight_all):
+        """Highlight all matches of the keyword while searching"""
+        self.highlight_all = highlight_all
+        if self.is_searching():
+            self._highlight_all_matches()
+
+    def _highlight_all_matches(self):
+        if self.highlight_all and self.keyword:
+            self.editor.highlight_all_matches(self._get_matches())
+        else:
+            self.editor.highlight_all_matches(None)
+
     def _match(self, start, forward=True, insert_side='right'):
+        self._highlight_all_matches()
         if self.keyword:
-            case = False
-            if not self.keyword.islower():
-                case = True
-            found = self.editor.search(self.keyword, start,
-                                       case=case, forwards=forward)
-            if found:
-                found_end = self.editor.get_relative(found, len(self.keyword))
-                self.current_match = Match(found, found_end, insert_side)
+            matches = self._get_matches()
+            index = matches.find(self.editor.get_offset(start), forward)
+            if index is None and len(matches) > 0:
+                # wrapping around like `Text.search()`
+                index = 0
+                if not forward:
+                    index = len(matches) - 1
+            if index is not None:
+                found, found_end = matches.get_match(index)
+                self.current_match = Match(self.editor.get_index(found),
+                                           self.editor.get_index(found_end),
+                                           insert_side)
                 self.editor.highlight_match(self.current_match)
+                self.match_index = index
                 self.failing = False
             else:
+                self.match_index = None
                 self.failing = True
         else:
             self.current_match = Match(self.starting_index,
                                        self.starting_index)
             self.editor.highlight_match(self.current_match)
+            self.match_index = None
+
+    def _get_matches(self):
+        """Return the `Matches` of the keyword
+
+        Matches are computed only when the keyword, the mode or the
+        text changes and are kept until the text changes, so
+        shortening the keyword is cheap, too.
+
+        """
+        version = self.editor.get_version()
+        if version != self._matches_version:
+            self._matches = {}
+            self._matches_version = version
+            self._last_matches = None
+        case = not self.keyword.islower()
+        key = (self.keyword, self.mode, case)
+        if key not in self._matches:
+            self._matches[key] = Matches(self.editor.get_text(), self.keyword,
+                                         self.mode, case, self._last_matches)
+        self._last_matches = self._matches[key]
+        return self._last_matches
 
     def get_match(self):
         return self.current_match
@@ -1,16 +1,60 @@
-from rope.base import change
+from rope.base import change, codeanalyze, exceptions
+
+import ropeide.outline
 
 
 class SortScopes(object):
+    """Sort the scopes inside the scope containing an offset
+
+    The scopes are taken from `outline`, an `ropeide.outline.OutlineModel`,
+    if it is given and its source matches the contents of `resource`.
+
+    """
 
-    def __init__(self, project, resource, offset):
-        self.pycore = project.pycore
+    def __init__(self, project, resource, offset, outline=None):
+        self.project = project
         self.resource = resource
-        self.pymodule = self.pycore.resource_to_pyobject(resource)
-        self.scope = self.pymodule.get_scope().\
-                     get_inner_scope_for_offset(offset)
-        if self.scope.parent is not None and not self.scope.get_scopes():
-            self.scope = self.scope.parent
+        self.source = resource.read()
+        if outline is None or outline.get_source() != self.source:
+            outline = ropeide.outline.OutlineModel(source=self.source)
+        self.lines = codeanalyze.SourceLinesAdapter(self.source)
+        try:
+            self.nodes = outline.get_root_nodes()
+        except SyntaxError, e:
+            raise exceptions.ModuleSyntaxError(resource.path, e.lineno, e.msg)
+        self.scope, self.subs = self._get_holding_scope(
+            self.lines.get_line_number(offset))
+
+    def _get_holding_scope(self, lineno):
+        """Return the node containing `lineno` and its children
+
+        The node is `None` for the module.  Scopes without children
+        are not returned; their parents are.
+
+        """
+        indents = self._get_indents(lineno)
+        scopes = [(None, self.nodes)]
+        while True:
+            node = None
+            for child in scopes[-1][1]:
+                if child.get_line_number() <= lineno:
+                    if lineno <= child.get_end_line():
+                        node = child
+                        break
+                else:
+                    break
+            if node is None or \
+               self._get_indents(node.get_line_number()) > indents:
+                break
+            scopes.append((node, node.get_children()))
+            if node.get_line_number() == lineno:
+                break
+        if len(scopes) > 1 and not scopes[-1][1]:
+            scopes.pop()
+        return scopes[-1]
+
+    def _get_indents(self, lineno):
+        return codeanalyze.count_line_indents(self.lines.get_line(lineno))
 
     def get_changes(self, sorter=None):
         if sorter is None:
@@ -42,9 +86,9 @@ class SortScopes(object):
         return changes
 
     def _get_scope_name(self):
-        if self.scope.get_kind() == 'Module':
-            return self.scope.pyobject.resource.path + ' file'
-        return self.scope.pyobject.get_name() + ' scope'
+        if self.scope is None:
+            return self.resource.path + ' file'
+        return self.scope.get_name() + ' scope'
 
     def _mix_scopes_and_stmts(self, scopes, stmts):
         result = []
@@ -58,13 +102,12 @@ class SortScopes(object):
         return result
 
     def _get_scopes(self):
-        subs = self.scope.get_scopes()
-        if not subs:
+        if not self.subs:
             return []
         result = []
-        for scope in subs:
-            start = scope.get_start()
-            end = scope.get_end()
+        for scope in self.subs:
+            start = scope.get_line_number()
+            end = scope.get_end_line()
             blanks = self._count_blanks(end + 1)
             result.append(_Scope(scope, start, end, blanks))
         result[-1].blanks = 0
@@ -84,7 +127,7 @@ class SortScopes(object):
         return result
 
     def _count_blanks(self, start):
-        lines = self.pymodule.lines
+        lines = self.lines
         blanks = 0
         for lineno in range(start, lines.length() + 1):
             line = lines.get_line(lineno)
@@ -95,7 +138,7 @@ class SortScopes(object):
         return blanks
 
     def _count_blanks_reversed(self, start):
-        lines = self.pymodule.lines
+        lines = self.lines
         blanks = 0
         for lineno in range(start, 0, -1):
             line = lines.get_line(lineno)
@@ -106,8 +149,8 @@ class SortScopes(object):
         return blanks
 
     def _get_text(self, start_line, end_line=None):
-        lines = self.pymodule.lines
-        source = self.pymodule.source_code
+        lines = self.lines
+        source = self.source
         if end_line is None:
             end_line = lines.length()
         if start_line > end_line:
@@ -137,13 +180,13 @@ def get_sorter(kind, reverse=False):
 
 class _Scope(object):
 
-    def __init__(self, scope, start, end, blanks):
+    def __init__(self, node, start, end, blanks):
         self.start = start
         self.end = end
         self.blanks = blanks
-        self.name = scope.pyobject.get_name()
-        self.kind = scope.get_kind()
-        self.has_pydoc = scope.pyobject.get_doc() is not None
+        self.name = node.get_name()
+        self.kind = node.get_kind().title()
+        self.has_pydoc = node.get_doc() is not None
 
 
 class _Statements(object):
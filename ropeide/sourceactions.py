@@ -1,18 +1,29 @@
+from __future__ import with_statement
+
 import ScrolledText
+import bisect
+import keyword
+import re
+import sys
+import threading
+
 import Tkinter
+import tkMessageBox
+import rope.base.exceptions
 import rope.contrib.codeassist
 import rope.contrib.findit
 from rope.base import codeanalyze
+from rope.base.resourceobserver import ResourceObserver
 from rope.contrib import generate
 
 import ropeide.core
 import ropeide.formatter
 import ropeide.notes
-import ropeide.outline
 import ropeide.sort
 import ropeide.testview
 from ropeide import spelldialog, registers, templates
-from ropeide.actionhelpers import ConfirmEditorsAreSaved, StoppableTaskRunner
+from ropeide.actionhelpers import (ConfirmEditorsAreSaved, StoppableTaskRunner,
+                                   pycore_lock)
 from ropeide.extension import SimpleAction
 from ropeide.menubar import MenuAddress
 from ropeide.uihelpers import (TreeView, TreeViewHandle, EnhancedList,
@@ -46,12 +57,12 @@ def do_quick_outline(context):
     if not context.get_active_editor():
         return
     editor = context.get_active_editor().get_editor()
+    nodes = context.get_active_editor().get_outline().get_root_nodes()
     toplevel = Tkinter.Toplevel()
     toplevel.title('Quick Outline')
     tree_view = TreeView(toplevel, _OutlineViewHandle(editor, toplevel),
                          title='Quick Outline')
-    for node in (ropeide.outline.PythonOutline(context.project).\
-                 get_root_nodes(editor.get_text())):
+    for node in nodes:
         tree_view.add_entry(node)
     toplevel.grab_set()
 
@@ -78,6 +89,8 @@ class _CompletionListHandle(EnhancedListHandle):
         self.toplevel.destroy()
 
     def selected(self, selected):
+        if isinstance(selected, _ComputingProposal):
+            return
         if isinstance(selected, templates.TemplateProposal):
             _get_template_information(self.editor, selected, self.start_offset)
         else:
@@ -91,29 +104,383 @@ class _CompletionListHandle(EnhancedListHandle):
         self.canceled()
 
 
+class _ComputingProposal(object):
+    """Shown in the proposal list while proposals are computed"""
+
+    name = 'computing...'
+
+
+class _ProposalFilter(object):
+    """Find the proposals whose names start with a prefix
+
+    The names are kept sorted so that the proposals starting with a
+    prefix can be found with `bisect`.  When the prefix is extended,
+    only the range of the last prefix is searched.
+
+    """
+
+    def __init__(self, proposals):
+        self.order = sorted(range(len(proposals)),
+                            key=lambda index: proposals[index].name)
+        self.names = [proposals[index].name for index in self.order]
+        self.last = ('', 0, len(self.names))
+
+    def find(self, prefix):
+        """Return the sorted indices of matching proposals"""
+        lo, hi = 0, len(self.names)
+        last_prefix, last_lo, last_hi = self.last
+        if prefix.startswith(last_prefix):
+            lo, hi = last_lo, last_hi
+        if prefix:
+            lo = bisect.bisect_left(self.names, prefix, lo, hi)
+            hi = bisect.bisect_left(self.names, _get_next_prefix(prefix),
+                                    lo, hi)
+        self.last = (prefix, lo, hi)
+        return sorted(self.order[lo:hi])
+
+
+def _get_next_prefix(prefix):
+    """Return the smallest string greater than strings with `prefix`"""
+    last = ord(prefix[-1]) + 1
+    if isinstance(prefix, unicode) or last > 255:
+        return prefix[:-1] + unichr(last)
+    return prefix[:-1] + chr(last)
+
+
+def _diff_sorted(old, new):
+    """Return the changes that turn `old` sorted list into `new`
+
+    The changes are ``(index, removed_count, inserted)`` tuples that
+    should be applied in order.
+
+    """
+    result = []
+    index = i = j = 0
+    while i < len(old) or j < len(new):
+        if j == len(new) or (i < len(old) and old[i] < new[j]):
+            start = i
+            while i < len(old) and (j == len(new) or old[i] < new[j]):
+                i += 1
+            result.append((index, i - start, []))
+        elif i == len(old) or new[j] < old[i]:
+            start = j
+            while j < len(new) and (i == len(old) or new[j] < old[i]):
+                j += 1
+            result.append((index, 0, new[start:j]))
+            index += j - start
+        else:
+            index += 1
+            i += 1
+            j += 1
+    return result
+
+
+class _ProposalList(object):
+    """Show the proposals that start with a prefix in an `EnhancedList`
+
+    Only the entries that should be added or removed are changed when
+    the prefix changes; see `_ProposalFilter` and `_diff_sorted()`.
+
+    """
+
+    def __init__(self, enhanced_list):
+        self.enhanced_list = enhanced_list
+        self.set_proposals([])
+
+    def set_proposals(self, proposals, computing=False):
+        self.proposals = proposals
+        self.filter = _ProposalFilter(proposals)
+        self.shown = []
+        self.enhanced_list.clear()
+        if computing:
+            self.enhanced_list.add_entry(_ComputingProposal())
+
+    def show(self, prefix):
+        shown = self.filter.find(prefix)
+        for index, removed, inserted in _diff_sorted(self.shown, shown):
+            self.enhanced_list.remove_entries(index, index + removed)
+            self.enhanced_list.insert_entries(
+                [self.proposals[i] for i in inserted], index)
+        self.shown = shown
+        if self.enhanced_list.get_entries():
+            self.enhanced_list.activate(0)
+
+
+class _CodeAssistJob(object):
+    """Compute code assist proposals in a worker thread
+
+    Proposals are computed at the start of the name being completed,
+    so that they can be filtered for any prefix and cached; see `key`
+    and `_CodeAssistCache`.  Since rope proposes keywords only for a
+    typed prefix, they are added by `get_proposals()`.
+
+    Jobs can be cancelled but since rope cannot be interrupted, the
+    worker still finishes and `cancel()` only makes the result be
+    dropped.  The result is dropped, too, if the editor's text or
+    cursor changes other than through `expect_changes()`.  The worker
+    holds `pycore_lock` while using rope.
+
+    """
+
+    def __init__(self, context, editor):
+        self.editor = editor
+        self.project = context.project
+        self.resource = context.resource
+        self.source = editor.get_text()
+        self.offset = editor.get_current_offset()
+        self.start_offset = rope.contrib.codeassist.starting_offset(
+            self.source, self.offset)
+        self.starting = self.source[self.start_offset:self.offset]
+        self.expression = rope.contrib.codeassist.starting_expression(
+            self.source, self.start_offset)
+        self.maxfixes = context.core.get_prefs().get('codeassist_maxfixes', 1)
+        self.version = editor.get_version()
+        self.key = self._get_key(editor.get_edit_stamp())
+        self.proposals = None
+        self.exception = None
+        self.exc_info = None
+        self.done = False
+        self.cancelled = False
+
+    def start(self):
+        thread = threading.Thread(target=self._run)
+        thread.setDaemon(True)
+        thread.start()
+
+    def _run(self):
+        try:
+            with pycore_lock:
+                if not self.cancelled:
+                    result = rope.contrib.codeassist.code_assist(
+                        self.project, self.source, self.start_offset,
+                        self.resource, maxfixes=self.maxfixes)
+                    self.proposals = rope.contrib.codeassist.\
+                                     sorted_proposals(result)
+        except Exception, e:
+            self.exception = e
+            self.exc_info = sys.exc_info()
+        self.done = True
+
+    def get_proposals(self):
+        """Return the computed proposals and the matching keywords"""
+        if self.expression.strip() != '' or self.starting.strip() == '':
+            return self.proposals
+        keywords = [rope.contrib.codeassist.CompletionProposal(name, 'keyword')
+                    for name in keyword.kwlist
+                    if name.startswith(self.starting)]
+        if not keywords:
+            return self.proposals
+        return rope.contrib.codeassist.sorted_proposals(
+            self.proposals + keywords)
+
+    def finish(self, proposals):
+        """Use `proposals` instead of computing them"""
+        self.proposals = proposals
+        self.done = True
+
+    def cancel(self):
+        self.cancelled = True
+
+    def expect_changes(self):
+        """Accept the current text and cursor of the editor"""
+        self.version = self.editor.get_version()
+        self.offset = self.editor.get_current_offset()
+
+    def is_stale(self):
+        return self.cancelled or \
+               self.version != self.editor.get_version() or \
+               self.offset != self.editor.get_current_offset()
+
+    def _get_key(self, edit_stamp):
+        path = None
+        if self.resource is not None:
+            path = self.resource.path
+        return (path, _get_scope(self.source, self.start_offset),
+                self.expression, edit_stamp)
+
+
+def _get_scope(source, offset):
+    """Return the offset of the function or class containing `offset`
+
+    The scope is guessed from the indentation of the lines before
+    `offset`.  `None` is returned for the module scope.
+
+    """
+    end = source.rfind('\n', 0, offset) + 1
+    line_end = source.find('\n', offset)
+    if line_end == -1:
+        line_end = len(source)
+    indent = _get_indent(source[end:line_end])
+    while indent > 0 and end > 0:
+        start = source.rfind('\n', 0, end - 1) + 1
+        line = source[start:end - 1]
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#') and \
+           _get_indent(line) < indent:
+            if _scope_pattern.match(stripped):
+                return start
+            indent = _get_indent(line)
+        end = start
+    return None
+
+
+_scope_pattern = re.compile(r'(def|class)\b')
+
+
+def _get_indent(line):
+    line = line.expandtabs()
+    return len(line) - len(line.lstrip())
+
+
+class _CodeAssistCache(object):
+    """A LRU cache of code assist proposals
+
+    The keys are the `_CodeAssistJob.key` tuples of resource path,
+    scope, expression before the completed name and the editor's edit
+    stamp; see `GraphicalEditor.get_edit_stamp()`.  So an entry is
+    used only when nothing but the line being completed is edited
+    since it was computed.  Entries are dropped, too, when a module
+    they import changes.
+
+    """
+
+    def __init__(self, project, size=32):
+        self.project = project
+        self.size = size
+        self.entries = {}
+        self.order = []
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.observer = ResourceObserver(self._changed, self._moved,
+                                         self._changed, self._changed)
+        project.add_observer(self.observer)
+
+    def get(self, key):
+        """Return the proposals for `key` or `None`"""
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.order.remove(key)
+        self.order.append(key)
+        return self.entries[key][0]
+
+    def put(self, key, proposals, source):
+        if key in self.entries:
+            self.order.remove(key)
+        self.entries[key] = (proposals, _get_imports(source))
+        self.order.append(key)
+        while len(self.order) > self.size:
+            del self.entries[self.order.pop(0)]
+
+    def close(self):
+        self.project.remove_observer(self.observer)
+
+    def _changed(self, resource):
+        names = _get_module_names(resource)
+        for key, (proposals, imports) in self.entries.items():
+            if _imports_any(imports, names):
+                del self.entries[key]
+                self.order.remove(key)
+                self.invalidations += 1
+
+    def _moved(self, resource, new_resource):
+        self._changed(resource)
+        self._changed(new_resource)
+
+
+_import_pattern = re.compile(
+    r'^[ \t]*(?:from[ \t]+([\w.]+)[ \t]+import[ \t]+([\w, \t(]+)|'
+    r'import[ \t]+([\w., \t]+))', re.M)
+
+
+def _get_imports(source):
+    """Return the names of the modules imported in `source`
+
+    For ``from`` imports, the imported names are added to the module
+    name, too, since they might be modules.
+
+    """
+    result = set()
+    for match in _import_pattern.finditer(source):
+        module, names, modules = match.groups()
+        if module is not None:
+            result.add(module)
+            modules = ','.join([module + '.' + name.strip()
+                                for name in names.replace('(', '').split(',')
+                                if name.strip()])
+        for name in modules.split(','):
+            if name.strip():
+                result.add(name.split()[0])
+    return result
+
+
+def _get_module_names(resource):
+    """Return the names `resource` might be imported with"""
+    path = resource.path
+    if not resource.is_folder():
+        if not path.endswith('.py'):
+            return []
+        path = path[:-3]
+    parts = path.split('/')
+    if parts[-1] == '__init__':
+        del parts[-1]
+    if parts == ['']:
+        return []
+    return ['.'.join(parts[index:]) for index in range(len(parts))]
+
+
+def _imports_any(imports, names):
+    for name in names:
+        for imported in imports:
+            if imported == name or imported.startswith(name + '.') or \
+               name.startswith(imported + '.'):
+                return True
+    return False
+
+
 class DoCodeAssist(object):
+    """Show code assist proposals
+
+    Proposals are computed by a `_CodeAssistJob` while the proposal
+    list is shown with a `_ComputingProposal` and the templates.  A
+    new job cancels the last one.  The proposals are kept in a
+    `_CodeAssistCache` for the project.
+
+    """
+
+    job = None
+    cache = None
 
     def __call__(self, context):
         editor = context.get_active_editor().get_editor()
-        source = editor.get_text()
-        offset = editor.get_current_offset()
-        maxfixes = context.core.get_prefs().get('codeassist_maxfixes', 1)
-        result = rope.contrib.codeassist.code_assist(
-            context.project, source, offset, context.resource, maxfixes=maxfixes)
-        proposals = rope.contrib.codeassist.sorted_proposals(result)
+        if DoCodeAssist.job is not None:
+            DoCodeAssist.job.cancel()
+        job = DoCodeAssist.job = _CodeAssistJob(context, editor)
+        cache = self._get_cache(context)
+        cached = cache.get(job.key)
+        if cached is not None:
+            job.finish(cached)
+        else:
+            job.start()
+        source = job.source
+        offset = job.offset
         expression = rope.contrib.codeassist.starting_expression(source, offset)
-        proposals.extend(self._get_templates(context, expression))
-        start_offset = rope.contrib.codeassist.starting_offset(source, offset)
+        proposals = self._get_templates(context, expression)
+        start_offset = job.start_offset
         toplevel = Tkinter.Toplevel()
         toplevel.title('Code Assist Proposals')
         handle = _CompletionListHandle(editor, toplevel, start_offset)
         enhanced_list = EnhancedList(
             toplevel, handle, title='Code Assist Proposals',
             height=9, width=30, single_keys=False)
-        for proposal in proposals:
-            enhanced_list.add_entry(proposal)
+        proposal_list = _ProposalList(enhanced_list)
+        proposal_list.set_proposals(proposals, computing=True)
         start_index = editor.text.index('0.0 +%dc' % start_offset)
         initial_cursor_position = str(editor.text.index(Tkinter.INSERT))
+        def update_list():
+            proposal_list.show(editor.text.get(start_index, Tkinter.INSERT))
         def key_pressed(event):
             import string
             if len(event.char) == 1 and (event.char.isalnum() or
@@ -128,31 +495,73 @@ class DoCodeAssist(object):
                 return
             else:
                 return
-            new_name = editor.text.get(start_index, Tkinter.INSERT)
-            enhanced_list.clear()
-            for proposal in proposals:
-                if proposal.name.startswith(new_name):
-                    enhanced_list.add_entry(proposal)
+            job.expect_changes()
+            update_list()
+        def poll():
+            if not toplevel.winfo_exists():
+                job.cancel()
+                return
+            if not job.done:
+                toplevel.after(50, poll)
+                return
+            if cached is None and job.exception is None and \
+               job.proposals is not None:
+                cache.put(job.key, job.proposals, job.source)
+            if job.exception is not None:
+                toplevel.destroy()
+                self._report_exception(context, job)
+                return
+            if job.is_stale():
+                # dropping outdated proposals but keeping the list
+                proposal_list.set_proposals(proposals)
+            else:
+                proposal_list.set_proposals(job.get_proposals() + proposals)
+            update_list()
+        update_list()
+        poll()
         enhanced_list.list.focus_set()
         enhanced_list.list.bind('<Any-KeyPress>', key_pressed)
         enhanced_list.list.bind('<Control-g>', lambda event: handle.canceled())
         toplevel.grab_set()
 
-    _templates = None
+    def _get_cache(self, context):
+        cache = DoCodeAssist.cache
+        if cache is None or cache.project is not context.project:
+            if cache is not None:
+                cache.close()
+            cache = DoCodeAssist.cache = _CodeAssistCache(context.project)
+        return cache
+
+    def _report_exception(self, context, job):
+        exception = job.exception
+        if isinstance(exception, rope.base.exceptions.RopeError):
+            context.core._report_error(exception, type(exception).__name__)
+        elif exception is not None:
+            # keeping the traceback of the worker thread
+            raise job.exc_info[0], job.exc_info[1], job.exc_info[2]
+
+    registry = None
 
     def _get_templates(self, context, expression):
-        if self._templates is None:
-            _templates = templates.default_templates()
-            for name, definition in (context.core.get_prefs().
-                                     get('_templates', [])):
-                _templates[name] = templates.Template(definition)
-            self._templates = _templates
-        result = []
-        if '.' not in expression:
-            for name, template in self._templates.items():
-                if name.startswith(expression.strip()):
-                    result.append(templates.TemplateProposal(name, template))
-        return result
+        if '.' in expression:
+            return []
+        prefs = context.core.get_prefs()
+        registry = DoCodeAssist.registry
+        if registry is None or registry.prefs is not prefs:
+            registry = DoCodeAssist.registry = templates.TemplateRegistry(prefs)
+        return registry.get_proposals(expression.strip())
+
+
+def show_code_assist_statistics(context):
+    cache = DoCodeAssist.cache
+    statistics = (0, 0, 0, 0)
+    if cache is not None and cache.project is context.project:
+        statistics = (cache.hits, cache.misses, cache.invalidations,
+                      len(cache.entries))
+    tkMessageBox.showinfo(
+        'Code Assist Statistics',
+        'Cache hits: %d\nCache misses: %d\nInvalidations: %d\n'
+        'Cached entries: %d' % statistics)
 
 
 def _get_template_information(editor, proposal, start_offset):
@@ -345,6 +754,14 @@ def do_correct_line_indentation(context):
     if context.get_active_editor():
         context.get_active_editor().get_editor().correct_line_indentation()
 
+def do_reindent_region(context):
+    if context.get_active_editor():
+        context.get_active_editor().get_editor().reindent_region()
+
+def do_reindent_buffer(context):
+    if context.get_active_editor():
+        context.get_active_editor().get_editor().reindent_buffer()
+
 def do_format_code(context):
     editor = context.editor
     result = ropeide.formatter.Formatter().format(editor.get_text())
@@ -379,8 +796,9 @@ def comment_region(context):
     # IDEA: comments should be indented
     if first_line.lstrip().startswith('#'):
         action = 'uncomment'
-    for i in range(start_line, end_line + 1):
-        _comment_line(editor, i, action)
+    with editor.batch():
+        for i in range(start_line, end_line + 1):
+            _comment_line(editor, i, action)
 
 class _AnnotationListHandle(EnhancedListHandle):
 
@@ -441,8 +859,9 @@ _sort_mapping = {'a': 'alpha', 'k': 'kind',
 def sort_scopes(context, kind):
     sorter = ropeide.sort.get_sorter(_sort_mapping[kind.lower()],
                              reverse=context.prefix)
-    sort_scopes = ropeide.sort.SortScopes(context.project,
-                                  context.resource, context.offset)
+    sort_scopes = ropeide.sort.SortScopes(
+        context.project, context.resource, context.offset,
+        outline=context.get_active_editor().get_outline())
     context.project.do(sort_scopes.get_changes(sorter=sorter))
     
 
@@ -464,6 +883,10 @@ actions = []
 
 actions.append(SimpleAction('code_assist', DoCodeAssist(), 'M-/',
                             MenuAddress(['Source', 'Code Assist (Auto-Complete)'], 'c'), ['python']))
+actions.append(SimpleAction('code_assist_statistics',
+                            show_code_assist_statistics, None,
+                            MenuAddress(['Source', 'Code Assist Statistics']),
+                            ['python']))
 actions.append(SimpleAction('goto_definition', do_goto_definition, 'C-c g',
                             MenuAddress(['Source', 'Goto Definition'], 'd'), ['python']))
 actions.append(SimpleAction('show_doc', do_show_doc, 'C-c C-d',
@@ -476,6 +899,12 @@ actions.append(SimpleAction('find_occurrences', find_occurrences, 'C-c C-s',
 actions.append(SimpleAction('correct_line_indentation', do_correct_line_indentation, 'C-i',
                             MenuAddress(['Source', 'Correct Line Indentation'], 'i', 1),
                             ['python', 'rst']))
+actions.append(SimpleAction('reindent_region', do_reindent_region, 'C-c C-i',
+                            MenuAddress(['Source', 'Reindent Region'], None, 1),
+                            ['python', 'rst']))
+actions.append(SimpleAction('reindent_buffer', do_reindent_buffer, None,
+                            MenuAddress(['Source', 'Reindent Buffer'], None, 1),
+                            ['python', 'rst']))
 actions.append(SimpleAction('format_code', do_format_code, 'C-c C-f',
                             MenuAddress(['Source', 'Remove Extra Spaces And Lines'], None, 1),
                             ['python']))
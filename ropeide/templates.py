@@ -13,41 +13,70 @@ class Template(object):
 
     def __init__(self, template):
         self.template = template
+        self._compile()
 
-    var_pattern = re.compile(r'((?<=[^\$])|^)\${(?P<variable>\w+)}')
+    _single_dollar = re.compile('((?<=[^\$])|^)\$((?=[^{\$])|$)')
+
+    def _compile(self):
+        """Split the template into literal strings and variables
+
+        Variables are kept in ``(name,)`` tuples.  Like in
+        `string.Template`, invalid placeholders make substitutions
+        fail with `ValueError`.
+
+        """
+        self._parts = []
+        self._variables = []
+        self._cursor = None
+        self._invalid = False
+        template = self._single_dollar.sub('$$', self.template)
+        last = 0
+        for match in string.Template.pattern.finditer(template):
+            self._parts.append(template[last:match.start()])
+            last = match.end()
+            if match.group('escaped') is not None:
+                self._parts.append('$')
+                continue
+            name = match.group('named') or match.group('braced')
+            if name is None:
+                self._invalid = True
+                continue
+            if name == 'cursor':
+                self._cursor = len(self._parts)
+            elif name not in self._variables:
+                self._variables.append(name)
+            self._parts.append((name,))
+        self._parts.append(template[last:])
 
     def variables(self):
         """Get template variables
 
         Return the list of variables sorted by their order of
-        occurence in the template.
+        occurence in the template.  The returned list should not be
+        changed.
 
         """
+        return self._variables
+
+    def _substitute(self, parts, mapping):
+        if self._invalid:
+            raise ValueError('Invalid placeholder in template')
         result = []
-        for match in self.var_pattern.finditer(self.template):
-            new_var = match.group('variable')
-            if new_var not in result and new_var != 'cursor':
-                result.append(new_var)
-        return result
-
-    def _substitute(self, input_string, mapping):
-        single_dollar = re.compile('((?<=[^\$])|^)\$((?=[^{\$])|$)')
-        template = single_dollar.sub('$$', input_string)
-        t = string.Template(template)
-        return t.substitute(mapping, cursor='')
+        for part in parts:
+            if isinstance(part, tuple):
+                if part[0] == 'cursor':
+                    continue
+                part = '%s' % (mapping[part[0]],)
+            result.append(part)
+        return ''.join(result)
 
     def substitute(self, mapping):
-        return self._substitute(self.template, mapping)
+        return self._substitute(self._parts, mapping)
 
     def get_cursor_location(self, mapping):
-        cursor_index = len(self.template)
-        for match in self.var_pattern.finditer(self.template):
-            new_var = match.group('variable')
-            if new_var == 'cursor':
-                cursor_index = match.start('variable') - 2
-        new_template = self.template[0:cursor_index]
-        start = len(self._substitute(new_template, mapping))
-        return start
+        if self._cursor is None:
+            return len(self.substitute(mapping))
+        return len(self._substitute(self._parts[:self._cursor], mapping))
 
 
 class TemplateProposal(object):
@@ -58,6 +87,65 @@ class TemplateProposal(object):
         self.template = template
 
 
+class TemplateRegistry(object):
+    """Find code assist templates by name prefixes
+
+    The default templates and the ``templates`` preference entries
+    are kept in a trie whose nodes hold the sorted proposals for the
+    names starting with their prefixes.  The trie is built again when
+    the preference entries change.
+
+    """
+
+    def __init__(self, prefs):
+        self.prefs = prefs
+        self.definitions = None
+        self.trie = None
+
+    def get_proposals(self, prefix):
+        """Return the `TemplateProposal`\s of names starting with `prefix`
+
+        The proposals are sorted by name.  The returned list should not
+        be changed.
+
+        """
+        self._update()
+        node = self.trie
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.proposals
+
+    def _update(self):
+        definitions = self.prefs.get('templates', [])
+        if self.trie is not None and definitions == self.definitions:
+            return
+        self.definitions = list(definitions)
+        templates = default_templates()
+        for name, definition in self.definitions:
+            templates[name] = Template(definition)
+        self.trie = _TrieNode()
+        for name in sorted(templates):
+            self.trie.add(name, TemplateProposal(name, templates[name]))
+
+
+class _TrieNode(object):
+
+    def __init__(self):
+        self.children = {}
+        self.proposals = []
+
+    def add(self, name, proposal):
+        node = self
+        node.proposals.append(proposal)
+        for char in name:
+            if char not in node.children:
+                node.children[char] = _TrieNode()
+            node = node.children[char]
+            node.proposals.append(proposal)
+
+
 def default_templates():
     templates = {}
     templates['main'] = Template("if __name__ == '__main__':\n    ${cursor}\n")
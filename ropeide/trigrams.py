@@ -0,0 +1,336 @@
+"""An index of the trigrams of project files for narrowing searches"""
+import array
+import itertools
+import os
+import sre_constants
+import sre_parse
+import time
+
+import rope.base.taskhandle
+from rope.base.resourceobserver import ResourceObserver
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+
+class TrigramIndex(object):
+    """Index the three byte substrings of the files of a project
+
+    For each lower cased trigram the ids of the files containing it are
+    kept.  A file can contain a keyword only if it contains all of the
+    trigrams of the literal parts of the keyword, so searches need to
+    read only those files; see `get_candidates()`.
+
+    The files are taken from a `ropeide.fileindex.FileIndex`.  Files
+    changed through the project are reindexed when resource observers
+    report them and `update()`, which is called before each search,
+    reindexes the files whose modification times or sizes do not match
+    the index.  Removed files are marked as removed and their ids are
+    dropped from the lists only when there are many of them.
+
+    The index is saved in the project's rope folder when the project
+    is closed and is loaded when it is first used.
+
+    """
+
+    def __init__(self, project, file_index, processes=None):
+        self.project = project
+        self.file_index = file_index
+        self.processes = processes
+        self.loaded = False
+        self.ids = {}
+        self.paths = []
+        self.indicators = []
+        self.postings = {}
+        self.removed_count = 0
+        self.build_time = None
+        self.observer = ResourceObserver(self._changed, self._moved,
+                                         self._created, self._removed)
+        project.add_observer(self.observer)
+        project.data_files.add_write_hook(self.write)
+
+    def get_candidates(self, keyword, regex=False,
+                       task_handle=rope.base.taskhandle.NullTaskHandle()):
+        """Return the paths of the files that might contain `keyword`
+
+        If no trigram can be extracted from `keyword`, all indexed
+        files are returned.  Binary files are never returned.
+
+        """
+        self.update(task_handle)
+        trigrams = set()
+        for literal in get_literals(keyword, regex):
+            trigrams.update(_get_trigrams(literal.lower()))
+        if not trigrams:
+            return [path for path in self.paths
+                    if path is not None and self._is_text(path)]
+        postings = [self.postings.get(trigram, ()) for trigram in trigrams]
+        postings.sort(key=len)
+        ids = set(postings[0])
+        for posting in postings[1:]:
+            if not ids:
+                break
+            ids.intersection_update(posting)
+        return [self.paths[id] for id in sorted(ids)
+                if self.paths[id] is not None]
+
+    def update(self, task_handle=rope.base.taskhandle.NullTaskHandle()):
+        """Index new and changed files and forget the removed ones"""
+        self._load()
+        paths = self.file_index.get_files()
+        current = set(paths)
+        for path in list(self.ids):
+            if path not in current:
+                self._forget(path)
+        changed = [path for path in paths if self._is_changed(path)]
+        self._index_files(changed, task_handle)
+        if self.removed_count > max(1024, len(self.ids)):
+            self._compact()
+
+    def build(self, task_handle=rope.base.taskhandle.NullTaskHandle()):
+        """Index all files again and set `build_time`"""
+        start = time.time()
+        self._load()
+        self._clear()
+        self.update(task_handle)
+        self.build_time = time.time() - start
+
+    def get_file_count(self):
+        return len(self.ids)
+
+    def get_size(self):
+        """Return the approximate size of the index in bytes"""
+        size = 0
+        for trigram, posting in self.postings.iteritems():
+            size += len(trigram) + posting.itemsize * len(posting)
+        for path in self.ids:
+            size += len(path)
+        return size
+
+    def write(self):
+        if not self.loaded:
+            return
+        if self.removed_count:
+            self._compact()
+        postings = {}
+        for trigram, posting in self.postings.iteritems():
+            postings[trigram] = posting.tostring()
+        data = {'version': 1, 'paths': '\n'.join(self.paths),
+                'indicators': self.indicators, 'postings': postings}
+        self.project.data_files.write_data('trigrams', data)
+
+    def close(self):
+        self.project.remove_observer(self.observer)
+
+    def _load(self):
+        if self.loaded:
+            return
+        self.loaded = True
+        data = self.project.data_files.read_data('trigrams')
+        if not isinstance(data, dict) or data.get('version') != 1:
+            return
+        if data['paths']:
+            self.paths = data['paths'].split('\n')
+        self.indicators = data['indicators']
+        for id, path in enumerate(self.paths):
+            self.ids[path] = id
+        for trigram, posting in data['postings'].iteritems():
+            self.postings[trigram] = array.array('i', posting)
+
+    def _clear(self):
+        self.ids.clear()
+        del self.paths[:]
+        del self.indicators[:]
+        self.postings.clear()
+        self.removed_count = 0
+
+    def _is_text(self, path):
+        return self.indicators[self.ids[path]][2]
+
+    def _is_changed(self, path):
+        if path not in self.ids:
+            return True
+        indicator = self.indicators[self.ids[path]]
+        return indicator[:2] != _get_indicator(self._get_real_path(path))
+
+    def _index_files(self, paths, task_handle):
+        job_set = task_handle.create_jobset('Indexing Files', len(paths))
+        jobs = [self._get_real_path(path) for path in paths]
+        pool = None
+        if len(jobs) > 64 and self._get_processes() > 1:
+            pool = multiprocessing.Pool(self.processes)
+            results = pool.imap(_get_file_trigrams, jobs, 16)
+        else:
+            results = (_get_file_trigrams(job) for job in jobs)
+        try:
+            for path, (indicator, trigrams) in itertools.izip(paths, results):
+                job_set.started_job(path)
+                self._add(path, indicator, trigrams)
+                job_set.finished_job()
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def _get_processes(self):
+        if multiprocessing is None:
+            return 1
+        if self.processes is None:
+            return multiprocessing.cpu_count()
+        return self.processes
+
+    def _add(self, path, indicator, trigrams):
+        self._forget(path)
+        if indicator is None:
+            return
+        id = len(self.paths)
+        self.ids[path] = id
+        self.paths.append(path)
+        self.indicators.append(indicator + (trigrams is not None,))
+        for trigram in trigrams or ():
+            if trigram not in self.postings:
+                self.postings[trigram] = array.array('i')
+            self.postings[trigram].append(id)
+
+    def _forget(self, path):
+        if path in self.ids:
+            self.paths[self.ids.pop(path)] = None
+            self.removed_count += 1
+
+    def _compact(self):
+        """Drop the ids of removed files from the lists"""
+        new_ids = {}
+        paths = []
+        indicators = []
+        for id, path in enumerate(self.paths):
+            if path is not None:
+                new_ids[id] = len(paths)
+                paths.append(path)
+                indicators.append(self.indicators[id])
+        for trigram in list(self.postings):
+            posting = array.array('i', [new_ids[id]
+                                        for id in self.postings[trigram]
+                                        if id in new_ids])
+            if posting:
+                self.postings[trigram] = posting
+            else:
+                del self.postings[trigram]
+        self.paths = paths
+        self.indicators = indicators
+        self.ids = dict((path, id) for id, path in enumerate(paths))
+        self.removed_count = 0
+
+    def _get_real_path(self, path):
+        return os.path.join(self.project.address, *path.split('/'))
+
+    def _changed(self, resource):
+        if self.loaded and not resource.is_folder() and \
+           not self.project.is_ignored(resource):
+            self._index_files([resource.path],
+                              rope.base.taskhandle.NullTaskHandle())
+
+    def _created(self, resource):
+        self._changed(resource)
+
+    def _moved(self, resource, new_resource):
+        if not self.loaded:
+            return
+        for path in self._get_paths(resource):
+            id = self.ids.pop(path)
+            new_path = new_resource.path + path[len(resource.path):]
+            self._forget(new_path)
+            self.ids[new_path] = id
+            self.paths[id] = new_path
+
+    def _removed(self, resource):
+        if self.loaded:
+            for path in self._get_paths(resource):
+                self._forget(path)
+
+    def _get_paths(self, resource):
+        if not resource.is_folder():
+            if resource.path in self.ids:
+                return [resource.path]
+            return []
+        prefix = resource.path + '/'
+        return [path for path in self.ids if path.startswith(prefix)]
+
+
+def get_literals(keyword, regex=False):
+    """Return the strings that every match of `keyword` contains
+
+    Only ASCII characters are considered.  For regular expressions,
+    the runs of literal characters outside alternations and repeats
+    are returned.
+
+    """
+    if not regex:
+        return _get_ascii_runs(keyword)
+    try:
+        parsed = sre_parse.parse(keyword)
+    except (sre_constants.error, OverflowError):
+        return []
+    result = []
+    _add_regex_literals(parsed, result)
+    return result
+
+
+def _get_ascii_runs(text):
+    result = []
+    run = []
+    for char in text:
+        if ord(char) < 128:
+            run.append(char)
+        elif run:
+            result.append(''.join(run))
+            run = []
+    if run:
+        result.append(''.join(run))
+    return [str(literal) for literal in result]
+
+
+def _add_regex_literals(parsed, result):
+    run = []
+    for op, av in parsed:
+        if op == sre_constants.LITERAL and av < 128:
+            run.append(chr(av))
+            continue
+        if op == sre_constants.AT:
+            continue
+        if run:
+            result.append(''.join(run))
+            run = []
+        if op == sre_constants.SUBPATTERN:
+            _add_regex_literals(av[-1], result)
+    if run:
+        result.append(''.join(run))
+
+
+def _get_trigrams(text):
+    return set(itertools.imap(text.__getslice__, xrange(len(text) - 2),
+                              xrange(3, len(text) + 1)))
+
+
+def _get_indicator(real_path):
+    try:
+        stat = os.stat(real_path)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+
+def _get_file_trigrams(real_path):
+    """Return the indicator and trigrams of a file
+
+    The trigrams of binary files are `None`.  This function is called
+    in worker processes and should not use project objects.
+
+    """
+    indicator = _get_indicator(real_path)
+    try:
+        data = open(real_path, 'rb').read()
+    except EnvironmentError:
+        return None, None
+    if '\0' in data[:1024]:
+        return indicator, None
+    return indicator, _get_trigrams(data.lower())
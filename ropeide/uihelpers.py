@@ -160,6 +160,23 @@ class EnhancedList(_BaseList):
         self.list.delete(index)
         return self.entries.pop(index)
 
+    def insert_entries(self, entries, index):
+        """Insert `entries` before `index` with one listbox command"""
+        if not entries:
+            return
+        self.entries[index:index] = entries
+        self.list.insert(index, *[self.handle.entry_to_string(entry)
+                                  for entry in entries])
+        if len(self.entries) == len(entries):
+            self.list.selection_set(0)
+
+    def remove_entries(self, start, end):
+        """Remove the entries from `start` up to `end`"""
+        if start >= end:
+            return
+        del self.entries[start:end]
+        self.list.delete(start, end - 1)
+
     def get_entries(self):
         return list(self.entries)
 
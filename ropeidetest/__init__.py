@@ -1,29 +1,38 @@
 import unittest
 
-import ropeidetest.editortest
-import ropeidetest.fileeditortest
-import ropeidetest.coretest
-import ropeidetest.mockeditortest
-import ropeidetest.highlightertest
-import ropeidetest.searchertest
-import ropeidetest.statusbartest
-import ropeidetest.uihelperstest
-import ropeidetest.indentertest
-import ropeidetest.filltest
-import ropeidetest.formattertest
-import ropeidetest.notestest
-import ropeidetest.outlinetest
-import ropeidetest.spellcheckertest
-import ropeidetest.movementstest
-import ropeidetest.sorttest
-import ropeidetest.templatestest
-
 
 def suite():
+    # the tests are imported here so that helper modules like
+    # `ropeidetest.mockeditor` can be imported without a display
+    import ropeidetest.editortest
+    import ropeidetest.fileeditortest
+    import ropeidetest.coretest
+    import ropeidetest.mockeditortest
+    import ropeidetest.highlightertest
+    import ropeidetest.searchertest
+    import ropeidetest.statusbartest
+    import ropeidetest.uihelperstest
+    import ropeidetest.indentertest
+    import ropeidetest.filltest
+    import ropeidetest.formattertest
+    import ropeidetest.notestest
+    import ropeidetest.outlinetest
+    import ropeidetest.spellcheckertest
+    import ropeidetest.movementstest
+    import ropeidetest.sorttest
+    import ropeidetest.templatestest
+    import ropeidetest.lineindextest
+    import ropeidetest.greptest
+    import ropeidetest.fuzzytest
+    import ropeidetest.fileindextest
+    import ropeidetest.trigramstest
+    import ropeidetest.codeassisttest
+
     result = unittest.TestSuite()
     result.addTests(ropeidetest.mockeditortest.suite())
     result.addTests(unittest.makeSuite(ropeidetest.fileeditortest.FileEditorTest))
     result.addTests(unittest.makeSuite(ropeidetest.searchertest.SearchingTest))
+    result.addTests(unittest.makeSuite(ropeidetest.searchertest.MatchesTest))
     result.addTests(unittest.makeSuite(ropeidetest.coretest.CoreTest))
     result.addTests(ropeidetest.editortest.suite())
     result.addTests(ropeidetest.highlightertest.suite())
@@ -33,10 +42,16 @@ def suite():
     result.addTests(unittest.makeSuite(ropeidetest.filltest.FillTest))
     result.addTests(unittest.makeSuite(ropeidetest.formattertest.FormatterTest))
     result.addTests(unittest.makeSuite(ropeidetest.notestest.AnnotationsTest))
-    result.addTests(unittest.makeSuite(ropeidetest.outlinetest.OutlineTest))
+    result.addTests(ropeidetest.outlinetest.suite())
     result.addTests(ropeidetest.movementstest.suite())
     result.addTests(unittest.makeSuite(ropeidetest.sorttest.SortScopesTest))
-    result.addTests(unittest.makeSuite(ropeidetest.templatestest.TemplateTest))
+    result.addTests(ropeidetest.templatestest.suite())
+    result.addTests(unittest.makeSuite(ropeidetest.lineindextest.LineIndexTest))
+    result.addTests(ropeidetest.greptest.suite())
+    result.addTests(ropeidetest.fuzzytest.suite())
+    result.addTests(ropeidetest.fileindextest.suite())
+    result.addTests(ropeidetest.trigramstest.suite())
+    result.addTests(ropeidetest.codeassisttest.suite())
     return result
 
 
@@ -0,0 +1,286 @@
+import time
+import unittest
+
+import rope.base.exceptions
+from ropetest import testutils
+
+from ropeide.actionhelpers import pycore_lock
+from ropeide.sourceactions import (_CodeAssistJob, _CodeAssistCache,
+                                   _ProposalFilter, _ProposalList,
+                                   _diff_sorted, _get_imports, _get_scope)
+from ropeidetest.mockeditor import MockEditor
+
+
+class _MockCore(object):
+
+    def __init__(self, prefs):
+        self.prefs = prefs
+
+    def get_prefs(self):
+        return self.prefs
+
+
+class _MockContext(object):
+
+    def __init__(self, project, resource, **prefs):
+        self.project = project
+        self.resource = resource
+        self.core = _MockCore(prefs)
+
+
+class CodeAssistJobTest(unittest.TestCase):
+
+    def setUp(self):
+        super(CodeAssistJobTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.mod = testutils.create_module(self.project, 'mod')
+        self.editor = MockEditor()
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(CodeAssistJobTest, self).tearDown()
+
+    def _create_job(self, text, **prefs):
+        self.editor.set_text(text)
+        self.editor.set_insert(self.editor.get_end())
+        context = _MockContext(self.project, self.mod, **prefs)
+        return _CodeAssistJob(context, self.editor)
+
+    def test_computing_proposals(self):
+        job = self._create_job('my_var = 1\nmy_')
+        job._run()
+        self.assertTrue(job.done)
+        self.assertEquals(['my_var'],
+                          [proposal.name for proposal in job.proposals
+                           if proposal.name.startswith('my_')])
+
+    def test_computing_proposals_at_the_start_of_names(self):
+        job = self._create_job('my_var = 1\nmy_')
+        self.assertEquals(len('my_var = 1\n'), job.start_offset)
+        job._run()
+        self.assertTrue('len' in [proposal.name for proposal in job.proposals])
+
+    def test_proposing_keywords(self):
+        job = self._create_job('def f():\n    ret')
+        job._run()
+        self.assertTrue('return' in [proposal.name
+                                     for proposal in job.get_proposals()])
+
+    def test_not_proposing_keywords_for_attributes(self):
+        job = self._create_job('class A(object):\n    def f(self):\n'
+                               '        self.ret')
+        job._run()
+        self.assertFalse('return' in [proposal.name
+                                      for proposal in job.get_proposals()])
+
+    def test_job_keys(self):
+        job = self._create_job('class A(object):\n    def f(self):\n'
+                               '        self.a')
+        self.assertEquals(('mod.py', len('class A(object):\n'), 'self.',
+                           self.editor.get_edit_stamp()), job.key)
+
+    def test_not_computing_cancelled_jobs(self):
+        job = self._create_job('my_var = 1\nmy_')
+        job.cancel()
+        job._run()
+        self.assertTrue(job.done)
+        self.assertTrue(job.proposals is None)
+        self.assertTrue(job.is_stale())
+
+    def test_stale_results_after_changes(self):
+        job = self._create_job('my_var = 1\nmy_')
+        self.assertFalse(job.is_stale())
+        self.editor.insert(self.editor.get_end(), 'v')
+        self.assertTrue(job.is_stale())
+
+    def test_expecting_changes(self):
+        job = self._create_job('my_var = 1\nmy_')
+        self.editor.insert(self.editor.get_end(), 'v')
+        job.expect_changes()
+        self.assertFalse(job.is_stale())
+        self.editor.set_insert(self.editor.get_start())
+        self.assertTrue(job.is_stale())
+
+    def test_keeping_exceptions(self):
+        job = self._create_job('def f(:\n    pass\nf', codeassist_maxfixes=0)
+        job._run()
+        self.assertTrue(job.done)
+        self.assertTrue(isinstance(job.exception,
+                                   rope.base.exceptions.RopeError))
+
+    def test_keeping_tracebacks(self):
+        job = self._create_job('my_var = 1\nmy_')
+        job.project = None
+        job._run()
+        self.assertTrue(job.exception is job.exc_info[1])
+        self.assertTrue(job.exc_info[2] is not None)
+
+    def test_holding_the_pycore_lock(self):
+        job = self._create_job('my_var = 1\nmy_')
+        pycore_lock.acquire()
+        try:
+            job.start()
+            time.sleep(0.05)
+            self.assertFalse(job.done)
+        finally:
+            pycore_lock.release()
+        start = time.time()
+        while not job.done and time.time() - start < 5:
+            time.sleep(0.01)
+        self.assertTrue(job.done)
+        self.assertTrue(job.proposals is not None)
+
+
+class CodeAssistCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        super(CodeAssistCacheTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.cache = _CodeAssistCache(self.project, size=2)
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(CodeAssistCacheTest, self).tearDown()
+
+    def test_hits_and_misses(self):
+        self.assertTrue(self.cache.get('a') is None)
+        self.cache.put('a', [1], '')
+        self.assertEquals([1], self.cache.get('a'))
+        self.assertEquals((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_evicting_least_recently_used_entries(self):
+        self.cache.put('a', [1], '')
+        self.cache.put('b', [2], '')
+        self.cache.get('a')
+        self.cache.put('c', [3], '')
+        self.assertTrue(self.cache.get('b') is None)
+        self.assertEquals([1], self.cache.get('a'))
+        self.assertEquals([3], self.cache.get('c'))
+
+    def test_invalidating_on_imported_module_changes(self):
+        pkg = testutils.create_package(self.project, 'pkg')
+        mod = testutils.create_module(self.project, 'mod', pkg)
+        other = testutils.create_module(self.project, 'other')
+        self.cache.put('a', [1], 'from pkg import mod\n')
+        self.cache.put('b', [2], 'import os\n')
+        other.write('x = 1\n')
+        self.assertEquals(0, self.cache.invalidations)
+        mod.write('x = 1\n')
+        self.assertTrue(self.cache.get('a') is None)
+        self.assertEquals([2], self.cache.get('b'))
+        self.assertEquals(1, self.cache.invalidations)
+
+    def test_closing(self):
+        mod = testutils.create_module(self.project, 'mod')
+        self.cache.put('a', [1], 'import mod\n')
+        self.cache.close()
+        mod.write('x = 1\n')
+        self.assertEquals([1], self.cache.get('a'))
+
+    def test_get_imports(self):
+        self.assertEquals(set(['a', 'b.c']), _get_imports('import a, b.c as d'))
+        self.assertEquals(set(['a.b', 'a.b.c', 'a.b.d']),
+                          _get_imports('def f():\n    from a.b import (c, d)'))
+
+    def test_get_scope(self):
+        source = 'class A(object):\n\n    def f(self):\n' \
+                 '        if True:\n            a\n        b\n    c\nd\n'
+        self.assertEquals(len('class A(object):\n\n'),
+                          _get_scope(source, source.index('a\n')))
+        self.assertEquals(len('class A(object):\n\n'),
+                          _get_scope(source, source.index('b\n')))
+        self.assertEquals(0, _get_scope(source, source.index('c\n')))
+        self.assertTrue(_get_scope(source, source.index('d\n')) is None)
+
+
+class _Proposal(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+class _MockList(object):
+
+    def __init__(self):
+        self.entries = []
+
+    def add_entry(self, entry):
+        self.entries.append(entry)
+
+    def insert_entries(self, entries, index):
+        self.entries[index:index] = entries
+
+    def remove_entries(self, start, end):
+        del self.entries[start:end]
+
+    def clear(self):
+        self.entries = []
+
+    def get_entries(self):
+        return list(self.entries)
+
+    def activate(self, index):
+        pass
+
+
+class ProposalFilterTest(unittest.TestCase):
+
+    def _get_filter(self, *names):
+        return _ProposalFilter([_Proposal(name) for name in names])
+
+    def test_finding_prefixes(self):
+        proposal_filter = self._get_filter('b', 'ab', 'abc', 'a')
+        self.assertEquals([1, 2, 3], proposal_filter.find('a'))
+        self.assertEquals([1, 2], proposal_filter.find('ab'))
+        self.assertEquals([], proposal_filter.find('abd'))
+
+    def test_empty_prefixes(self):
+        proposal_filter = self._get_filter('b', 'a')
+        self.assertEquals([0, 1], proposal_filter.find(''))
+
+    def test_shortening_prefixes(self):
+        proposal_filter = self._get_filter('ab', 'ac', 'b')
+        self.assertEquals([0], proposal_filter.find('ab'))
+        self.assertEquals([0, 1], proposal_filter.find('a'))
+        self.assertEquals([2], proposal_filter.find('b'))
+
+    def test_diff_sorted(self):
+        for old, new in [([], [1, 2]), ([1, 2], []), ([1, 3], [2]),
+                         ([1, 2, 3, 4], [2, 4]), ([2, 4], [1, 2, 3, 4, 5])]:
+            result = list(old)
+            for index, removed, inserted in _diff_sorted(old, new):
+                result[index:index + removed] = inserted
+            self.assertEquals(new, result)
+
+    def test_proposal_lists(self):
+        proposals = [_Proposal('ab'), _Proposal('b'), _Proposal('ac')]
+        enhanced_list = _MockList()
+        proposal_list = _ProposalList(enhanced_list)
+        proposal_list.set_proposals(proposals)
+        proposal_list.show('a')
+        self.assertEquals([proposals[0], proposals[2]], enhanced_list.entries)
+        proposal_list.show('ac')
+        self.assertEquals([proposals[2]], enhanced_list.entries)
+        proposal_list.show('')
+        self.assertEquals(proposals, enhanced_list.entries)
+
+    def test_computing_placeholders(self):
+        proposal = _Proposal('a')
+        enhanced_list = _MockList()
+        proposal_list = _ProposalList(enhanced_list)
+        proposal_list.set_proposals([proposal], computing=True)
+        proposal_list.show('a')
+        self.assertEquals(2, len(enhanced_list.entries))
+        self.assertEquals(proposal, enhanced_list.entries[0])
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(CodeAssistJobTest))
+    result.addTests(unittest.makeSuite(CodeAssistCacheTest))
+    result.addTests(unittest.makeSuite(ProposalFilterTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,7 @@ import os
 import unittest
 
 from ropeide.core import Core, RopeError
+from ropeide.extension import SimpleAction
 from ropetest import testutils
 
 
@@ -106,6 +107,20 @@ class CoreTest(unittest.TestCase):
         self.assertEquals('another text', file1.read())
         self.assertEquals('another text', file2.read())
 
+    def test_caching_available_actions(self):
+        actions = self.core.get_available_actions()
+        self.assertTrue(actions is self.core.get_available_actions())
+        action = SimpleAction('sample_action', lambda context: None, None)
+        self.core.register_action(action)
+        self.assertFalse(actions is self.core.get_available_actions())
+        self.assertTrue(action in self.core.get_available_actions())
+
+    def test_recent_actions(self):
+        action = SimpleAction('sample_action', lambda context: None, None)
+        self.core.perform_action(action)
+        self.assertEquals('sample_action',
+                          self.core.get_recent_actions()[-1])
+
 
 if __name__ == '__main__':
     unittest.main()
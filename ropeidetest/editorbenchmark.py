@@ -0,0 +1,69 @@
+"""Measure how long opening large files takes in `GraphicalEditor`
+
+Usage: python -m ropeidetest.editorbenchmark [lines...]
+
+For each size a python module is loaded into an editor.  "first
+paint" is the time it takes to insert the text and highlight the
+visible lines and "all" includes highlighting the rest of the file in
+idle time.  The same numbers are reported for highlighting in the
+worker thread and for highlighting everything at once.
+
+"""
+import sys
+import time
+
+import Tkinter
+
+from ropeide import core, editingcontexts
+from ropeide.editor import GraphicalEditor
+from ropeidetest.highlighterbenchmark import make_python_source
+
+
+def _wait_for_highlighting(editor):
+    while editor.pending_highlighting is not None or \
+          editor.highlighting_request is not None:
+        editor.text.update()
+        # events generated in other threads are not delivered
+        # outside `mainloop()`
+        editor._receive_highlights()
+
+
+def measure_opening(frame, source, mode='lazy'):
+    """Return the time to first paint and to highlight everything"""
+    editor = GraphicalEditor(frame, editingcontexts.python)
+    if mode != 'background':
+        editor._cancel_highlights()
+        editor.highlight_in_background = False
+    if mode == 'at once':
+        editor.lazy_highlighting_lines = sys.maxint
+    editor.text.pack()
+    editor.text.update()
+    start = time.time()
+    editor.set_text(source)
+    editor._text_changed()
+    editor.text.update_idletasks()
+    first_paint = time.time() - start
+    _wait_for_highlighting(editor)
+    everything = time.time() - start
+    editor.text.destroy()
+    return first_paint, everything
+
+
+def main(sizes):
+    root = Tkinter.Tk()
+    editingcontexts.init_contexts(core.get_core())
+    frame = Tkinter.Frame(root)
+    frame.pack()
+    print '%8s %12s %12s %12s' % ('lines', 'mode', 'first paint', 'all')
+    for size in sizes:
+        source = make_python_source(size)
+        for mode in ('background', 'lazy', 'at once'):
+            first_paint, everything = measure_opening(frame, source, mode)
+            print '%8d %12s %11.3fs %11.3fs' % (
+                size, mode, first_paint, everything)
+    root.destroy()
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]]
+    main(sizes or [1000, 10000, 50000])
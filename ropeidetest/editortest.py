@@ -4,7 +4,7 @@ import Tkinter
 from ropeidetest.mockeditortest import (GraphicalEditorFactory,
                                         get_sample_editingcontext)
 from ropeide.indenter import PythonCodeIndenter
-from ropeide import editor
+from ropeide import editor, editingcontexts
 
 
 class GraphicalEditorTest(unittest.TestCase):
@@ -397,6 +397,42 @@ class GraphicalEditorTest(unittest.TestCase):
         self.editor.set_insert(self.editor.get_index(40))
         self.assertEquals(40, self.editor.get_current_offset())
 
+    def test_offsets_after_changing_the_text(self):
+        self.editor.set_text('line1\nline2\nline3\n')
+        self.assertEquals('2.2', self.editor.get_index(8)._getIndex())
+        self.editor.insert(self.editor.get_index(8), 'new\nline\n')
+        self.editor.delete(self.editor.get_index(0), self.editor.get_index(6))
+        self.assertEquals('linew\nline\nne2\nline3\n', self.editor.get_text())
+        self.editor.set_insert(self.editor.get_index(11))
+        self.assertEquals(3, self.editor.get_current_line_number())
+        self.assertEquals(11, self.editor.get_current_offset())
+
+    def test_edit_stamps(self):
+        self.editor.set_text('line1\nline2\n')
+        self.editor.set_insert(self.editor.get_index(8))
+        stamp = self.editor.get_edit_stamp()
+        self.editor.insert(self.editor.get_insert(), 'x')
+        self.editor.delete(self.editor.get_index(7), self.editor.get_index(8))
+        self.assertEquals(stamp, self.editor.get_edit_stamp())
+        self.editor.insert(self.editor.get_index(0), 'y')
+        self.assertNotEquals(stamp, self.editor.get_edit_stamp())
+
+    def test_edit_stamps_after_breaking_lines(self):
+        self.editor.set_text('def f():\n    \n')
+        self.editor.set_insert(self.editor.get_index(13))
+        stamp = self.editor.get_edit_stamp()
+        self.editor.insert(self.editor.get_insert(), 'foo = 1')
+        self.editor.insert(self.editor.get_insert(), '\n    ')
+        self.assertNotEquals(stamp, self.editor.get_edit_stamp())
+
+    def test_edit_stamps_after_leaving_edited_lines(self):
+        self.editor.set_text('line1\nline2\n')
+        self.editor.set_insert(self.editor.get_index(2))
+        stamp = self.editor.get_edit_stamp()
+        self.editor.insert(self.editor.get_insert(), 'x')
+        self.editor.set_insert(self.editor.get_index(8))
+        self.assertNotEquals(stamp, self.editor.get_edit_stamp())
+
     def test_after_indenting_insert_position(self):
         self.editor.set_indenter(PythonCodeIndenter(self.editor))
         self.editor.set_text("print 'hello'\n        print 'hello'\n")
@@ -482,6 +518,121 @@ class TextChangeInspectorTest(unittest.TestCase):
         self.text.delete('1.1', '1.2')
         self.assertEquals(('1.1', '1.4'), self.change_inspector.get_changed_region())
 
+    def test_get_changed_region_for_symbolic_indices(self):
+        self.text.insert('insert', 'sample\ntext')
+        self.change_inspector.clear_changed()
+        self.text.mark_set('insert', '1.2')
+        self.text.insert('insert', 'a\nb')
+        self.assertEquals(('1.2', '2.1'), self.change_inspector.get_changed_region())
+        self.text.delete('end -2c')
+        self.assertEquals(('1.2', '3.3'), self.change_inspector.get_changed_region())
+
+    def test_get_changed_region_after_deleting_lines(self):
+        self.text.insert('insert', 'a\nb\nc\nd\n')
+        self.change_inspector.clear_changed()
+        self.text.insert('4.0', 'x')
+        self.text.delete('1.1', '3.0')
+        self.assertEquals(('1.1', '2.1'), self.change_inspector.get_changed_region())
+
+    def test_delaying_notifications_in_batches(self):
+        self.text.insert('insert', 'sample text')
+        self.change_inspector.clear_changed()
+        self.change_inspector.flush_scheduled = False
+        batch = self.change_inspector.batch()
+        batch.__enter__()
+        self.text.insert('1.0', 'a')
+        self.text.delete('1.3')
+        self.assertFalse(self.change_inspector.flush_scheduled)
+        batch.__exit__(None, None, None)
+        self.assertTrue(self.change_inspector.flush_scheduled)
+        self.assertEquals(('1.0', '1.3'), self.change_inspector.get_changed_region())
+
+
+class HighlightingTest(unittest.TestCase):
+    """Compare the tags after editing with highlighting the text again"""
+
+    __factory = GraphicalEditorFactory(Tkinter.Frame())
+
+    def setUp(self):
+        super(HighlightingTest, self).setUp()
+        get_sample_editingcontext()
+        self.editor = self._create_editor()
+
+    def tearDown(self):
+        super(HighlightingTest, self).tearDown()
+
+    def _create_editor(self):
+        result = HighlightingTest.__factory.create(editingcontexts.python)
+        result.highlight_in_background = False
+        return result
+
+    def _get_tags(self, editor):
+        editor.text.update_idletasks()
+        result = {}
+        for style in editor.highlighting.get_styles():
+            result[style] = [str(index)
+                             for index in editor.text.tag_ranges(style)]
+        return result
+
+    def _assert_highlighted_again(self):
+        fresh = self._create_editor()
+        fresh.set_text(self.editor.get_text())
+        self.assertEquals(self._get_tags(fresh), self._get_tags(self.editor))
+
+    def test_highlighting(self):
+        self.editor.set_text('def f():\n    return "s"\n')
+        tags = self._get_tags(self.editor)
+        self.assertEquals(['1.0', '1.3'], tags['defkeyword'])
+        self.assertEquals(['2.11', '2.14'], tags['string'])
+
+    def test_adjacent_ranges_of_the_same_style(self):
+        self.editor.set_text('x = "a""b"\n')
+        self._get_tags(self.editor)
+        self.editor.insert(self.editor.get_index(len('x = "a"')), ' ')
+        self._assert_highlighted_again()
+        self.editor.delete(self.editor.get_index(len('x = "a"')),
+                           self.editor.get_index(len('x = "a" ')))
+        self._assert_highlighted_again()
+
+    def test_ranges_crossing_the_changed_region(self):
+        self.editor.set_text('x = 1\n' + 'def f():\n    pass\n' * 20)
+        self._get_tags(self.editor)
+        self.editor.insert(self.editor.get_index(len('x = 1\n')), "'''")
+        self._assert_highlighted_again()
+        self.editor.insert(self.editor.get_end(), "'''")
+        self._assert_highlighted_again()
+        self.editor.delete(self.editor.get_index(len('x = 1\n')),
+                           self.editor.get_index(len("x = 1\n'''")))
+        self._assert_highlighted_again()
+
+    def test_removed_ranges(self):
+        self.editor.set_text('def f():\n    return None  # comment\n')
+        self._get_tags(self.editor)
+        self.editor.insert(self.editor.get_index(len('def f():\n    ret')),
+                           'x')
+        offset = len('def f():\n    retxurn None  ')
+        self.editor.delete(self.editor.get_index(offset),
+                           self.editor.get_index(offset + 1))
+        self._assert_highlighted_again()
+        tags = self._get_tags(self.editor)
+        self.assertEquals([], tags['keyword'])
+        self.assertEquals([], tags['comment'])
+
+    def test_highlighting_long_regions_lazily(self):
+        self.editor.lazy_highlighting_lines = 10
+        self.editor.highlighting_chunk_lines = 5
+        highlighted = []
+        highlight_range = self.editor._highlight_range
+        def record(start, end):
+            highlighted.append(start)
+            highlight_range(start, end)
+        self.editor._highlight_range = record
+        self.editor.set_text('def f():\n    return "s"\n' * 50)
+        self.editor.text.update_idletasks()
+        self.assertTrue(len(highlighted) > 1)
+        self.assertFalse(self.editor.text.tag_ranges('pending_highlight'))
+        self._assert_highlighted_again()
+
 
 class KillRingManagerTest(unittest.TestCase):
 
@@ -529,6 +680,7 @@ def suite():
     result = unittest.TestSuite()
     result.addTests(unittest.makeSuite(GraphicalEditorTest))
     result.addTests(unittest.makeSuite(TextChangeInspectorTest))
+    result.addTests(unittest.makeSuite(HighlightingTest))
     result.addTests(unittest.makeSuite(KillRingManagerTest))
     return result
 
@@ -0,0 +1,132 @@
+import os
+import unittest
+
+import rope.base.project
+from ropetest import testutils
+
+from ropeide.fileindex import FileIndex
+
+
+class FileIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        super(FileIndexTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.index = FileIndex(self.project)
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(FileIndexTest, self).tearDown()
+
+    def _reopen_project(self):
+        self.index.close()
+        self.project.close()
+        self.project = rope.base.project.Project(
+            self.project.address, ignored_resources=['.ropeproject'])
+        self.index = FileIndex(self.project)
+
+    def _touch_folder(self, folder):
+        mtime = os.path.getmtime(folder.real_path) + 10
+        os.utime(folder.real_path, (mtime, mtime))
+
+    def test_empty_projects(self):
+        self.assertEquals([], self.index.get_files())
+
+    def test_listing_files(self):
+        self.project.root.create_file('a.txt')
+        pkg = self.project.root.create_folder('pkg')
+        pkg.create_file('b.txt')
+        index = FileIndex(self.project)
+        self.assertEquals(['a.txt', 'pkg/b.txt'], index.get_files())
+
+    def test_sorting_files(self):
+        testutils.create_package(self.project, 'pkg')
+        testutils.create_module(self.project, 'b')
+        testutils.create_module(self.project, 'a')
+        index = FileIndex(self.project)
+        self.assertEquals(['a.py', 'b.py', 'pkg/__init__.py'],
+                          index.get_files())
+
+    def test_creating_files(self):
+        self.index.get_files()
+        self.project.root.create_file('a.txt')
+        self.assertEquals(['a.txt'], self.index.get_files())
+
+    def test_creating_folders(self):
+        self.index.get_files()
+        pkg = self.project.root.create_folder('pkg')
+        pkg.create_file('a.txt')
+        self.assertEquals(['pkg/a.txt'], self.index.get_files())
+
+    def test_removing_files(self):
+        a_txt = self.project.root.create_file('a.txt')
+        self.index.get_files()
+        a_txt.remove()
+        self.assertEquals([], self.index.get_files())
+
+    def test_removing_folders(self):
+        pkg = self.project.root.create_folder('pkg')
+        pkg.create_folder('sub').create_file('a.txt')
+        self.index.get_files()
+        pkg.remove()
+        self.assertEquals([], self.index.get_files())
+        self.assertEquals([self.project.root],
+                          list(self.index.observer.resources))
+
+    def test_moving_folders(self):
+        pkg = self.project.root.create_folder('pkg')
+        pkg.create_folder('sub').create_file('a.txt')
+        self.index.get_files()
+        pkg.move('new_pkg')
+        self.assertEquals(['new_pkg/sub/a.txt'], self.index.get_files())
+
+    def test_returning_the_same_list_if_not_changed(self):
+        self.project.root.create_file('a.txt')
+        files = self.index.get_files()
+        self.assertTrue(files is self.index.get_files())
+        self.project.root.create_file('b.txt')
+        self.assertFalse(files is self.index.get_files())
+
+    def test_saving_the_index(self):
+        self.project.root.create_folder('pkg').create_file('a.txt')
+        self.index.get_files()
+        self._reopen_project()
+        self.assertTrue(self.index.loaded)
+        self.assertEquals(['pkg/a.txt'], self.index.get_files())
+
+    def test_finding_changes_made_while_closed(self):
+        pkg = self.project.root.create_folder('pkg')
+        pkg.create_file('a.txt')
+        self.project.root.create_folder('old').create_file('b.txt')
+        self.index.get_files()
+        self._reopen_project()
+        open(os.path.join(pkg.real_path, 'c.txt'), 'w').close()
+        os.remove(os.path.join(pkg.real_path, 'a.txt'))
+        self._touch_folder(pkg)
+        testutils.remove_recursively(
+            os.path.join(self.project.address, 'old'))
+        self._touch_folder(self.project.root)
+        self.assertEquals(['pkg/c.txt'], self.index.get_files())
+
+    def test_not_listing_unchanged_folders_when_loaded(self):
+        self.project.root.create_folder('pkg').create_file('a.txt')
+        self.index.get_files()
+        self._reopen_project()
+        listed = []
+        update_folder = self.index._update_folder
+        def _update_folder(folder):
+            listed.append(folder)
+            return update_folder(folder)
+        self.index._update_folder = _update_folder
+        self.index.get_files()
+        self.assertEquals([], listed)
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(FileIndexTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+
+from ropeide.fuzzy import FuzzyMatcher, get_score
+
+
+class FuzzyMatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        super(FuzzyMatcherTest, self).setUp()
+
+    def tearDown(self):
+        super(FuzzyMatcherTest, self).tearDown()
+
+    def test_simple_matching(self):
+        matcher = FuzzyMatcher(['abc', 'def'])
+        self.assertEquals(['abc'], matcher.find_matches('a'))
+
+    def test_matching_subsequences(self):
+        matcher = FuzzyMatcher(['editor.py', 'tree.py', 'reindent.py'])
+        self.assertEquals(['editor.py'], matcher.find_matches('eto'))
+
+    def test_empty_keywords(self):
+        matcher = FuzzyMatcher(['abc'])
+        self.assertEquals([], matcher.find_matches(''))
+
+    def test_preferring_word_starts(self):
+        matcher = FuzzyMatcher(['reformat_manager.py', 'format_manager.py'])
+        self.assertEquals(['format_manager.py', 'reformat_manager.py'],
+                          matcher.find_matches('fm'))
+
+    def test_preferring_camel_case_humps(self):
+        matcher = FuzzyMatcher(['Formatter.py', 'FindMatches.py'])
+        self.assertEquals('FindMatches.py', matcher.find_matches('fm')[0])
+
+    def test_preferring_consecutive_characters(self):
+        matcher = FuzzyMatcher(['axbxcx', 'abcxxx'])
+        self.assertEquals(['abcxxx', 'axbxcx'], matcher.find_matches('abc'))
+
+    def test_preferring_shorter_texts(self):
+        matcher = FuzzyMatcher(['abcdef', 'abc'])
+        self.assertEquals(['abc', 'abcdef'], matcher.find_matches('abc'))
+
+    def test_keeping_entries_order_for_equal_scores(self):
+        matcher = FuzzyMatcher(['abd', 'abc'])
+        self.assertEquals(['abd', 'abc'], matcher.find_matches('ab'))
+
+    def test_smart_case(self):
+        matcher = FuzzyMatcher(['Abc', 'abc'])
+        self.assertEquals(2, len(matcher.find_matches('ab')))
+        self.assertEquals(['Abc'], matcher.find_matches('Ab'))
+
+    def test_limiting_the_number_of_matches(self):
+        matcher = FuzzyMatcher(['a%d' % i for i in range(100)], limit=10)
+        self.assertEquals(10, len(matcher.find_matches('a')))
+
+    def test_narrowing_matches(self):
+        matcher = FuzzyMatcher(['ab', 'abc', 'ac'])
+        self.assertEquals(['ab', 'abc'], matcher.find_matches('ab'))
+        self.assertEquals(['abc'], matcher.find_matches('abc'))
+        self.assertEquals(['ab', 'abc'], matcher.find_matches('ab'))
+        self.assertEquals(['ac', 'abc'], matcher.find_matches('ac'))
+
+    def test_many_matches(self):
+        entries = ['x%dabc' % i for i in range(1000)] + ['abc']
+        matcher = FuzzyMatcher(entries, limit=1)
+        self.assertEquals(['abc'], matcher.find_matches('a'))
+        self.assertEquals(['abc'], matcher.find_matches('ab'))
+
+    def test_finding_the_best_matches_among_many(self):
+        entries = ['x_long_y_name_z_%d.py' % i for i in range(5000)]
+        entries.append('my_xyz.py')
+        matcher = FuzzyMatcher(entries, limit=10)
+        self.assertEquals('my_xyz.py', matcher.find_matches('xyz')[0])
+
+    def test_special_characters(self):
+        matcher = FuzzyMatcher(['a.b', 'a]^-b', 'ab'])
+        self.assertEquals(['a.b'], matcher.find_matches('a.'))
+        self.assertEquals(['a]^-b'], matcher.find_matches(']^-'))
+
+    def test_to_search_text(self):
+        matcher = FuzzyMatcher([1, 2], lambda entry: 'entry%d' % entry)
+        self.assertEquals([2], matcher.find_matches('y2'))
+
+    def test_bonus(self):
+        bonuses = {'abcdef': 100}
+        matcher = FuzzyMatcher(['abc', 'abcdef'], get_bonus=
+                               lambda entry: bonuses.get(entry, 0))
+        self.assertEquals(['abcdef', 'abc'], matcher.find_matches('abc'))
+
+    def test_get_score(self):
+        self.assertTrue(get_score('abc', 'xyz') is None)
+        self.assertTrue(get_score('cba', 'abc') is None)
+        self.assertTrue(get_score('ABC', 'abc') is None)
+        self.assertTrue(get_score('ab', 'abc') > get_score('ac', 'abc'))
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(FuzzyMatcherTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()
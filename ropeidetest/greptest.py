@@ -0,0 +1,180 @@
+import unittest
+
+import rope.base.exceptions
+import rope.base.taskhandle
+from ropetest import testutils
+
+from ropeide.grep import ProjectGrep, ProjectReplace, grep_file, get_pattern
+
+
+class GrepTest(unittest.TestCase):
+
+    def setUp(self):
+        super(GrepTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.mod1 = testutils.create_module(self.project, 'mod1')
+        self.mod2 = testutils.create_module(self.project, 'mod2')
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(GrepTest, self).tearDown()
+
+    def _grep(self, keyword, **kwds):
+        found = []
+        ProjectGrep(self.project, keyword, **kwds).run(found.extend)
+        return sorted([(match.resource.path, match.offset,
+                        match.lineno, match.line) for match in found])
+
+    def test_simple_grep(self):
+        self.mod1.write('a = 1\nb = 2\n')
+        self.mod2.write('b = 3\n')
+        self.assertEquals([('mod1.py', 6, 2, 'b = 2'), ('mod2.py', 0, 1, 'b = 3')],
+                          self._grep('b'))
+
+    def test_reporting_each_line_once(self):
+        self.mod1.write('aa\na\n')
+        self.assertEquals([('mod1.py', 0, 1, 'aa'), ('mod1.py', 3, 2, 'a')],
+                          self._grep('a'))
+
+    def test_regex_grep(self):
+        self.mod1.write('a1 = 1\nb = a22\n')
+        self.assertEquals([('mod1.py', 0, 1, 'a1 = 1'),
+                           ('mod1.py', 11, 2, 'b = a22')],
+                          self._grep(r'a\d+', regex=True))
+
+    def test_literal_grep(self):
+        self.mod1.write('a.b\naxb\n')
+        self.assertEquals([('mod1.py', 0, 1, 'a.b')], self._grep('a.b'))
+
+    def test_smart_case(self):
+        self.mod1.write('Ab\nab\n')
+        self.assertEquals(2, len(self._grep('ab')))
+        self.assertEquals(1, len(self._grep('Ab')))
+
+    def test_ignoring_binary_files(self):
+        binary = self.project.root.create_file('binary')
+        binary.write('a\0b')
+        self.assertEquals([], self._grep('a'))
+
+    def test_memory_mapped_files(self):
+        path = self.mod1.real_path
+        self.mod1.write('x\n' * 1000 + 'a\n' + 'x\n' * 1000)
+        self.assertEquals([(2000, 1001, 'a')],
+                          grep_file(path, get_pattern('a'), mmap_size=100))
+        self.assertEquals(grep_file(path, get_pattern('x')),
+                          grep_file(path, get_pattern('x'), mmap_size=100))
+
+    def test_returning_match_count(self):
+        self.mod1.write('a\na\n')
+        self.mod2.write('a\n')
+        grep = ProjectGrep(self.project, 'a')
+        self.assertEquals(3, grep.run(lambda matches: None))
+
+    def test_stopping(self):
+        self.mod1.write('a\n')
+        handle = rope.base.taskhandle.TaskHandle()
+        handle.stop()
+        grep = ProjectGrep(self.project, 'a')
+        try:
+            grep.run(lambda matches: None, handle)
+            self.fail('should have been interrupted')
+        except rope.base.exceptions.InterruptedTaskError:
+            pass
+
+    def test_failing_patterns(self):
+        self.mod1.write('a\n')
+        grep = ProjectGrep(self.project, 'a')
+        grep.pattern = _FailingPattern()
+        self.assertEquals(0, grep.run(lambda matches: None))
+
+
+class _FailingPattern(object):
+
+    def finditer(self, data):
+        raise RuntimeError('failing pattern')
+
+
+class ProjectReplaceTest(unittest.TestCase):
+
+    processes = 1
+
+    def setUp(self):
+        super(ProjectReplaceTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.mod1 = testutils.create_module(self.project, 'mod1')
+        self.mod2 = testutils.create_module(self.project, 'mod2')
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(ProjectReplaceTest, self).tearDown()
+
+    def _get_changes(self, keyword, replacement, **kwds):
+        replace = ProjectReplace(self.project, keyword, replacement,
+                                 processes=self.processes, **kwds)
+        return replace.get_changes()
+
+    def test_simple_replace(self):
+        self.mod1.write('a = 1\nb = a\n')
+        self.mod2.write('b = 2\n')
+        self.project.do(self._get_changes('a', 'c'))
+        self.assertEquals('c = 1\nb = c\n', self.mod1.read())
+        self.assertEquals('b = 2\n', self.mod2.read())
+
+    def test_changing_only_files_with_matches(self):
+        self.mod1.write('a = 1\n')
+        self.mod2.write('b = 2\n')
+        changes = self._get_changes('a', 'c')
+        self.assertEquals([self.mod1],
+                          [change.resource for change in changes.changes])
+
+    def test_regex_replace(self):
+        self.mod1.write('a1 = a22\n')
+        self.project.do(self._get_changes(r'a(\d+)', r'b\1', regex=True))
+        self.assertEquals('b1 = b22\n', self.mod1.read())
+
+    def test_literal_replace(self):
+        self.mod1.write('a.b = axb\n')
+        self.project.do(self._get_changes('a.b', r'c\1'))
+        self.assertEquals('c\\1 = axb\n', self.mod1.read())
+
+    def test_undoing(self):
+        self.mod1.write('a = 1\n')
+        self.project.do(self._get_changes('a', 'c'))
+        self.project.history.undo()
+        self.assertEquals('a = 1\n', self.mod1.read())
+
+    def test_bad_patterns(self):
+        try:
+            self._get_changes('(a', 'b', regex=True)
+            self.fail('should have failed')
+        except rope.base.exceptions.RefactoringError:
+            pass
+
+    def test_stopping(self):
+        self.mod1.write('a\n')
+        handle = rope.base.taskhandle.TaskHandle()
+        handle.stop()
+        replace = ProjectReplace(self.project, 'a', 'b',
+                                 processes=self.processes)
+        try:
+            replace.get_changes(handle)
+            self.fail('should have been interrupted')
+        except rope.base.exceptions.InterruptedTaskError:
+            pass
+
+
+class ProcessPoolReplaceTest(ProjectReplaceTest):
+
+    processes = 2
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(GrepTest))
+    result.addTests(unittest.makeSuite(ProjectReplaceTest))
+    result.addTests(unittest.makeSuite(ProcessPoolReplaceTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()
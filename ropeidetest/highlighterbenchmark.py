@@ -0,0 +1,280 @@
+"""Benchmarks for `ropeide.highlighter` that do not need a display
+
+Usage: python -m ropeidetest.highlighterbenchmark [options]
+
+For each corpus the time to highlight the whole text, the number of
+tokens per second and the latency of highlighting again after single
+character edits at a few positions are reported, as well as the time
+it takes to open many python buffers after startup and the peak
+memory of the whole process after all corpora.  Use ``--save`` to store the results as a
+baseline and ``--compare`` to print the change relative to a stored
+baseline.
+
+"""
+import optparse
+import re
+import sys
+import time
+
+from ropeide import highlighter
+from ropeide.highlighter import PythonHighlighting, ReSTHighlighting
+from ropeidetest.mockeditor import MockEditor
+
+
+def make_python_source(lines):
+    """Return a python module with roughly `lines` lines"""
+    block = ['class Sample%d(object):',
+             '    """A sample class',
+             '',
+             '    with a multiline docstring',
+             '    """',
+             '',
+             '    def method(self, arg=None):',
+             '        # a comment about %d',
+             '        if arg is not None and len(arg) > 1:',
+             '            return "string %s" % str(arg)',
+             "        return 'another string'",
+             '']
+    return _repeat_block(block, lines)
+
+
+def make_docstring_source(lines):
+    """Return a python module that is mostly docstrings"""
+    block = ['def function%d(arg):',
+             '    """Do something with `arg`',
+             ''] + \
+            ['    A line of the docstring with "quotes" and \'quotes\' %d'] * 20 + \
+            ['    """',
+             '    return arg',
+             '']
+    return _repeat_block(block, lines)
+
+
+def make_long_lines_source(lines, width=10000):
+    """Return a python module with very long lines"""
+    piece = 'value = call(a, "string", 1) + None  # '
+    line = (piece * (width // len(piece) + 1))[:width]
+    return '\n'.join([line] * lines) + '\n'
+
+
+def make_rest_source(lines):
+    """Return a ReST document with roughly `lines` lines"""
+    block = ['Section %d',
+             '==========',
+             '',
+             'A paragraph with *emphasis*, **strong emphasis**, ``literals``',
+             'and `interpreted text` that links to rope_ and `rope site`_.',
+             '',
+             '* a list item',
+             '* another list item with http://rope.sf.net/ in it',
+             '',
+             ':field: value',
+             '',
+             '.. note:: a directive',
+             '',
+             'A literal block follows::',
+             '',
+             '  def f():',
+             '      pass',
+             '',
+             '.. a comment',
+             '   continued here',
+             '']
+    return _repeat_block(block, lines)
+
+
+def _repeat_block(block, lines):
+    result = []
+    count = 0
+    while len(result) < lines:
+        for line in block:
+            if '%d' in line:
+                line = line % count
+            result.append(line)
+        count += 1
+    return '\n'.join(result[:lines]) + '\n'
+
+
+def get_corpora(quick=False):
+    """Return a list of (name, highlighting class, source) tuples"""
+    sizes = [1000, 10000, 100000]
+    if quick:
+        sizes = [1000, 10000]
+    result = []
+    for size in sizes:
+        result.append(('python-%d' % size, PythonHighlighting,
+                       make_python_source(size)))
+    result.append(('docstrings-10000', PythonHighlighting,
+                   make_docstring_source(10000)))
+    result.append(('longlines-100', PythonHighlighting,
+                   make_long_lines_source(100)))
+    for size in sizes[:-1]:
+        result.append(('rest-%d' % size, ReSTHighlighting,
+                       make_rest_source(size)))
+    return result
+
+
+class HighlightingBenchmark(object):
+    """Simulate highlighting a `MockEditor` the way `GraphicalEditor` does"""
+
+    edit_positions = [0.0, 0.5, 0.99]
+
+    def __init__(self, highlighting_class, source):
+        self.highlighting = highlighting_class()
+        self.editor = MockEditor()
+        self.editor.set_text(source)
+
+    def full(self):
+        """Return (seconds, tokens) for highlighting the whole text"""
+        text = self.editor.get_text()
+        start = time.time()
+        tokens = 0
+        for token in self.highlighting.highlights(text, 0, len(text)):
+            tokens += 1
+        return time.time() - start, tokens
+
+    def incremental(self, char='x'):
+        """Return the mean seconds spent after inserting `char`
+
+        The character is inserted and removed at each of
+        `edit_positions`; computing the changed region and
+        highlighting it are both measured.
+
+        """
+        line_states = self.highlighting.create_line_states()
+        if line_states is not None:
+            line_states.reset(self.editor.get_text())
+        total = 0.0
+        count = 0
+        for position in self.edit_positions:
+            offset = int(len(self.editor.get_text()) * position)
+            index = self.editor.get_index(offset)
+            self.editor.insert(index, char)
+            total += self._rehighlight(line_states, offset, offset + 1)
+            self.editor.delete(index, self.editor.get_index(offset + 1))
+            total += self._rehighlight(line_states, offset, offset)
+            count += 2
+        return total / count
+
+    def _rehighlight(self, line_states, change_start, change_end):
+        start_time = time.time()
+        text = self.editor.get_text()
+        if line_states is not None:
+            start, end = line_states.update(text, change_start, change_end)
+        else:
+            start, end = self.highlighting.get_suspected_region_after_change(
+                text, change_start, change_end)
+        for token in self.highlighting.highlights(text, start, end):
+            pass
+        return time.time() - start_time
+
+
+def measure_opening_buffers(count, lines=1000, visible_lines=60):
+    """Return the seconds spent for opening `count` python buffers
+
+    Compiled patterns are discarded first, so the time includes
+    building them like the first buffers opened after startup.
+
+    """
+    source = make_python_source(lines)
+    visible = len('\n'.join(source.split('\n')[:visible_lines]))
+    highlighter._patterns.clear()
+    re.purge()
+    start = time.time()
+    for i in range(count):
+        highlighting = PythonHighlighting()
+        highlighting.create_line_states().reset(source)
+        for token in highlighting.highlights(source, 0, visible):
+            pass
+    return time.time() - start
+
+
+def get_peak_memory():
+    """Return the peak memory usage of this process in kilobytes"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        usage //= 1024
+    return usage
+
+
+def run(corpora, buffers=40, out=sys.stdout):
+    """Run the benchmarks and return a {(corpus, metric): value} dict"""
+    results = {}
+    results[('buffers-%d' % buffers, 'open_ms')] = \
+        measure_opening_buffers(buffers) * 1000
+    for name, highlighting_class, source in corpora:
+        benchmark = HighlightingBenchmark(highlighting_class, source)
+        seconds, tokens = benchmark.full()
+        results[(name, 'full_seconds')] = seconds
+        results[(name, 'tokens_per_second')] = tokens / max(seconds, 1e-6)
+        results[(name, 'edit_ms')] = benchmark.incremental() * 1000
+        results[(name, 'quote_edit_ms')] = benchmark.incremental('"') * 1000
+        out.write('.')
+        out.flush()
+    out.write('\n')
+    # the peak never decreases, so it is not reported for each corpus
+    memory = get_peak_memory()
+    if memory is not None:
+        results[('process', 'peak_memory_kb')] = memory
+    return results
+
+
+def save_results(results, filename):
+    output = open(filename, 'w')
+    try:
+        for (name, metric), value in sorted(results.items()):
+            output.write('%s %s %r\n' % (name, metric, value))
+    finally:
+        output.close()
+
+
+def load_results(filename):
+    results = {}
+    input = open(filename)
+    try:
+        for line in input:
+            if line.strip():
+                name, metric, value = line.split()
+                results[(name, metric)] = float(value)
+    finally:
+        input.close()
+    return results
+
+
+def report(results, baseline=None, out=sys.stdout):
+    out.write('%-18s %-18s %14s %10s\n' % ('corpus', 'metric',
+                                            'value', 'change'))
+    for (name, metric), value in sorted(results.items()):
+        change = ''
+        if baseline and baseline.get((name, metric)):
+            old = baseline[(name, metric)]
+            change = '%+.1f%%' % ((value - old) * 100.0 / old)
+        out.write('%-18s %-18s %14.4f %10s\n' % (name, metric, value, change))
+
+
+def main(args):
+    parser = optparse.OptionParser(usage='%prog [options]')
+    parser.add_option('--quick', action='store_true', default=False,
+                      help='skip the largest corpora')
+    parser.add_option('--buffers', type='int', default=40, metavar='N',
+                      help='measure opening N python buffers')
+    parser.add_option('--save', metavar='FILE',
+                      help='store the results in FILE as a baseline')
+    parser.add_option('--compare', metavar='FILE',
+                      help='compare the results with the baseline in FILE')
+    options, args = parser.parse_args(args)
+    results = run(get_corpora(options.quick), options.buffers)
+    baseline = None
+    if options.compare:
+        baseline = load_results(options.compare)
+    report(results, baseline)
+    if options.save:
+        save_results(results, options.save)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
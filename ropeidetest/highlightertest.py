@@ -1,7 +1,10 @@
+import threading
+import time
 import unittest
 
 from ropeide.highlighter import (PythonHighlighting, HighlightingStyle,
-                                 ReSTHighlighting, NoHighlighting)
+                                 ReSTHighlighting, NoHighlighting,
+                                 TokenizeHighlighting, HighlightingWorker)
 class HighlightTest(unittest.TestCase):
 
     def setUp(self):
@@ -120,6 +123,129 @@ class HighlightTest(unittest.TestCase):
         suspected = self.highlighting.get_suspected_region_after_change(text, 2, 3)
         self.assertEquals((0, len(text)), suspected)
 
+    def test_sharing_compiled_patterns(self):
+        other = PythonHighlighting()
+        self.assertTrue(self.highlighting._get_pattern() is
+                        other._get_pattern())
+        self.assertFalse(self.highlighting._get_pattern() is
+                         ReSTHighlighting()._get_pattern())
+
+    def test_line_states(self):
+        line_states = self.highlighting.create_line_states()
+        line_states.reset('a = 1\nb = """\nhello\n"""\n')
+        self.assertEquals([None, '"""', '"""', None, None], line_states.states)
+
+    def test_line_states_for_comments_and_short_strings(self):
+        line_states = self.highlighting.create_line_states()
+        line_states.reset('# """\na = "\\\n"\nb = \'"\'\n')
+        self.assertEquals([None, '"', None, None, None], line_states.states)
+
+    def test_line_states_after_changes(self):
+        line_states = self.highlighting.create_line_states()
+        text = 'a = 1\nb = 2\nc = 3\n'
+        line_states.reset(text)
+        text = 'a = 1\nb = """2\nc = 3\n'
+        region = line_states.update(text, 10, 13)
+        self.assertEquals([None, '"""', '"""', '"""'], line_states.states)
+        self.assertEquals((6, len(text)), region)
+
+    def test_line_states_stopping_when_states_do_not_change(self):
+        line_states = self.highlighting.create_line_states()
+        text = 'a = 1\nb = 2\nc = 3\n'
+        line_states.reset(text)
+        text = 'a = 1\nb = 23\nc = 3\n'
+        self.assertEquals((6, 12), line_states.update(text, 11, 12))
+
+    def test_line_states_when_changing_inside_strings(self):
+        line_states = self.highlighting.create_line_states()
+        text = 'a = """\nhello\n"""\nb = 2\n'
+        line_states.reset(text)
+        text = 'a = """\nhello world\n"""\nb = 2\n'
+        self.assertEquals((0, text.index('\nb')),
+                          line_states.update(text, 13, 19))
+
+    def test_line_states_regions(self):
+        line_states = self.highlighting.create_line_states()
+        text = 'a = 1\nb = """\nhello\n"""\nc = 2\n'
+        line_states.reset(text)
+        self.assertEquals((0, 5), line_states.get_region(text, 2, 3))
+        self.assertEquals((6, text.index('\nc')),
+                          line_states.get_region(text, 14, 16))
+
+    def test_line_states_after_removing_lines(self):
+        line_states = self.highlighting.create_line_states()
+        text = 'a = """\nhello\n"""\nb = 2\n'
+        line_states.reset(text)
+        text = 'a = ""\nb = 2\n'
+        line_states.update(text, 6, 6)
+        self.assertEquals([None, None, None], line_states.states)
+
+
+class TokenizeHighlightTest(HighlightTest):
+
+    def setUp(self):
+        super(TokenizeHighlightTest, self).setUp()
+        self.highlighting = TokenizeHighlighting()
+
+    def test_sharing_compiled_patterns(self):
+        # the patterns compiled in `tokenize` module are used
+        other = TokenizeHighlighting()
+        list(other.highlights('def f():\n    return "a"\n', 0, None))
+        self.assertTrue(other.pattern is None)
+
+    def test_numbers(self):
+        self.assertTrue('number' in self.highlighting.get_styles())
+        text = 'a = 1 + 0x1F + 1.5e3 + .5j'
+        highs = [(4, 5, 'number'), (8, 12, 'number'), (15, 20, 'number'),
+                 (23, 26, 'number')]
+        self._assertOutcomesEquals(text, highs)
+
+    def test_decorators(self):
+        self.assertTrue('decorator' in self.highlighting.get_styles())
+        text = '@property\ndef f(self):\n    pass\n@a.b\nclass C:\n'
+        highs = [(0, 9, 'decorator'), (10, 13, 'defkeyword'),
+                 (text.index('@a'), text.index('@a') + 4, 'decorator')]
+        self._assertOutcomesEquals(text, highs)
+
+    def test_string_prefixes(self):
+        text = "a = f'{x}' + rb'y' + ur'z'"
+        highs = [(4, 10, 'string'), (13, 18, 'string'), (21, 26, 'string')]
+        self._assertOutcomesEquals(text, highs)
+
+    def test_strings_continued_with_backslashes(self):
+        text = 'a = "line1\\\nline2"\nb = 1\n'
+        highs = [(4, text.index('\nb'), 'string')]
+        self._assertOutcomesEquals(text, highs)
+
+    def test_unterminated_triple_quoted_strings(self):
+        text = 'a = """\nhello\n'
+        highs = [(4, len(text), 'string')]
+        self._assertOutcomesEquals(text, highs)
+
+    def test_unterminated_strings(self):
+        text = 'a = r"abc\nb = "abc\nc = 1'
+        highs = [(4, 9, 'string'), (14, 18, 'string')]
+        self._assertOutcomesEquals(text, highs)
+
+    def test_builtins_after_dots(self):
+        text = 'a.None + None'
+        highs = [(9, 13, 'builtin')]
+        not_highs = [(2, 6, 'builtin')]
+        self._assertOutcomesEquals(text, highs, not_highs)
+
+    def test_adversarial_inputs(self):
+        texts = ['"""' + '\\\n' * 40,
+                 "'''" + "''" * 5000,
+                 '"' + '\\"' * 5000,
+                 'a' * 100000,
+                 '"' + '\\' * 10001 + '\n' + 'x' * 100]
+        for text in texts:
+            highlights = list(self.highlighting.highlights(text, 0,
+                                                           len(text)))
+            self.assertTrue(len(highlights) <= len(text))
+            for start, end, kind in highlights:
+                self.assertTrue(0 <= start < end <= len(text))
+
 
 class ReSTHighlightTest(unittest.TestCase):
 
@@ -301,12 +427,82 @@ class ReSTHighlightTest(unittest.TestCase):
         self.assertEquals((text.index('* 1'), text.index('* 3') - 1), suspected)
 
 
+
+class _BlockingHighlighting(PythonHighlighting):
+
+    def __init__(self):
+        super(_BlockingHighlighting, self).__init__()
+        self.started = threading.Event()
+        self.resume = threading.Event()
+
+    def highlights(self, text, start, end):
+        self.started.set()
+        self.resume.wait(5)
+        return super(_BlockingHighlighting, self).highlights(text, start, end)
+
+
+class HighlightingWorkerTest(unittest.TestCase):
+
+    def setUp(self):
+        super(HighlightingWorkerTest, self).setUp()
+        self.worker = HighlightingWorker()
+        self.highlighting = PythonHighlighting()
+        self.results = []
+        self.finished = threading.Event()
+
+    def tearDown(self):
+        super(HighlightingWorkerTest, self).tearDown()
+
+    def _done(self, name):
+        def done(highlights):
+            self.results.append((name, highlights))
+            self.finished.set()
+        return done
+
+    def test_computing_highlights(self):
+        text = 'def f():\n    pass\n'
+        self.worker.request('a', self.highlighting, text, 0, len(text),
+                            self._done('a'))
+        self.finished.wait(5)
+        expected = list(self.highlighting.highlights(text, 0, len(text)))
+        self.assertEquals([('a', expected)], self.results)
+
+    def test_replacing_waiting_requests(self):
+        blocking = _BlockingHighlighting()
+        self.worker.request('a', blocking, 'pass', 0, 4, self._done('a'))
+        blocking.started.wait(5)
+        self.worker.request('b', self.highlighting, 'a', 0, 1, self._done('b1'))
+        self.worker.request('b', self.highlighting, 'if', 0, 2, self._done('b2'))
+        blocking.resume.set()
+        self._wait_for_results(2)
+        self.assertEquals(['a', 'b2'], [name for name, h in self.results])
+        self.assertEquals([(0, 2, 'keyword')], self.results[1][1])
+
+    def test_canceling_requests(self):
+        blocking = _BlockingHighlighting()
+        self.worker.request('a', blocking, 'pass', 0, 4, self._done('a'))
+        blocking.started.wait(5)
+        self.worker.request('b', self.highlighting, 'if', 0, 2, self._done('b'))
+        self.worker.cancel('b')
+        self.worker.request('c', self.highlighting, 'if', 0, 2, self._done('c'))
+        blocking.resume.set()
+        self._wait_for_results(2)
+        self.assertEquals(['a', 'c'], [name for name, h in self.results])
+
+    def _wait_for_results(self, count):
+        start = time.time()
+        while len(self.results) < count and time.time() - start < 5:
+            time.sleep(0.01)
+
+
+
 def suite():
     result = unittest.TestSuite()
     result.addTests(unittest.makeSuite(HighlightTest))
+    result.addTests(unittest.makeSuite(TokenizeHighlightTest))
     result.addTests(unittest.makeSuite(ReSTHighlightTest))
+    result.addTests(unittest.makeSuite(HighlightingWorkerTest))
     return result
 
 if __name__ == '__main__':
     unittest.main()
-
@@ -0,0 +1,58 @@
+"""Measure reindenting python modules with `PythonCodeIndenter`
+
+Usage: python -m ropeidetest.indenterbenchmark [lines...]
+
+For each size a python module whose lines are all indented two more
+spaces is loaded into a `MockEditor` and reindented using
+`reindent_region()`.  For smaller sizes, the time of correcting the
+indentation of each line separately is reported, too.
+
+"""
+import sys
+import time
+
+from ropeide.indenter import PythonCodeIndenter
+from ropeidetest.highlighterbenchmark import make_python_source
+from ropeidetest.mockeditor import MockEditor
+
+
+def _get_misindented_source(lines):
+    source = make_python_source(lines)
+    return '\n'.join(['  ' + line for line in source.split('\n')])
+
+
+def measure_reindent_region(source):
+    editor = MockEditor()
+    editor.set_text(source)
+    indenter = PythonCodeIndenter(editor)
+    start = time.time()
+    indenter.reindent_region(1, editor.line_editor().length())
+    return time.time() - start
+
+
+def measure_each_line(source):
+    editor = MockEditor()
+    editor.set_text(source)
+    indenter = PythonCodeIndenter(editor)
+    line_editor = editor.line_editor()
+    start = time.time()
+    for lineno in range(1, line_editor.length() + 1):
+        if line_editor.get_line(lineno).strip() != '':
+            indenter.correct_indentation(lineno)
+    return time.time() - start
+
+
+def main(sizes, each_line_limit=500):
+    print '%8s %12s %12s' % ('lines', 'region', 'each line')
+    for size in sizes:
+        source = _get_misindented_source(size)
+        region = measure_reindent_region(source)
+        each_line = '-'
+        if size <= each_line_limit:
+            each_line = '%11.3fs' % measure_each_line(source)
+        print '%8d %11.3fs %12s' % (size, region, each_line)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]]
+    main(sizes or [500, 2000, 10000])
@@ -2,7 +2,7 @@ import unittest
 
 from rope.base import codeanalyze
 from ropeide.indenter import (PythonCodeIndenter, NormalIndenter,
-                              _StatementRangeFinder)
+                              _StatementRangeFinder, _ScannerStates)
 from ropeidetest.mockeditortest import MockEditorFactory
 
 
@@ -340,6 +340,82 @@ class PythonCodeIndenterTest(unittest.TestCase):
         finder = self.get_range_finder('a = (10 +', 1)
         self.assertTrue(finder.is_line_continued())
 
+    def test_resuming_from_scanner_states(self):
+        code = 'def f():\n    a = [1,\n         (2,\n          3)]\n' \
+               '    s = """\n    x = (\n    """\n    b = 1 + \\\n        2\n'
+        lines = codeanalyze.ArrayLinesAdapter(code.split('\n'))
+        states = _ScannerStates()
+        for lineno in range(1, lines.length() + 1):
+            expected = _StatementRangeFinder(lines, lineno)
+            actual = _StatementRangeFinder(lines, lineno, states)
+            self.assertEquals(expected.get_statement_start(),
+                              actual.get_statement_start())
+            self.assertEquals(expected.open_parens, actual.open_parens)
+            self.assertEquals(expected.is_line_continued(),
+                              actual.is_line_continued())
+
+    def test_invalidating_scanner_states(self):
+        lines = codeanalyze.ArrayLinesAdapter(['a = (1,', '2,', '3)'])
+        states = _ScannerStates()
+        _StatementRangeFinder(lines, 3, states)
+        self.assertEquals(3, states.get_state(1, 3)[0])
+        states.invalidate(2)
+        self.assertEquals(2, states.get_state(1, 3)[0])
+        states.invalidate(0)
+        self.assertEquals((1, None), states.get_state(1, 3))
+
+    def test_indenting_after_changing_previous_lines(self):
+        self.editor.set_text('a = (1,\n2)\n')
+        self.indenter.correct_indentation(2)
+        self.assertEquals('a = (1,\n     2)\n', self.editor.get_text())
+        self.editor.set_text('a = 1\n     2\n')
+        self.indenter.correct_indentation(2)
+        self.assertEquals('a = 1\n2\n', self.editor.get_text())
+
+    def test_telling_indenter_about_changed_lines(self):
+        self.editor.set_text('a = (1,\n2)\n')
+        self.indenter.correct_indentation(2)
+        self.editor.set_text('a = 1\n     2\n')
+        self.indenter.lines_changed(1)
+        self.indenter.correct_indentation(2)
+        self.assertEquals('a = 1\n2\n', self.editor.get_text())
+
+    def test_reindenting_a_region(self):
+        self.editor.set_text('def f(a,\nb):\nif a:\nreturn [1,\n2]\nreturn b\n')
+        self.indenter.reindent_region(1, 6)
+        self.assertEquals('def f(a,\n      b):\n    if a:\n        return [1,\n'
+                          '                2]\n    return b\n',
+                          self.editor.get_text())
+
+    def test_reindenting_like_correcting_each_line(self):
+        code = 'class A(object):\ndef f(self):\nx = (1,\n(2, 3),\n4)\n' \
+               'y = x + \\\n1\nfor i in x:\nif i:\nbreak\nelse:\npass\n' \
+               'try:\npass\nexcept:\nraise\nreturn y\n'
+        self.editor.set_text(code)
+        for lineno in range(1, 18):
+            self.indenter.correct_indentation(lineno)
+        expected = self.editor.get_text()
+        self.editor.set_text(code)
+        self.indenter.reindent_region(1, 17)
+        self.assertEquals(expected, self.editor.get_text())
+
+    def test_reindenting_part_of_a_text(self):
+        self.editor.set_text('def f():\n    a = 1\nb = 2\nc = 3\n')
+        self.indenter.reindent_region(3, 3)
+        self.assertEquals('def f():\n    a = 1\n    b = 2\nc = 3\n',
+                          self.editor.get_text())
+
+    def test_not_reindenting_blank_lines_and_strings(self):
+        self.editor.set_text('def f():\n  \n"""\n  s\n"""\n')
+        self.indenter.reindent_region(1, 5)
+        self.assertEquals('def f():\n  \n    """\n  s\n"""\n',
+                          self.editor.get_text())
+
+    def test_reindenting_a_region_with_normal_indenter(self):
+        self.editor.set_text('a\n    b\nc\n')
+        NormalIndenter(self.editor).reindent_region(2, 3)
+        self.assertEquals('a\nb\nc\n', self.editor.get_text())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from ropeide.lineindex import LineIndex
+
+
+class LineIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        super(LineIndexTest, self).setUp()
+
+    def tearDown(self):
+        super(LineIndexTest, self).tearDown()
+
+    def test_empty_text(self):
+        index = LineIndex('')
+        self.assertEquals(1, index.get_line_count())
+        self.assertEquals(0, index.get_offset(1, 0))
+        self.assertEquals((1, 0), index.get_position(0))
+
+    def test_getting_offsets(self):
+        index = LineIndex('line1\nline2\n')
+        self.assertEquals(3, index.get_line_count())
+        self.assertEquals(0, index.get_offset(1, 0))
+        self.assertEquals(8, index.get_offset(2, 2))
+        self.assertEquals(12, index.get_offset(3, 0))
+
+    def test_getting_positions(self):
+        index = LineIndex('line1\nline2\n')
+        self.assertEquals((1, 5), index.get_position(5))
+        self.assertEquals((2, 0), index.get_position(6))
+        self.assertEquals((3, 0), index.get_position(12))
+
+    def test_out_of_range_offsets_and_positions(self):
+        index = LineIndex('line1\nline2')
+        self.assertEquals((2, 5), index.get_position(100))
+        self.assertEquals((1, 0), index.get_position(-1))
+        self.assertEquals(11, index.get_offset(10, 0))
+        self.assertEquals(5, index.get_offset(1, 20))
+
+    def test_inserting(self):
+        index = LineIndex('line1\nline2\n')
+        index.insert(2, 2, 'a\nb\nc')
+        self.assertEquals(5, index.get_line_count())
+        self.assertEquals(17, index.get_length())
+        self.assertEquals((4, 1), index.get_position(13))
+
+    def test_inserting_at_the_end(self):
+        index = LineIndex('line1')
+        index.insert(2, 0, '\n')
+        self.assertEquals(2, index.get_line_count())
+        self.assertEquals(6, index.get_offset(2, 0))
+
+    def test_deleting(self):
+        index = LineIndex('line1\nline2\nline3\n')
+        index.delete(1, 2, 3, 1)
+        self.assertEquals(2, index.get_line_count())
+        self.assertEquals((1, 6), index.get_position(6))
+        self.assertEquals(7, index.get_offset(2, 0))
+
+    def test_deleting_in_a_line(self):
+        index = LineIndex('line1\nline2\n')
+        index.delete(1, 1, 1, 3)
+        self.assertEquals(4, index.get_offset(2, 0))
+
+    def test_many_lines(self):
+        text = ''.join(['line%d\n' % i for i in range(1000)])
+        index = LineIndex(text)
+        index.insert(500, 0, 'new\n' * 300)
+        index.delete(10, 0, 20, 0)
+        lines = text.splitlines(True)
+        lines[499:499] = ['new\n'] * 300
+        del lines[9:19]
+        text = ''.join(lines)
+        for offset in range(0, len(text), 7):
+            line = text.count('\n', 0, offset) + 1
+            column = offset - text.rfind('\n', 0, offset) - 1
+            self.assertEquals((line, column), index.get_position(offset))
+            self.assertEquals(offset, index.get_offset(line, column))
+
+
+if __name__ == '__main__':
+    unittest.main()
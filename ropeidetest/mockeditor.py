@@ -31,12 +31,24 @@ class MockEditor(object):
         self.content = ''
         self.insertIndex = MockTextIndex(self, 0)
         self.status_bar_manager = None
+        self.version = 0
+        self.all_matches = None
 
     def get_text(self):
         return self.content
 
+    def get_version(self):
+        return self.version
+
+    def get_edit_stamp(self):
+        return self.version
+
+    def batch(self):
+        return _MockBatch()
+
     def set_text(self, text):
         self.content = text
+        self.version += 1
 
     def get_start(self):
         return MockTextIndex(self, 0)
@@ -58,9 +70,15 @@ class MockEditor(object):
     def get_index(self, offset):
         return self.get_relative(self.get_start(), offset)
 
+    def get_offset(self, index):
+        return index._getIndex()
+
     def set_insert(self, index):
         self.insertIndex = index
 
+    def get_current_offset(self):
+        return self.insertIndex._getIndex()
+
     def get(self, start = None, end = None):
         sindex = start
         eindex = end
@@ -76,6 +94,7 @@ class MockEditor(object):
     def insert(self, textIndex, text):
         self.content = self.content[0:textIndex._getIndex()] \
             + text + self.content[textIndex._getIndex():]
+        self.version += 1
 
     def delete(self, start = None, end = None):
         startIndex = self.insertIndex._getIndex()
@@ -85,6 +104,7 @@ class MockEditor(object):
         if end is not None:
             endIndex = end._getIndex()
         self.content = self.content[:startIndex] + self.content[endIndex:]
+        self.version += 1
 
     def highlight_match(self, match):
         if not match:
@@ -94,6 +114,9 @@ class MockEditor(object):
         else:
             self.insertIndex = match.start
 
+    def highlight_all_matches(self, matches):
+        self.all_matches = matches
+
     def search(self, keyword, start, case=True, forwards=True):
         content = self.content
         if not case:
@@ -112,6 +135,15 @@ class MockEditor(object):
         return MockLineEditor(self)
 
 
+class _MockBatch(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+
 class MockTextIndex(object):
     def __init__(self, editor, index):
         self.editor = editor
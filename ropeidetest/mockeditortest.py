@@ -111,6 +111,18 @@ class TextEditorTest(unittest.TestCase):
         self.editor.delete(self.editor.get_index(11))
         self.assertEquals('sample textanother piece of text', self.editor.get_text())
 
+    def test_text_versions(self):
+        version = self.editor.get_version()
+        self.assertEquals(version, self.editor.get_version())
+        self.editor.insert(self.editor.get_end(), ' changed')
+        self.assertNotEquals(version, self.editor.get_version())
+
+    def test_text_versions_after_deleting(self):
+        version = self.editor.get_version()
+        self.editor.delete(self.editor.get_index(1), self.editor.get_index(3))
+        self.assertNotEquals(version, self.editor.get_version())
+        self.assertEquals('sple text', self.editor.get_text())
+
     def test_searching(self):
         found = self.editor.search('s', self.editor.get_insert())
         self.assertEquals(self.editor.get_start(), found)
@@ -1,5 +1,7 @@
 import unittest
 import ropeide.movements
+from ropeide.outline import OutlineModel
+from ropeidetest.mockeditor import MockEditor
 
 
 class StatementsTest(unittest.TestCase):
@@ -106,6 +108,22 @@ class ScopesTest(unittest.TestCase):
         self.assertEquals(code.index('def f'),
                           scopes.prev(code.index('def g')))
 
+    def test_using_outlines(self):
+        code = 'def f():\n    """\n    def g():\n    """\n\n\ndef h():\n' \
+               '    pass\n'
+        editor = MockEditor()
+        editor.set_text(code)
+        scopes = ropeide.movements.Scopes(code, OutlineModel(editor))
+        self.assertEquals(code.index('\n\n\n'), scopes.next(0))
+        self.assertEquals(0, scopes.prev(code.index('def h') - 1))
+
+    def test_outlines_with_syntax_errors(self):
+        code = 'def f(:\n    pass\n\ndef g():\n    pass\n'
+        editor = MockEditor()
+        editor.set_text(code)
+        scopes = ropeide.movements.Scopes(code, OutlineModel(editor))
+        self.assertEquals(code.index('\n\n'), scopes.next(0))
+
 
 def suite():
     result = unittest.TestSuite()
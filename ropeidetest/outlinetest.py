@@ -1,7 +1,8 @@
 import unittest
 
-from ropeide.outline import PythonOutline
+from ropeide.outline import PythonOutline, OutlineModel
 from ropetest import testutils
+from ropeidetest.mockeditor import MockEditor
 
 
 class OutlineTest(unittest.TestCase):
@@ -56,6 +57,104 @@ class OutlineTest(unittest.TestCase):
         self.assertEquals('class', nodes[0].get_kind())
         self.assertEquals('function', nodes[1].get_kind())
 
+    def test_end_lines(self):
+        src = 'class C(object):\n    def f(self):\n        pass\n\n' \
+              '    a = 1\n\nb = 2\n'
+        nodes = self.outline.get_root_nodes(src)
+        self.assertEquals(5, nodes[0].get_end_line())
+        self.assertEquals(3, nodes[0].get_children()[0].get_end_line())
+
+    def test_docs(self):
+        src = 'def f():\n    """doc"""\ndef g():\n    pass\n'
+        nodes = self.outline.get_root_nodes(src)
+        self.assertEquals('doc', nodes[0].get_doc())
+        self.assertTrue(nodes[1].get_doc() is None)
+
+
+class OutlineModelTest(unittest.TestCase):
+
+    def setUp(self):
+        super(OutlineModelTest, self).setUp()
+        self.editor = MockEditor()
+        self.outline = OutlineModel(self.editor)
+
+    def _get_names(self, nodes):
+        return [(node.get_name(), node.get_line_number()) for node in nodes]
+
+    def test_simple_outlines(self):
+        self.editor.set_text('def f():\n    pass\n\nclass C(object):\n'
+                             '    def g(self):\n        pass\n')
+        nodes = self.outline.get_root_nodes()
+        self.assertEquals([('f', 1), ('C', 4)], self._get_names(nodes))
+        self.assertEquals([('g', 5)], self._get_names(nodes[1].get_children()))
+        self.assertEquals(6, nodes[1].get_end_line())
+
+    def test_caching_by_version(self):
+        self.editor.set_text('def f():\n    pass\n')
+        nodes = self.outline.get_root_nodes()
+        self.assertTrue(nodes is self.outline.get_root_nodes())
+        self.editor.set_text('def g():\n    pass\n')
+        self.assertEquals([('g', 1)],
+                          self._get_names(self.outline.get_root_nodes()))
+
+    def test_parsing_only_changed_statements(self):
+        self.editor.set_text('def f():\n    pass\ndef g():\n    pass\n')
+        self.outline.get_root_nodes()
+        chunk = self.outline.chunks['def f():\n    pass']
+        self.editor.set_text('def f():\n    pass\ndef h():\n    pass\n')
+        self.assertEquals([('f', 1), ('h', 3)],
+                          self._get_names(self.outline.get_root_nodes()))
+        self.assertTrue(chunk is self.outline.chunks['def f():\n    pass'])
+
+    def test_statements_spanning_lines(self):
+        self.editor.set_text('x = [\n1]\ns = """\ndef a():\n"""\n'
+                             '@decorator\ndef f():\n    pass\n'
+                             'if x:\n    pass\nelse:\n    def g():\n'
+                             '        pass\n')
+        self.assertEquals([('f', 6), ('g', 12)],
+                          self._get_names(self.outline.get_root_nodes()))
+
+    def test_dictionaries_spanning_lines(self):
+        self.editor.set_text('x = {\n    1: (2),\n    3: 4\n}\ndef f():\n'
+                             '    pass\n')
+        self.assertEquals([('f', 5)],
+                          self._get_names(self.outline.get_root_nodes()))
+
+    def test_backslash_continuations(self):
+        self.editor.set_text('class A:\n    def f(self):\n        x = a\\\n'
+                             '().b\n        y = 1\n')
+        self.assertEquals([('A', 1)],
+                          self._get_names(self.outline.get_root_nodes()))
+
+    def test_escaped_backslashes(self):
+        self.editor.set_text('x = 1  # \\\\\ndef f():\n    pass\n')
+        self.assertEquals([('f', 2)],
+                          self._get_names(self.outline.get_root_nodes()))
+        self.assertEquals([0, 1], [start for start, chunk
+                                   in self.outline.chunk_starts])
+
+    def test_syntax_errors(self):
+        self.editor.set_text('def f():\n    pass\ndef g(:\n    pass\n')
+        try:
+            self.outline.get_root_nodes()
+            self.fail('should have raised SyntaxError')
+        except SyntaxError, e:
+            self.assertEquals(3, e.lineno)
+
+    def test_scope_offsets(self):
+        source = 'class C(object):\n    @property\n    def f(self):\n' \
+                 '        pass\n"""\ndef a():\n"""\n'
+        self.editor.set_text(source)
+        self.assertEquals([0, source.index('    def f')],
+                          self.outline.get_scope_offsets())
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(OutlineTest))
+    result.addTests(unittest.makeSuite(OutlineModelTest))
+    return result
+
 
 if __name__ == '__main__':
     unittest.main()
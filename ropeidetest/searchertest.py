@@ -1,6 +1,6 @@
 import unittest
 
-from ropeide.searcher import Searcher
+from ropeide.searcher import Searcher, Matches
 from ropeide.statusbar import StatusBarException
 from ropeidetest.mockeditortest import MockEditorFactory
 
@@ -125,6 +125,27 @@ class SearchingTest(unittest.TestCase):
         self.assertEquals('left', self.searcher.get_match().side)
         self.assertEquals(self.editor.get_index(0), self.searcher.get_match().start)
 
+    def test_wrapping_around_the_end_of_the_text(self):
+        self.editor.set_text('abc aba')
+        self.editor.set_insert(self.editor.get_index(5))
+        self.searcher.start_searching()
+        self.searcher.append_keyword('a')
+        self.searcher.append_keyword('b')
+        self.assertEquals(self.editor.get_index(0), self.searcher.get_match().start)
+        self.assertFalse(self.searcher.failing)
+
+    def test_wrapping_around_the_start_of_the_text(self):
+        self.editor.set_text('abc aba')
+        self.searcher.start_searching()
+        self.searcher.append_keyword('a')
+        self.searcher.append_keyword('b')
+        self.searcher.configure_search(forward=False)
+        self.searcher.next_match()
+        self.assertEquals(self.editor.get_index(0), self.searcher.get_match().start)
+        self.searcher.next_match()
+        self.assertEquals(self.editor.get_index(4), self.searcher.get_match().start)
+        self.assertFalse(self.searcher.failing)
+
     def test_appending_in_prev_match(self):
         self.editor.set_text('abc aba')
         self.editor.set_insert(self.editor.get_index(4))
@@ -221,6 +242,142 @@ class SearchingTest(unittest.TestCase):
         self.assertTrue(manager.get_status('search').get_text().
                         lower().startswith('fail'))
 
+    def test_regex_searching(self):
+        self.editor.set_text('a1 b22 c333')
+        self.searcher.start_searching('regex')
+        self.searcher.append_keyword('[bc]')
+        self.searcher.append_keyword('\\d+')
+        self.assertEquals(self.editor.get_index(3), self.searcher.get_match().start)
+        self.assertEquals(self.editor.get_index(6), self.searcher.get_match().end)
+        self.searcher.next_match()
+        self.assertEquals(self.editor.get_index(7), self.searcher.get_match().start)
+        self.assertEquals(self.editor.get_index(11), self.searcher.get_match().end)
+
+    def test_invalid_regex_patterns(self):
+        self.searcher.start_searching('regex')
+        self.searcher.append_keyword('a')
+        self.searcher.append_keyword('(')
+        self.assertTrue(self.searcher.failing)
+        self.assertEquals(self.editor.get_index(2), self.searcher.get_match().end)
+
+    def test_whole_word_searching(self):
+        self.editor.set_text('ab abc ab')
+        self.searcher.start_searching('word')
+        self.searcher.append_keyword('a')
+        self.assertTrue(self.searcher.failing)
+        self.searcher.append_keyword('b')
+        self.assertEquals(self.editor.get_index(0), self.searcher.get_match().start)
+        self.searcher.next_match()
+        self.assertEquals(self.editor.get_index(7), self.searcher.get_match().start)
+
+    def test_changing_modes_while_searching(self):
+        self.editor.set_text('a.b axb')
+        self.searcher.start_searching('regex')
+        self.searcher.append_keyword('x')
+        self.searcher.shorten_keyword()
+        for c in 'a.b':
+            self.searcher.append_keyword(c)
+        self.searcher.next_match()
+        self.assertEquals(self.editor.get_index(4), self.searcher.get_match().start)
+        self.editor.set_insert(self.editor.get_start())
+        self.searcher.set_mode('literal')
+        self.assertEquals(self.editor.get_index(0), self.searcher.get_match().start)
+        self.assertFalse(self.searcher.failing)
+
+    def test_showing_match_counts(self):
+        self.editor.status_bar_manager = PlaceholderStatusBarManager()
+        status = self.editor.status_bar_manager
+        self.editor.set_text('ab ab ab')
+        self.searcher.start_searching()
+        self.searcher.append_keyword('a')
+        self.searcher.append_keyword('b')
+        self.assertTrue(status.get_status('search').get_text().
+                        rstrip().endswith('1 of 3'))
+        self.searcher.next_match()
+        self.assertTrue(status.get_status('search').get_text().
+                        rstrip().endswith('2 of 3'))
+
+    def test_not_finding_matches_again_for_next_match(self):
+        self.editor.set_text('ab ab ab')
+        self.searcher.start_searching()
+        self.searcher.append_keyword('a')
+        matches = self.searcher._get_matches()
+        self.searcher.next_match()
+        self.assertTrue(matches is self.searcher._get_matches())
+        self.editor.set_text('ab ab ab ab')
+        self.assertFalse(matches is self.searcher._get_matches())
+
+    def test_highlighting_all_matches(self):
+        self.editor.set_text('ab ab ab')
+        self.searcher.set_highlight_all(True)
+        self.searcher.start_searching()
+        self.searcher.append_keyword('a')
+        self.assertEquals(3, len(self.editor.all_matches))
+        self.searcher.append_keyword('c')
+        self.assertEquals(0, len(self.editor.all_matches))
+        self.searcher.end_searching()
+        self.assertEquals(None, self.editor.all_matches)
+
+    def test_not_highlighting_all_matches_by_default(self):
+        self.searcher.start_searching()
+        self.searcher.append_keyword('a')
+        self.assertEquals(None, self.editor.all_matches)
+        self.searcher.set_highlight_all(True)
+        self.assertEquals(1, len(self.editor.all_matches))
+
+    def test_reusing_matches_after_shortening_keywords(self):
+        self.editor.set_text('ab ab ab')
+        self.searcher.start_searching()
+        self.searcher.append_keyword('a')
+        matches = self.searcher._get_matches()
+        self.searcher.append_keyword('b')
+        self.searcher.shorten_keyword()
+        self.assertTrue(matches is self.searcher._get_matches())
+
+
+class MatchesTest(unittest.TestCase):
+
+    def test_overlapping_literal_matches(self):
+        matches = Matches('aaa', 'aa')
+        self.assertEquals(2, len(matches))
+        self.assertEquals((1, 3), matches.get_match(1))
+
+    def test_ignoring_case(self):
+        matches = Matches('Ab aB', 'ab', case=False)
+        self.assertEquals(2, len(matches))
+
+    def test_ignoring_empty_regex_matches(self):
+        matches = Matches('aab', 'a*', 'regex')
+        self.assertEquals(1, len(matches))
+        self.assertEquals((0, 2), matches.get_match(0))
+
+    def test_narrowing_literal_matches(self):
+        text = 'ab ac ab aab'
+        previous = Matches(text, 'a')
+        matches = Matches(text, 'ab', previous=previous)
+        self.assertEquals([0, 6, 10], matches.starts)
+        self.assertEquals([2, 8, 12], matches.ends)
+
+    def test_narrowing_when_case_changes(self):
+        text = 'aB ab Ab'
+        previous = Matches(text, 'a', case=False)
+        matches = Matches(text, 'aB', case=True, previous=previous)
+        self.assertEquals([0], matches.starts)
+
+    def test_not_narrowing_other_keywords(self):
+        text = 'ab ba'
+        previous = Matches(text, 'a')
+        matches = Matches(text, 'b', previous=previous)
+        self.assertEquals([1, 3], matches.starts)
+
+    def test_finding_matches(self):
+        matches = Matches('ab ab ab', 'ab')
+        self.assertEquals(1, matches.find(1))
+        self.assertEquals(1, matches.find(3))
+        self.assertEquals(None, matches.find(7))
+        self.assertEquals(1, matches.find(5, forward=False))
+        self.assertEquals(None, matches.find(1, forward=False))
+
 
 class PlaceholderStatusBarManager(object):
     def __init__(self):
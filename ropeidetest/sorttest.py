@@ -1,8 +1,10 @@
 import unittest
 
+import rope.base.exceptions
 from ropetest import testutils
 
 import ropeide.sort
+from ropeide.outline import OutlineModel
 
 
 class SortScopesTest(unittest.TestCase):
@@ -26,6 +28,30 @@ class SortScopesTest(unittest.TestCase):
         self._do_sort(0)
         self.assertEquals('\ndef a():\n    pass\n', self.mod.read())
 
+    def test_using_outlines(self):
+        self.mod.write('\ndef b():\n    pass\ndef a():\n    pass\n')
+        outline = OutlineModel(source=self.mod.read())
+        sort_scopes = ropeide.sort.SortScopes(self.project, self.mod, 0,
+                                              outline=outline)
+        self.assertTrue(sort_scopes.nodes is outline.get_root_nodes())
+        self.project.do(sort_scopes.get_changes())
+        self.assertEquals('\ndef a():\n    pass\ndef b():\n    pass\n',
+                          self.mod.read())
+
+    def test_ignoring_outlines_of_other_sources(self):
+        self.mod.write('\ndef b():\n    pass\ndef a():\n    pass\n')
+        outline = OutlineModel(source='\ndef c():\n    pass\n')
+        self._do_sort(0)
+        sort_scopes = ropeide.sort.SortScopes(self.project, self.mod, 0,
+                                              outline=outline)
+        self.assertEquals(['a', 'b'], [node.get_name()
+                                       for node in sort_scopes.nodes])
+
+    @testutils.assert_raises(rope.base.exceptions.ModuleSyntaxError)
+    def test_syntax_errors(self):
+        self.mod.write('\ndef b(:\n    pass\n')
+        self._do_sort(0)
+
     def test_alphabetical_sorting_in_module_scope(self):
         self.mod.write('\ndef b():\n    pass\ndef a():\n    pass\n')
         self._do_sort(0)
@@ -1,8 +1,9 @@
 import unittest
 
+import rope.base.prefs
 from ropetest import testutils
 
-from ropeide.templates import Template
+from ropeide.templates import Template, TemplateRegistry
 
 
 class TemplateTest(unittest.TestCase):
@@ -67,6 +68,58 @@ class TemplateTest(unittest.TestCase):
         template = Template('My name is ${name}.')
         self.assertEquals(15, template.get_cursor_location({'name': 'Ali'}))
 
+    def test_get_cursor_location_with_dollar_signs(self):
+        template = Template('$a = $${b} ${cursor}')
+        self.assertEquals(10, template.get_cursor_location({}))
+
+    @testutils.assert_raises(ValueError)
+    def test_invalid_placeholders(self):
+        template = Template('Name = ${1}')
+        template.substitute({})
+
+
+class TemplateRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        super(TemplateRegistryTest, self).setUp()
+        self.prefs = rope.base.prefs.Prefs()
+        self.registry = TemplateRegistry(self.prefs)
+
+    def _get_names(self, prefix):
+        return [proposal.name
+                for proposal in self.registry.get_proposals(prefix)]
+
+    def test_default_templates(self):
+        self.assertEquals(['main'], self._get_names('ma'))
+        self.assertEquals([], self._get_names('mx'))
+
+    def test_sorting_proposals(self):
+        self.prefs.add('templates', ('eq2', 'a'))
+        self.prefs.add('templates', ('ea', 'b'))
+        self.assertEquals(['ea', 'eq', 'eq2'], self._get_names('e'))
+        self.assertEquals(['eq', 'eq2'], self._get_names('eq'))
+
+    def test_adding_templates_after_first_use(self):
+        self.assertEquals([], self._get_names('say'))
+        self.prefs.add('templates', ('say_hello', "print 'Hello ${name}'"))
+        self.assertEquals(['say_hello'], self._get_names('say'))
+
+    def test_overriding_default_templates(self):
+        self.prefs.add('templates', ('main', 'main()'))
+        proposal = self.registry.get_proposals('main')[0]
+        self.assertEquals('main()', proposal.template.substitute({}))
+
+    def test_not_rebuilding_unchanged_registries(self):
+        proposals = self.registry.get_proposals('')
+        self.assertTrue(proposals is self.registry.get_proposals(''))
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(TemplateTest))
+    result.addTests(unittest.makeSuite(TemplateRegistryTest))
+    return result
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,195 @@
+import unittest
+
+import rope.base.project
+from ropetest import testutils
+
+from ropeide.fileindex import FileIndex
+from ropeide.grep import ProjectGrep, ProjectReplace
+from ropeide.trigrams import TrigramIndex, get_literals
+
+
+class TrigramIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        super(TrigramIndexTest, self).setUp()
+        self.project = testutils.sample_project()
+        self.mod1 = testutils.create_module(self.project, 'mod1')
+        self.mod2 = testutils.create_module(self.project, 'mod2')
+        self._open_indices()
+
+    def tearDown(self):
+        testutils.remove_project(self.project)
+        super(TrigramIndexTest, self).tearDown()
+
+    def _open_indices(self):
+        self.file_index = FileIndex(self.project)
+        self.index = TrigramIndex(self.project, self.file_index,
+                                  processes=1)
+
+    def _reopen_project(self):
+        self.index.close()
+        self.file_index.close()
+        self.project.close()
+        self.project = rope.base.project.Project(
+            self.project.address, ignored_resources=['.ropeproject'])
+        self._open_indices()
+
+    def _write_externally(self, resource, contents):
+        output = open(resource.real_path, 'w')
+        output.write(contents)
+        output.close()
+
+    def test_finding_candidates(self):
+        self.mod1.write('def hello():\n    pass\n')
+        self.mod2.write('def goodbye():\n    pass\n')
+        self.assertEquals(['mod1.py'], self.index.get_candidates('hello'))
+        self.assertEquals(['mod1.py', 'mod2.py'],
+                          sorted(self.index.get_candidates('pass')))
+        self.assertEquals([], self.index.get_candidates('missing'))
+
+    def test_ignoring_case(self):
+        self.mod1.write('Hello\n')
+        self.assertEquals(['mod1.py'], self.index.get_candidates('hELLO'))
+
+    def test_short_keywords(self):
+        self.mod1.write('a\n')
+        self.assertEquals(['mod1.py', 'mod2.py'],
+                          sorted(self.index.get_candidates('a')))
+
+    def test_regular_expressions(self):
+        self.mod1.write('hello world\n')
+        self.mod2.write('hello\n')
+        self.assertEquals(['mod1.py'],
+                          self.index.get_candidates(r'hel+o\s+world', True))
+
+    def test_ignoring_binary_files(self):
+        binary = self.project.root.create_file('binary')
+        binary.write('hello\0')
+        self.assertEquals([], self.index.get_candidates('hello'))
+        self.assertEquals(['mod1.py', 'mod2.py'],
+                          sorted(self.index.get_candidates('a')))
+
+    def test_updating_changed_files(self):
+        self.mod1.write('hello\n')
+        self.index.update()
+        self.mod1.write('goodbye\n')
+        self.assertEquals([], self.index.get_candidates('hello'))
+        self.assertEquals(['mod1.py'], self.index.get_candidates('goodbye'))
+
+    def test_updating_files_changed_externally(self):
+        self.index.update()
+        self._write_externally(self.mod1, 'hello\n')
+        self.assertEquals(['mod1.py'], self.index.get_candidates('hello'))
+
+    def test_removing_files(self):
+        self.mod1.write('hello\n')
+        self.index.update()
+        self.mod1.remove()
+        self.assertEquals([], self.index.get_candidates('hello'))
+
+    def test_moving_folders(self):
+        pkg = testutils.create_package(self.project, 'pkg')
+        mod = testutils.create_module(self.project, 'mod', pkg)
+        mod.write('hello\n')
+        self.index.update()
+        pkg.move('newpkg')
+        self.assertEquals(['newpkg/mod.py'],
+                          self.index.get_candidates('hello'))
+
+    def test_saving_the_index(self):
+        self.mod1.write('hello\n')
+        self.index.update()
+        self._reopen_project()
+        self.index._load()
+        self.assertEquals(['mod1.py', 'mod2.py'], sorted(self.index.ids))
+        self.assertEquals(['mod1.py'], self.index.get_candidates('hello'))
+
+    def test_not_reading_unchanged_files_when_loaded(self):
+        self.mod1.write('hello\n')
+        self.index.update()
+        self._reopen_project()
+        indexed = []
+        self.index._add = lambda *args: indexed.append(args[0])
+        self.assertEquals(['mod1.py'], self.index.get_candidates('hello'))
+        self.assertEquals([], indexed)
+
+    def test_compacting(self):
+        self.mod1.write('hello\n')
+        self.mod2.write('hello\n')
+        self.index.update()
+        self.mod1.write('goodbye\n')
+        self.index._compact()
+        self.assertEquals(0, self.index.removed_count)
+        self.assertEquals(['mod2.py'], self.index.get_candidates('hello'))
+        self.assertEquals(['mod1.py'], self.index.get_candidates('goodbye'))
+
+    def test_building(self):
+        self.mod1.write('hello\n')
+        self.index.build()
+        self.assertEquals(2, self.index.get_file_count())
+        self.assertTrue(self.index.build_time is not None)
+        self.assertTrue(self.index.get_size() > 0)
+
+    def test_building_in_processes(self):
+        for i in range(100):
+            testutils.create_module(self.project, 'm%d' % i).write('a%d\n' % i)
+        self.index.processes = 2
+        self.index.build()
+        self.assertEquals(['m42.py'], self.index.get_candidates('a42'))
+
+    def test_grepping_using_the_index(self):
+        self.mod1.write('hello\n')
+        self.mod2.write('goodbye\n')
+        self.index.update()
+        self._write_externally(self.mod2, 'hello\n')
+        found = []
+        ProjectGrep(self.project, 'hello', index=self.index).run(found.extend)
+        self.assertEquals(['mod1.py', 'mod2.py'],
+                          sorted([match.resource.path for match in found]))
+
+    def test_replacing_using_the_index(self):
+        self.mod1.write('hello\n')
+        replace = ProjectReplace(self.project, 'hello', 'hi',
+                                 processes=1, index=self.index)
+        self.project.do(replace.get_changes())
+        self.assertEquals('hi\n', self.mod1.read())
+
+
+class GetLiteralsTest(unittest.TestCase):
+
+    def test_plain_keywords(self):
+        self.assertEquals(['a.b'], get_literals('a.b'))
+
+    def test_non_ascii_characters(self):
+        self.assertEquals(['ab', 'cd'], get_literals(u'ab\u0101cd'))
+
+    def test_regular_expressions(self):
+        self.assertEquals(['ab', 'cd'], get_literals(r'ab.*cd', True))
+        self.assertEquals(['a.b'], get_literals(r'a\.b', True))
+
+    def test_repeats(self):
+        self.assertEquals(['a', 'c'], get_literals(r'ab?c', True))
+
+    def test_alternatives(self):
+        self.assertEquals([], get_literals(r'abc|def', True))
+        self.assertEquals(['x', 'y'], get_literals(r'x(abc|def)y', True))
+
+    def test_groups(self):
+        self.assertEquals(['ab', 'cd'], get_literals(r'ab(cd)', True))
+
+    def test_anchors(self):
+        self.assertEquals(['abc'], get_literals(r'^abc$', True))
+
+    def test_bad_patterns(self):
+        self.assertEquals([], get_literals('(a', True))
+
+
+def suite():
+    result = unittest.TestSuite()
+    result.addTests(unittest.makeSuite(TrigramIndexTest))
+    result.addTests(unittest.makeSuite(GetLiteralsTest))
+    return result
+
+
+if __name__ == '__main__':
+    unittest.main()
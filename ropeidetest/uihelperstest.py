@@ -53,6 +53,17 @@ class UIHelpersTest(unittest.TestCase):
         enhanced_list.add_entry(1)
         self.assertEquals('element 1', enhanced_list.list.get(0))
 
+    def test_enhanced_list_inserting_and_removing_ranges(self):
+        handle = SampleListHandle()
+        enhanced_list = EnhancedList(self.parent, handle)
+        enhanced_list.insert_entries([1, 4], 0)
+        enhanced_list.insert_entries([2, 3], 1)
+        self.assertEquals([1, 2, 3, 4], enhanced_list.get_entries())
+        self.assertEquals('element 2', enhanced_list.list.get(1))
+        enhanced_list.remove_entries(1, 3)
+        self.assertEquals([1, 4], enhanced_list.get_entries())
+        self.assertEquals(2, enhanced_list.list.size())
+
     def test_tree_view(self):
         handle = SampleTreeHandle()
         tree_viewer = TreeView(self.parent, handle)